@@ -0,0 +1,151 @@
+# assets.py
+
+import json
+import mmap
+import os
+import struct
+
+import pygame
+
+BUNDLE_PATH = "graphics/sprites.bundle"
+BUNDLE_MAGIC = b"MZSB"
+BUNDLE_VERSION = 1
+
+# header: magic, version, length of the JSON index that follows
+HEADER = struct.Struct("<4sII")
+
+# every image the game loads at runtime, packed by `build_assets.py`
+RUNTIME_SPRITES = [
+    "graphics/main_menu.png",
+    "graphics/pause_menu.png",
+    "graphics/help_menu.png",
+    "graphics/loser_menu.png",
+    "graphics/winner_menu.png",
+    "graphics/leaderboard_bg.png",
+    "graphics/maze/start_location.png",
+    "graphics/maze/end_location.png",
+    "graphics/player/linty.png",
+    "graphics/player/lintydash.png",
+    "graphics/player/lintyteleport.png",
+]
+
+
+class SpriteBundle:
+    """Read-only view of a packed sprite bundle.
+
+    The bundle is memory mapped, so pixel data is only paged in when a
+    sprite is first used and never copied before it reaches pygame.
+
+    Attributes:
+        index: Maps sprite paths to (offset, width, height, format).
+    """
+
+    def __init__(self, path: str):
+        """Opens and memory maps the bundle at `path`.
+
+        Args:
+            path: Path of the bundle file
+
+        Raises:
+            ValueError: If the file is not a bundle of a supported version
+        """
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            raise ValueError(f"{path} is not a version {BUNDLE_VERSION} sprite bundle")
+        index_end = HEADER.size + index_size
+        self.index = json.loads(self._mmap[HEADER.size:index_end])
+        self._data = memoryview(self._mmap)[index_end:]
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.index
+
+    def load(self, path: str) -> pygame.Surface:
+        """Returns a surface sharing the bundle's pixel buffer for `path`."""
+        offset, width, height, fmt = self.index[path]
+        size = width * height * len(fmt)
+        return pygame.image.frombuffer(
+            self._data[offset:offset + size], (width, height), fmt)
+
+
+def write_bundle(path: str, sprites: list[str]) -> int:
+    """Decodes `sprites` and packs their raw pixels into a bundle at `path`.
+
+    Args:
+        path: Output path of the bundle
+        sprites: Image paths to pack, also used as the lookup keys
+
+    Returns:
+        The size of the written bundle in bytes.
+    """
+    index = {}
+    blobs = []
+    offset = 0
+    for sprite in sprites:
+        surf = pygame.image.load(sprite)
+        fmt = "RGBA" if surf.get_flags() & pygame.SRCALPHA else "RGB"
+        pixels = pygame.image.tobytes(surf, fmt)
+        index[sprite] = (offset, surf.get_width(), surf.get_height(), fmt)
+        blobs.append(pixels)
+        offset += len(pixels)
+
+    index_bytes = json.dumps(index).encode()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(index_bytes)))
+        f.write(index_bytes)
+        for pixels in blobs:
+            f.write(pixels)
+    os.replace(tmp_path, path)
+    return HEADER.size + len(index_bytes) + offset
+
+
+_bundle = None
+_cache: dict[tuple[str, tuple[int, int] | None, bool], pygame.Surface] = {}
+
+
+def _get_bundle() -> SpriteBundle | None:
+    """Opens the sprite bundle on first use, if one has been built."""
+    global _bundle
+    if _bundle is None and os.path.exists(BUNDLE_PATH):
+        try:
+            _bundle = SpriteBundle(BUNDLE_PATH)
+        except (OSError, ValueError):
+            _bundle = False  # unusable bundle, fall back to the image files
+    return _bundle or None
+
+
+def load_image(path: str, size: tuple[int, int] | None = None) -> pygame.Surface:
+    """Loads an image, preferring the packed sprite bundle.
+
+    Images are decoded, scaled and converted once and then shared between
+    callers, so the returned surface must not be drawn on. Without a display
+    the image is left in its decoded pixel format, so headless code can load
+    sprites too.
+
+    Args:
+        path: Path of the image, e.g. "graphics/main_menu.png"
+        size: Optional size to scale the image to
+
+    Returns:
+        The loaded image as a surface with per-pixel alpha.
+    """
+    converted = pygame.display.get_surface() is not None
+    key = (path, size, converted)
+    surf = _cache.get(key)
+    if surf is not None:
+        return surf
+
+    bundle = _get_bundle()
+    if bundle is not None and path in bundle:
+        surf = bundle.load(path)
+    else:
+        surf = pygame.image.load(path)
+    if size is not None:
+        surf = pygame.transform.scale(surf, size)
+    if converted:
+        surf = surf.convert_alpha()
+
+    _cache[key] = surf
+    return surf
@@ -0,0 +1,264 @@
+# benchmark.py
+"""Times maze generation, collisions, hunters, drawing and lightning.
+
+Every benchmark runs headless with fixed seeds, so results are comparable
+between runs on the same machine. Results are printed as a table and can
+be saved as JSON and compared with a saved baseline:
+
+    python benchmark.py --output baseline.json
+    # ... change the code ...
+    python benchmark.py --baseline baseline.json --threshold 0.1
+
+With a baseline, the run fails with exit code 1 if any benchmark got slower
+by more than the threshold, e.g. 0.1 for 10 %. Run from the repository
+root, so the sprites are found. `--filter` picks benchmarks by name.
+"""
+
+import os
+
+# the drawing benchmarks render offscreen
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import timeit
+
+import numpy as np
+import pygame
+
+from config import HEIGHT, WIDTH
+from hunter import Hunter
+from lightning import Lightning
+from maze import Maze
+from player import Player, PlayerInput
+
+# seed of every maze and random stream used by the benchmarks
+SEED = 2024
+
+# relative slowdown that counts as a regression by default
+DEFAULT_THRESHOLD = 0.10
+
+# benchmarks by name, each a function returning (run, operations per run)
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    """Registers a benchmark.
+
+    The decorated function sets up the benchmark and returns a function
+    to time, along with the number of operations each call performs.
+    """
+
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def _maze_construction(difficulty: str):
+    def setup():
+        return lambda: Maze(difficulty, SEED), 1
+    return setup
+
+
+for _difficulty in ("easy", "medium", "hard", "???"):
+    benchmark(f"maze.construct[{_difficulty}]")(_maze_construction(_difficulty))
+
+
+@benchmark("collision.is_move_allowed[hard]")
+def _is_move_allowed():
+    maze = Maze("hard", SEED)
+    rng = random.Random(SEED)
+    players = [Player(rng.uniform(15, WIDTH - 15), rng.uniform(15, HEIGHT - 15),
+                      rng.randint(0, 200)) for _ in range(1000)]
+    is_move_allowed = maze.is_move_allowed
+
+    def run():
+        for player in players:
+            is_move_allowed(player)
+
+    return run, len(players)
+
+
+@benchmark("player.slide[hard]")
+def _slide():
+    maze = Maze("hard", SEED)
+    player = Player(0, 0, 0)
+    # press the player head on into an obstacle, so every step searches
+    # for a direction to slide in
+    for obstacle in maze.obstacles:
+        x = obstacle.x - obstacle.radius - player.radius - 1
+        player.set_position(x, obstacle.y, obstacle.z)
+        if maze.is_move_allowed(player):
+            break
+    start = player.get_location()
+    inputs = PlayerInput(right=True)
+
+    def run():
+        player.set_position(*start)
+        player.velocity.update(player.max_speed, 0, 0)
+        player.handle_movement(maze, inputs, 0.0)
+
+    return run, 1
+
+
+def _move_hunters(count: int):
+    def setup():
+        maze = Maze("easy", SEED)
+        rng = np.random.default_rng(SEED)
+        positions = rng.uniform((0, 0, 90), (WIDTH, HEIGHT, 110), (count, 3))
+        maze.hunters = [Hunter(x, y, round(z), 15, 1.0) for x, y, z in positions.tolist()]
+        player = Player(WIDTH / 2, HEIGHT / 2, 100)
+        move_rng = random.Random(SEED)
+
+        def run():
+            # put the hunters back, so they never reach the player; this
+            # takes a small part of the time
+            for hunter in maze.hunters:
+                hunter.reset_location()
+            maze.move_hunters(player, move_rng)
+
+        return run, count
+    return setup
+
+
+for _count in (200, 2000, 20000):
+    benchmark(f"hunters.move[{_count}]")(_move_hunters(_count))
+
+
+def _display(method: str):
+    def setup():
+        maze = Maze("???" if method == "display_hunters" else "hard", SEED)
+        screen = pygame.Surface((WIDTH, HEIGHT))
+        player = Player(WIDTH / 2, HEIGHT / 2, 100)
+        if method == "display_hunters":
+            for hunter in maze.hunters:
+                hunter.z = player.z  # in view
+            return lambda: maze.display_hunters(screen, player), 1
+        # the start location is only drawn on its own layer
+        z = maze.start_location.z if method == "display_start_end" else player.z
+        return lambda: getattr(maze, method)(screen, z), 1
+    return setup
+
+
+for _method in ("display_obstacles", "display_items", "display_hunters",
+                "display_start_end"):
+    benchmark(f"display.{_method[len('display_'):]}")(_display(_method))
+
+
+@benchmark("lightning.create")
+def _lightning():
+    return lambda: Lightning([50, 50], [WIDTH - 50, HEIGHT - 50], random.Random(SEED)), 1
+
+
+def measure(setup, min_time=0.2, repeat=5) -> dict:
+    """Times a benchmark.
+
+    The benchmark is called often enough to take about `min_time` seconds,
+    and the fastest of `repeat` such rounds is reported, which is the one
+    least disturbed by the rest of the system.
+
+    Returns:
+        Seconds and operations per second for one operation, and the number
+        of calls per round.
+    """
+    run, operations = setup()
+    timer = timeit.Timer(run)
+    calls, elapsed = timer.autorange()
+    calls = max(1, int(calls * min_time / max(elapsed, 1e-9)))
+    best = min(timer.repeat(repeat, calls)) / calls
+    return {
+        "seconds_per_op": best / operations,
+        "ops_per_second": operations / best,
+        "calls": calls,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> dict[str, float]:
+    """Returns the benchmarks that slowed down by more than `threshold`.
+
+    Args:
+        results: "results" of the current run
+        baseline: "results" of the baseline run
+        threshold: Relative slowdown allowed, e.g. 0.1 for 10 %
+
+    Returns:
+        The ratio of current to baseline time of every regressed benchmark.
+    """
+    regressions = {}
+    for name, result in results.items():
+        if name in baseline:
+            ratio = result["seconds_per_op"] / baseline[name]["seconds_per_op"]
+            if ratio > 1 + threshold:
+                regressions[name] = ratio
+    return regressions
+
+
+def run_benchmarks(names, min_time=0.2, repeat=5) -> dict:
+    """Runs benchmarks and returns the results with details of the machine."""
+    results = {}
+    for name in names:
+        results[name] = measure(BENCHMARKS[name], min_time, repeat)
+        print(f"{name:<34}{results[name]['seconds_per_op'] * 1e6:>12.2f} us/op",
+              file=sys.stderr, flush=True)
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="",
+                        help="only run benchmarks whose name contains this")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare to")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown that fails the run, e.g. 0.1")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="seconds each timing round takes at least")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="timing rounds per benchmark, the fastest counts")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if args.list:
+        print("\n".join(names))
+        sys.exit()
+
+    report = run_benchmarks(names, args.min_time, args.repeat)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.baseline:
+        print(json.dumps(report, indent=2))
+        sys.exit()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    for name, result in report["results"].items():
+        if name in baseline:
+            change = result["seconds_per_op"] / baseline[name]["seconds_per_op"] - 1
+            print(f"{name:<34}{change:>+9.1%}")
+        else:
+            print(f"{name:<34}{'new':>9}")
+    regressions = compare(report["results"], baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than the baseline by more "
+              f"than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
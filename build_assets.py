@@ -0,0 +1,16 @@
+# build_assets.py
+"""Packs the runtime sprites into `graphics/sprites.bundle`.
+
+Run this before shipping the game:
+
+    python build_assets.py
+
+The game falls back to loading the individual images when no bundle exists.
+"""
+
+from assets import BUNDLE_PATH, RUNTIME_SPRITES, write_bundle
+
+if __name__ == "__main__":
+    size = write_bundle(BUNDLE_PATH, RUNTIME_SPRITES)
+    print(f"Packed {len(RUNTIME_SPRITES)} sprites into {BUNDLE_PATH} "
+          f"({size / 1024 / 1024:.1f} MiB)")
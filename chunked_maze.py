@@ -0,0 +1,176 @@
+# chunked_maze.py
+"""Mazes many windows large, streamed in square chunks around the player.
+
+A `ChunkedMaze` is split into `CHUNK_SIZE` squares. Each chunk is generated
+from the maze's seed and the chunk's coordinates when the camera comes
+near it, and dropped again once the player is far away, so memory and
+per-frame work stay the same however large the maze is:
+
+    maze = ChunkedMaze("hard", seed=1, chunks=(32, 4))
+    world = World(maze)
+
+The camera follows the player and the window shows the part of the maze
+returned by `get_view`. Objects are generated per chunk at the same density
+as in a window sized maze of the same difficulty.
+"""
+
+import math
+
+from config import HEIGHT, WIDTH
+from entity_store import ItemStore, SphereStore
+from maze import DIFFICULTIES, Maze
+from player import Player
+from rng import RngService, derive_seed
+
+# side length of a chunk; the window shows two of them side by side
+CHUNK_SIZE = 600
+
+# chunks around the view that are kept loaded, and how much further away
+# the player has to get before they are dropped again
+LOAD_MARGIN = 1
+EVICT_MARGIN = 2
+
+
+class MazeChunk(Maze):
+    """One square of a `ChunkedMaze` with the objects generated in it.
+
+    Chunks share the start and end location of their maze and are only
+    containers; they are never played on their own.
+
+    Attributes:
+        column: Horizontal index of the chunk
+        row: Vertical index of the chunk
+    """
+
+    def __init__(self, maze: "ChunkedMaze", column: int, row: int):
+        """Generates the chunk at (`column`, `row`) of `maze`.
+
+        Args:
+            maze: The maze the chunk belongs to
+            column: Horizontal index of the chunk
+            row: Vertical index of the chunk
+        """
+        self.column = column
+        self.row = row
+        self.difficulty = maze.difficulty
+        self.seed = derive_seed(maze.seed, "chunk", column, row)
+        self.rng = RngService(self.seed)
+        self.start_location = maze.start_location
+        self.end_location = maze.end_location
+        self.obstacles = SphereStore()
+        self.power_ups = ItemStore()
+        self.hunters = []
+        self.lightnings = []
+        self.area = (column * CHUNK_SIZE, row * CHUNK_SIZE,
+                     (column + 1) * CHUNK_SIZE, (row + 1) * CHUNK_SIZE)
+        self.layers = (0, maze.depth)
+        self.generate()
+
+
+class ChunkedMaze(Maze):
+    """A maze larger than the window, generated chunk by chunk.
+
+    Only the chunks around the camera are kept in memory. Items collected in
+    a dropped chunk stay collected when it is generated again; hunters
+    belong to the chunk they were generated in and are dropped along with
+    it, wherever they have wandered to, so that generating the chunk again
+    doesn't duplicate them.
+
+    Attributes:
+        chunks: Loaded chunks by (column, row)
+        columns: Width of the maze in chunks
+        rows: Height of the maze in chunks
+        max_radius: Radius of the largest object, how far objects reach
+                    out of their chunk
+    """
+
+    def __init__(self, difficulty: str, seed=None, chunks=(16, 4)):
+        """Initializes a maze of `chunks` columns and rows of chunks.
+
+        Nothing is generated until `update_around` is first called.
+
+        Args:
+            difficulty: The difficulty of the maze
+            seed: Seed to generate the chunks from. Defaults to a fresh seed
+            chunks: (columns, rows) of chunks
+        """
+        self.columns, self.rows = chunks
+        self.width = self.columns * CHUNK_SIZE
+        self.height = self.rows * CHUNK_SIZE
+        self.chunks: dict[tuple[int, int], MazeChunk] = {}
+        # indices of the collected items of chunks that have been dropped
+        self._collected: dict[tuple[int, int], list[int]] = {}
+        self.max_radius = DIFFICULTIES.get(difficulty, (0, 0, 0))[2]
+        super().__init__(difficulty, seed)
+
+    def generate(self) -> None:
+        """Chunks are generated when they are first needed."""
+
+    def get_view(self, center: tuple[float, float]) -> tuple[float, float, float, float]:
+        """Returns the window sized part of the maze centered on `center`.
+
+        The view stops at the edges of the maze.
+        """
+        left = min(max(center[0] - WIDTH / 2, 0), max(self.width - WIDTH, 0))
+        top = min(max(center[1] - HEIGHT / 2, 0), max(self.height - HEIGHT, 0))
+        return left, top, left + WIDTH, top + HEIGHT
+
+    def _chunk_range(self, left: float, top: float, right: float, bottom: float,
+                     margin=0) -> tuple[range, range]:
+        """Columns and rows of the chunks overlapping an area plus `margin` chunks."""
+        first_column = max(math.floor(left / CHUNK_SIZE) - margin, 0)
+        last_column = min(math.floor(right / CHUNK_SIZE) + margin, self.columns - 1)
+        first_row = max(math.floor(top / CHUNK_SIZE) - margin, 0)
+        last_row = min(math.floor(bottom / CHUNK_SIZE) + margin, self.rows - 1)
+        return range(first_column, last_column + 1), range(first_row, last_row + 1)
+
+    def get_chunk(self, column: int, row: int) -> MazeChunk:
+        """Returns a chunk, generating it if it isn't loaded."""
+        key = (column, row)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = MazeChunk(self, column, row)
+            collected = self._collected.pop(key, None)
+            if collected:
+                chunk.power_ups.column("collected")[collected] = True
+            self.chunks[key] = chunk
+            self.hunters.extend(chunk.hunters)
+        return chunk
+
+    def parts_in(self, left: float, top: float, right: float,
+                 bottom: float, layers=None) -> list[MazeChunk]:
+        """Returns the chunks holding objects that may reach into an area.
+
+        Chunks span all layers, so `layers` is ignored. Missing chunks are
+        generated, so queries are always complete.
+        """
+        pad = self.max_radius
+        columns, rows = self._chunk_range(left - pad, top - pad, right + pad, bottom + pad)
+        return [self.get_chunk(column, row) for row in rows for column in columns]
+
+    def update_around(self, player: Player) -> None:
+        """Loads the chunks around the player's view and drops far ones."""
+        view = self.get_view((player.x, player.y))
+        # drop first, so a teleport doesn't briefly hold both neighbourhoods
+        keep_columns, keep_rows = self._chunk_range(*view, margin=EVICT_MARGIN)
+        evicted = [key for key in self.chunks
+                   if key[0] not in keep_columns or key[1] not in keep_rows]
+        for key in evicted:
+            collected = self.chunks.pop(key).power_ups.column("collected")
+            if collected.any():
+                self._collected[key] = collected.nonzero()[0].tolist()
+        if evicted:
+            self.hunters = [hunter for chunk in self.chunks.values()
+                            for hunter in chunk.hunters]
+
+        columns, rows = self._chunk_range(*view, margin=LOAD_MARGIN)
+        for row in rows:
+            for column in columns:
+                self.get_chunk(column, row)
+
+    def reset(self) -> None:
+        """Drops every chunk, so the next run starts from a fresh maze."""
+        self.chunks.clear()
+        self._collected.clear()
+        self.hunters.clear()
+        self.clear_lightnings()
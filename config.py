@@ -0,0 +1,24 @@
+# config.py
+"""Settings shared by the game and the headless simulation."""
+
+# dimensions of the window
+WIDTH = 1200
+HEIGHT = 600
+Z_LAYERS = 200  # inclusive interval [0,200]
+
+# set this to true for debug print statements and debug display on the screen
+DEBUG_MODE = False
+# file the debug records are appended to, None for standard error
+DEBUG_LOG_PATH = None
+
+# the simulation advances in fixed steps of 1 / TICK_RATE seconds, no matter
+# how fast frames are rendered. Movement speeds are given per tick.
+TICK_RATE = 60
+
+# where the leaderboard is kept: "json" for the top 10 scores in
+# leaderboard.json, "sqlite" for every run in leaderboard.db, "remote" for
+# the leaderboard server at LEADERBOARD_URL, see leaderboard_server.py
+LEADERBOARD_BACKEND = "json"
+LEADERBOARD_URL = "http://127.0.0.1:8765"
+# name of this machine in stored runs, None for the host name
+MACHINE_ID = None
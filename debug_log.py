@@ -0,0 +1,114 @@
+# debug_log.py
+"""Debug logging that costs nothing unless `DEBUG_MODE` is on.
+
+Game code logs structured records instead of printing:
+
+    from debug_log import debug
+
+    debug("item_collected", type="dash", x=120, y=340)
+
+With `DEBUG_MODE` off, `debug` is a function that does nothing. With it
+on, records go into an in-memory ring buffer and a background thread
+writes them out as JSON lines every `FLUSH_INTERVAL` seconds, so the game
+thread never waits on the terminal or the disk. If the game logs faster
+than the records are written, the oldest records are dropped and the log
+says how many.
+"""
+
+import atexit
+import itertools
+import json
+import sys
+import threading
+import time
+from collections import deque
+
+from config import DEBUG_LOG_PATH, DEBUG_MODE
+
+# most records held in memory before the oldest are dropped
+RING_SIZE = 4096
+
+# seconds between writes of the buffered records
+FLUSH_INTERVAL = 0.25
+
+
+class DebugLog:
+    """A ring buffer of debug records, written out on a background thread.
+
+    Appending to a `deque` is atomic, so `record` takes no lock.
+
+    Attributes:
+        path: File the records are appended to, None for standard error
+        records: Buffered (sequence number, time, event, fields) records
+    """
+
+    def __init__(self, path: str | None = DEBUG_LOG_PATH, size=RING_SIZE):
+        """Initializes an empty log. The writer thread starts with the first record.
+
+        Args:
+            path: File to append the records to. None for standard error
+            size: Most records held in memory
+        """
+        self.path = path
+        self.records = deque(maxlen=size)
+        self._sequence = itertools.count()
+        self._written = 0
+        self._thread = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def record(self, event: str, **fields) -> None:
+        """Buffers a record of `event` with any details as keyword arguments."""
+        self.records.append((next(self._sequence), time.perf_counter(), event, fields))
+        if self._thread is None:
+            self._start()
+
+    def _start(self) -> None:
+        """Starts the writer thread."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="debug-log",
+                                                daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        """Writes the buffered records until the log is closed."""
+        while not self._wake.wait(FLUSH_INTERVAL):
+            self.flush()
+        self.flush()
+
+    def flush(self) -> None:
+        """Writes out every buffered record."""
+        with self._lock:
+            lines = []
+            while self.records:
+                sequence, timestamp, event, fields = self.records.popleft()
+                if sequence > self._written:
+                    lines.append(json.dumps({"event": "dropped",
+                                             "count": sequence - self._written}))
+                self._written = sequence + 1
+                lines.append(json.dumps({"t": round(timestamp, 6), "event": event,
+                                         **fields}, default=str))
+            if not lines:
+                return
+            if self.path is None:
+                sys.stderr.write("\n".join(lines) + "\n")
+                sys.stderr.flush()
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+
+    def close(self) -> None:
+        """Stops the writer thread after it has written the remaining records."""
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def _discard(event: str, **fields) -> None:
+    """Stands in for `DebugLog.record` while debugging is off."""
+
+
+log = DebugLog() if DEBUG_MODE else None
+debug = log.record if DEBUG_MODE else _discard
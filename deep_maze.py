@@ -0,0 +1,170 @@
+# deep_maze.py
+"""Mazes of arbitrary depth, generated in slabs of layers around the player.
+
+A `DeepMaze` is split along z into slabs of `SLAB_DEPTH` layers. A slab is
+generated from the maze's seed and its index when the player comes near,
+and the least recently visited slabs are dropped once more than
+`MAX_SLABS` are loaded, so start-up is instant and memory stays flat
+however deep the maze is:
+
+    maze = DeepMaze("hard", seed=1, depth=100_000)
+    world = World(maze)
+
+Objects are generated per slab at the same density as in a maze of
+`Z_LAYERS` layers of the same difficulty.
+"""
+
+import math
+from collections import OrderedDict
+
+from entity_store import ItemStore, SphereStore
+from maze import DIFFICULTIES, Maze
+from player import Player
+from rng import RngService, derive_seed
+
+# layers per slab
+SLAB_DEPTH = 50
+
+# most slabs kept loaded, enough for the slabs around the player plus a few
+# the player has just left
+MAX_SLABS = 8
+
+# slabs beyond the ones the player can see that are loaded ahead of time
+LOAD_MARGIN = 1
+
+# how far an item reaches above the layer it was generated at, and how far
+# beyond its surface an obstacle casts a shadow, see `Maze.generate_maze_items`
+# and `Sphere.display`
+ITEM_REACH = 10
+SHADOW_DEPTH = 10
+
+# deepest layer of an endless maze
+ENDLESS_DEPTH = 2 ** 31 - 1
+
+
+class MazeSlab(Maze):
+    """The layers of a `DeepMaze` from `index * SLAB_DEPTH` on, with their objects.
+
+    Slabs share the start and end location of their maze and are only
+    containers; they are never played on their own.
+
+    Attributes:
+        index: Position of the slab, counted from the surface
+    """
+
+    def __init__(self, maze: "DeepMaze", index: int):
+        """Generates slab `index` of `maze`.
+
+        Args:
+            maze: The maze the slab belongs to
+            index: Position of the slab, counted from the surface
+        """
+        self.index = index
+        self.difficulty = maze.difficulty
+        self.seed = derive_seed(maze.seed, "slab", index)
+        self.rng = RngService(self.seed)
+        self.start_location = maze.start_location
+        self.end_location = maze.end_location
+        self.obstacles = SphereStore()
+        self.power_ups = ItemStore()
+        self.hunters = []
+        self.lightnings = []
+        self.area = (0, 0, maze.width, maze.height)
+        self.layers = (index * SLAB_DEPTH,
+                       min((index + 1) * SLAB_DEPTH - 1, maze.depth))
+        self.generate()
+
+
+class DeepMaze(Maze):
+    """A maze deeper than `Z_LAYERS`, generated slab by slab.
+
+    Only the slabs around the player are kept in memory. Items collected in
+    a dropped slab stay collected when it is generated again; hunters belong
+    to the slab they were generated in and are dropped along with it.
+
+    Slabs are only dropped in `update_around`, so what is loaded depends on
+    the simulation alone and not on what has been drawn.
+
+    Attributes:
+        slabs: Loaded slabs by index, least recently visited first
+        reach: How many layers objects reach out of their slab
+    """
+
+    def __init__(self, difficulty: str, seed=None, depth=ENDLESS_DEPTH):
+        """Initializes a maze whose end location is at layer `depth`.
+
+        Nothing is generated until `update_around` is first called.
+
+        Args:
+            difficulty: The difficulty of the maze
+            seed: Seed to generate the slabs from. Defaults to a fresh seed
+            depth: Deepest layer of the maze. Defaults to practically endless
+        """
+        self.depth = depth
+        self.slabs: OrderedDict[int, MazeSlab] = OrderedDict()
+        # indices of the collected items of slabs that have been dropped
+        self._collected: dict[int, list[int]] = {}
+        r_max = DIFFICULTIES.get(difficulty, (0, 0, 0))[2]
+        self.reach = max(r_max + SHADOW_DEPTH, ITEM_REACH)
+        super().__init__(difficulty, seed)
+
+    def generate(self) -> None:
+        """Slabs are generated when they are first needed."""
+
+    def _slab_range(self, first: float, last: float, margin=0) -> range:
+        """Indices of the slabs holding objects that may reach into some layers."""
+        first_index = max(math.floor((first - self.reach) / SLAB_DEPTH) - margin, 0)
+        last_index = min(math.floor((last + self.reach) / SLAB_DEPTH) + margin,
+                         self.depth // SLAB_DEPTH)
+        return range(first_index, last_index + 1)
+
+    def get_slab(self, index: int) -> MazeSlab:
+        """Returns a slab, generating it if it isn't loaded."""
+        slab = self.slabs.get(index)
+        if slab is None:
+            slab = MazeSlab(self, index)
+            collected = self._collected.pop(index, None)
+            if collected:
+                slab.power_ups.column("collected")[collected] = True
+            self.slabs[index] = slab
+            self.hunters.extend(slab.hunters)
+        return slab
+
+    def parts_in(self, left: float, top: float, right: float,
+                 bottom: float, layers=None) -> list[MazeSlab]:
+        """Returns the slabs holding objects that may reach into an area.
+
+        Slabs span the whole width and height, so only `layers` matters.
+        Missing slabs are generated, so queries are always complete.
+
+        Args:
+            left, top, right, bottom: The area
+            layers: (first, last) z-layers of the area. Defaults to the
+                    loaded slabs
+        """
+        if layers is None:
+            return list(self.slabs.values())
+        return [self.get_slab(index) for index in self._slab_range(*layers)]
+
+    def update_around(self, player: Player) -> None:
+        """Loads the slabs around the player and drops the least recently visited."""
+        for index in self._slab_range(player.z, player.z, margin=LOAD_MARGIN):
+            self.get_slab(index)
+            self.slabs.move_to_end(index)
+
+        if len(self.slabs) <= MAX_SLABS:
+            return
+        while len(self.slabs) > MAX_SLABS:
+            index, slab = self.slabs.popitem(last=False)
+            collected = slab.power_ups.column("collected")
+            if collected.any():
+                self._collected[index] = collected.nonzero()[0].tolist()
+        self.hunters = [hunter for slab in self.slabs.values()
+                        for hunter in slab.hunters]
+
+    def reset(self) -> None:
+        """Drops every slab, so the next run starts from a fresh maze."""
+        self.slabs.clear()
+        self._collected.clear()
+        self.hunters.clear()
+        self.clear_lightnings()
@@ -0,0 +1,307 @@
+# entity_store.py
+"""Compact struct-of-arrays storage for the maze's static entities.
+
+Obstacles and items are kept in one typed NumPy array per component instead
+of one Python object each, which takes a few dozen bytes per entity and lets
+collision queries run over whole columns at once:
+
+    obstacles = SphereStore()
+    obstacles.add(100, 200, 5, 60)
+    obstacles.collides_with_circle(player)
+
+Indexing or iterating a store gives lightweight views that keep the APIs of
+`Sphere` and `Item` working, e.g. `obstacles[0].display(screen, z)`. Views
+read and write straight through to the arrays and are only created on
+demand, so they should not be kept around.
+"""
+
+import numpy as np
+
+from item import ITEM_TYPES, Item
+from shapes import Sphere
+
+
+def _field(name: str) -> property:
+    """A view attribute backed by the store's column `name`."""
+
+    def get(view):
+        return view._store._memory[name][view._index]
+
+    def set(view, value):
+        view._store._memory[name][view._index] = value
+
+    return property(get, set)
+
+
+class EntityStore:
+    """Entities stored as one growable array per component.
+
+    Subclasses define the components in `fields` as (name, dtype) pairs and
+    the class of the views returned when indexing.
+
+    Attributes:
+        columns: Maps each component to its array, including unused capacity.
+                 Use `column` for the entries in use
+    """
+
+    fields: tuple[tuple[str, str], ...] = ()
+    view_class = None
+
+    def __init__(self, capacity=64):
+        """Initializes an empty store.
+
+        Args:
+            capacity: Number of entities to allocate room for up front
+        """
+        self._size = 0
+        self.columns = {}
+        self._memory = {}
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        """Moves the columns to arrays with room for `capacity` entities."""
+        for name, dtype in self.fields:
+            array = np.zeros(capacity, dtype=dtype)
+            if name in self.columns:
+                array[:self._size] = self.columns[name][:self._size]
+            self.columns[name] = array
+            # memoryviews index faster than arrays and give Python scalars
+            self._memory[name] = memoryview(array)
+
+    def _reserve(self, count: int) -> int:
+        """Makes room for `count` more entities and returns the first index."""
+        start = self._size
+        capacity = len(self.columns[self.fields[0][0]])
+        if start + count > capacity:
+            self._allocate(max(start + count, capacity * 2))
+        self._size += count
+        return start
+
+    def _wrap(self, columns: dict[str, np.ndarray]) -> None:
+        """Replaces the entities with the given columns, without copying them.
+
+        Components missing from `columns` get zeroed arrays of their own.
+        Read-only columns stay read-only until the store grows, which moves
+        every column to new arrays.
+        """
+        self._size = len(next(iter(columns.values())))
+        for name, dtype in self.fields:
+            array = columns.get(name)
+            if array is None:
+                array = np.zeros(self._size, dtype=dtype)
+            self.columns[name] = array
+            self._memory[name] = memoryview(array)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int):
+        if not -self._size <= index < self._size:
+            raise IndexError("entity index out of range")
+        view = self.view_class.__new__(self.view_class)
+        view._store = self
+        view._index = index % self._size
+        return view
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield self[index]
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns the values of component `name` for every entity."""
+        return self.columns[name][:self._size]
+
+    def clear(self) -> None:
+        """Removes every entity, keeping the allocated capacity."""
+        self._size = 0
+
+    @property
+    def bytes_per_entity(self) -> int:
+        """Bytes each entity takes, summed over all components."""
+        return sum(np.dtype(dtype).itemsize for _, dtype in self.fields)
+
+
+class SphereView(Sphere):
+    """A `Sphere` whose attributes live in a `SphereStore`."""
+
+    __slots__ = ("_store", "_index")
+
+    x = _field("x")
+    y = _field("y")
+    z = _field("z")
+    radius = _field("radius")
+
+
+class SphereStore(EntityStore):
+    """Spheres, e.g. the obstacles of a maze."""
+
+    fields = (("x", "f8"), ("y", "f8"), ("z", "f8"), ("radius", "f8"))
+    view_class = SphereView
+
+    def add(self, x: float, y: float, z: float, radius: float) -> int:
+        """Adds a sphere and returns its index."""
+        index = self._reserve(1)
+        for name, value in zip(("x", "y", "z", "radius"), (x, y, z, radius)):
+            self._memory[name][index] = value
+        return index
+
+    def append(self, sphere: Sphere) -> None:
+        """Adds a copy of `sphere`."""
+        self.add(*sphere.get_parameters())
+
+    def extend(self, parameters: np.ndarray) -> None:
+        """Adds spheres from an (N, 4) array of x, y, z and radius."""
+        start = self._reserve(len(parameters))
+        for i, (name, _) in enumerate(self.fields):
+            self.columns[name][start:self._size] = parameters[:, i]
+
+    def wrap(self, parameters: np.ndarray) -> None:
+        """Uses an (N, 4) array of x, y, z and radius as the spheres, without copying.
+
+        The array may be read-only, e.g. a view into shared memory, and
+        must stay valid while the store uses it.
+        """
+        self._wrap({name: parameters[:, i] for i, (name, _) in enumerate(self.fields)})
+
+    def parameters(self) -> np.ndarray:
+        """Returns an (N, 4) array of x, y, z and radius of every sphere."""
+        return np.stack([self.column(name) for name, _ in self.fields], axis=1)
+
+    def collides_with_circle(self, other) -> bool:
+        """Checks whether any sphere collides with a circle.
+
+        Same test as `Sphere.collides_with_circle`, run over all spheres.
+
+        Args:
+            other: Circle to check collision against
+
+        Returns:
+            True if any of the spheres collides with the circle.
+        """
+        if not self._size:
+            return False
+        radius = self.column("radius")
+        z_dist = self.column("z") - other.z
+        proj_sq = radius * radius - z_dist * z_dist
+        dx = self.column("x") - other.x
+        dy = self.column("y") - other.y
+        planar = np.sqrt(dx * dx + dy * dy)
+        # proj_sq <= 0 means the sphere doesn't appear in the cross-section
+        hit = (proj_sq > 0) & (planar < np.sqrt(np.maximum(proj_sq, 0)) + other.radius)
+        return bool(hit.any())
+
+    def visible(self, from_z: float, shadow_depth=10) -> list[int]:
+        """Returns the indices of spheres whose cross-section or shadow shows.
+
+        Args:
+            from_z: The current viewing z-layer
+            shadow_depth: How far beyond its surface a sphere casts a shadow,
+                          see `Sphere.display`
+        """
+        z_dist = np.abs(self.column("z") - from_z)
+        return np.flatnonzero(
+            np.maximum(0, z_dist - shadow_depth) < self.column("radius")).tolist()
+
+
+class ItemView(Item):
+    """An `Item` whose attributes live in an `ItemStore`."""
+
+    __slots__ = ("_store", "_index")
+
+    x = _field("x")
+    y = _field("y")
+    start_z = _field("start_z")
+    end_z = _field("end_z")
+    radius = _field("radius")
+    collected = _field("collected")
+
+    @property
+    def type(self) -> str:
+        return ITEM_TYPES[self._store._memory["type"][self._index]]
+
+    @type.setter
+    def type(self, value: str) -> None:
+        self._store._memory["type"][self._index] = ITEM_TYPES.index(value)
+
+    @property
+    def color(self) -> tuple[int, int, int]:
+        return self.get_color_by_type()
+
+    @property
+    def z(self) -> float:
+        return (self.start_z + self.end_z) / 2
+
+
+class ItemStore(EntityStore):
+    """Collectable items, with their type stored as an index into `ITEM_TYPES`."""
+
+    fields = (("x", "f8"), ("y", "f8"), ("start_z", "f8"), ("end_z", "f8"),
+              ("radius", "f8"), ("type", "i1"), ("collected", "?"))
+    view_class = ItemView
+
+    def append(self, item: Item) -> None:
+        """Adds a copy of `item`."""
+        index = self._reserve(1)
+        for name, value in zip(("x", "y", "start_z", "end_z", "radius"),
+                               item.get_parameters()):
+            self._memory[name][index] = value
+        self._memory["type"][index] = ITEM_TYPES.index(item.type)
+        self._memory["collected"][index] = item.collected
+
+    def extend(self, parameters: np.ndarray, types: np.ndarray) -> None:
+        """Adds uncollected items.
+
+        Args:
+            parameters: (N, 5) x, y, start z, end z and radius of each item
+            types: (N,) index of each item's type in `ITEM_TYPES`
+        """
+        start = self._reserve(len(parameters))
+        for i, name in enumerate(("x", "y", "start_z", "end_z", "radius")):
+            self.columns[name][start:self._size] = parameters[:, i]
+        self.columns["type"][start:self._size] = types
+        self.columns["collected"][start:self._size] = False
+
+    def wrap(self, parameters: np.ndarray, types: np.ndarray) -> None:
+        """Uses the arrays of `extend` as the items, without copying them.
+
+        The arrays may be read-only, e.g. views into shared memory, and must
+        stay valid while the store uses them. Only the collected flags are
+        stored separately, all cleared.
+        """
+        columns = {name: parameters[:, i] for i, name in
+                   enumerate(("x", "y", "start_z", "end_z", "radius"))}
+        self._wrap({**columns, "type": types})
+
+    def parameters(self) -> np.ndarray:
+        """Returns an (N, 5) array of x, y, start z, end z and radius."""
+        return np.stack([self.column(name) for name, _ in self.fields[:5]], axis=1)
+
+    def reset_collected(self) -> None:
+        """Puts every item back into the maze."""
+        self.column("collected")[:] = False
+
+    def colliding(self, circle, start=0) -> list[int]:
+        """Returns the indices of uncollected items touching a circle.
+
+        Same test as `Item.check_collision`, without marking the items.
+
+        Args:
+            circle: The circle to check, e.g. the player
+            start: Only consider items from this index on
+        """
+        z = circle.z
+        x = self.column("x")[start:]
+        y = self.column("y")[start:]
+        dx = x - circle.x
+        dy = y - circle.y
+        hit = ((self.column("start_z")[start:] <= z)
+               & (z <= self.column("end_z")[start:])
+               & ~self.column("collected")[start:]
+               & (np.sqrt(dx * dx + dy * dy) < self.column("radius")[start:] + circle.radius))
+        return (np.flatnonzero(hit) + start).tolist()
+
+    def visible(self, from_z: float) -> list[int]:
+        """Returns the indices of uncollected items shown at layer `from_z`."""
+        return np.flatnonzero(
+            (self.column("start_z") <= from_z) & (from_z <= self.column("end_z"))
+            & ~self.column("collected")).tolist()
@@ -1,12 +1,79 @@
 # hunter.py
 
-from math import dist
-from random import random
+from math import dist, floor, hypot, sqrt
+import random
 import pygame
 
+from debug_log import debug
 from shapes import Circle
 from player import Player
 
+# hunters chase the player while at most this many layers away
+CHASE_Z_RANGE = 20
+
+# hunters closer than this push each other apart if at most SEPARATION_Z
+# layers apart, so they don't stack up into one blob
+SEPARATION_RADIUS = 45
+SEPARATION_Z = 2
+# strength of the push relative to the pull towards the player; two hunters
+# chasing in line settle SEPARATION_RADIUS * (1 - 1 / SEPARATION_WEIGHT) apart
+SEPARATION_WEIGHT = 3.0
+
+
+class HunterGrid:
+    """The chasing hunters' positions, bucketed into square cells.
+
+    Rebuilt once per tick in O(n). Cells are as wide as the largest distance
+    looked up, so the hunters near a point are always within the 3 x 3 cells
+    around it, and separating n hunters takes time in proportion to n rather
+    than n ** 2. Positions are copied at the rebuild, so every hunter steers
+    away from where the others were at the start of the tick, no matter in
+    which order they move.
+
+    Attributes:
+        cell_size: Width and height of a cell
+        cells: (hunter, x, y, z) of the hunters in each (column, row) cell
+    """
+
+    __slots__ = ("cell_size", "cells")
+
+    def __init__(self, radius=SEPARATION_RADIUS):
+        """Initializes an empty grid.
+
+        Args:
+            radius: Largest distance looked up
+        """
+        self.cell_size = radius
+        self.cells: dict[tuple[int, int], list[tuple]] = {}
+
+    def rebuild(self, hunters) -> None:
+        """Replaces the contents of the grid with `hunters`."""
+        cells = self.cells = {}
+        size = self.cell_size
+        for hunter in hunters:
+            x, y = hunter.x, hunter.y
+            key = (floor(x / size), floor(y / size))
+            entry = (hunter, x, y, hunter.z)
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [entry]
+            else:
+                bucket.append(entry)
+
+    def near(self, x: float, y: float) -> list[list[tuple]]:
+        """Returns the cells holding every hunter within the radius of (x, y).
+
+        Returns:
+            Up to 9 lists of (hunter, x, y, z).
+        """
+        column, row = floor(x / self.cell_size), floor(y / self.cell_size)
+        get = self.cells.get
+        return [bucket for bucket in (
+            get((column - 1, row - 1)), get((column, row - 1)), get((column + 1, row - 1)),
+            get((column - 1, row)), get((column, row)), get((column + 1, row)),
+            get((column - 1, row + 1)), get((column, row + 1)), get((column + 1, row + 1)),
+        ) if bucket is not None]
+
 
 class Hunter(Circle):
     """Represents a hunter which moves towards the player and kills them.
@@ -18,6 +85,8 @@ class Hunter(Circle):
         Also includes inherited attributes from Circle.
     """
 
+    __slots__ = ("speed", "color", "initial_location", "prev_location")
+
     def __init__(self, x: float, y: float, z: int, radius: int, speed=0.0,
                  color=(255, 119, 0)):
         """Initializes a hunter with its position, radius, speed and color.
@@ -34,29 +103,75 @@ class Hunter(Circle):
         self.speed = speed
         self.color = color
         self.initial_location = (x, y, z)
+        # location before the last simulation step, used to interpolate drawing
+        self.prev_location = (x, y, z)
 
     def z_distance_from_player(self, player: Player) -> int:
         """Returns the difference between the hunter and player's
         respective Z-coordinates."""
         return abs(self.z - player.z)
 
-    def handle_movement(self, player: Player) -> None:
-        """Handles the movement of the hunter based on where the player is."""
+    def separation(self, neighbors: HunterGrid) -> tuple[float, float]:
+        """Returns the push away from the hunters close by.
+
+        Each hunter within `SEPARATION_RADIUS` and `SEPARATION_Z` layers
+        pushes with a strength falling from 1 when touching to 0 at the
+        radius, in the direction away from it.
+
+        Args:
+            neighbors: Grid of the chasing hunters.
+        """
+        push_x = push_y = 0.0
+        x, y, z = self.x, self.y, self.z
+        for bucket in neighbors.near(x, y):
+            for other, other_x, other_y, other_z in bucket:
+                if abs(other_z - z) > SEPARATION_Z or other is self:
+                    continue
+                dx, dy = x - other_x, y - other_y
+                distance_squared = dx * dx + dy * dy
+                if 0 < distance_squared < SEPARATION_RADIUS * SEPARATION_RADIUS:
+                    distance = sqrt(distance_squared)
+                    strength = (1 - distance / SEPARATION_RADIUS) / distance
+                    push_x += dx * strength
+                    push_y += dy * strength
+        return push_x, push_y
+
+    def handle_movement(self, player: Player, rng=random, neighbors=None) -> None:
+        """Handles the movement of the hunter based on where the player is.
+
+        Args:
+            player: The player to move towards.
+            rng: Random stream for the z movement, default is `random`.
+            neighbors: Grid of the chasing hunters to keep apart from,
+                default is None to ignore the other hunters.
+        """
+        self.prev_location = (self.x, self.y, self.z)
         # Hunter moves only if they are displayed on the screen.
-        if self.z_distance_from_player(player) <= 20:
+        if self.z_distance_from_player(player) <= CHASE_Z_RANGE:
             player_location = player.get_location()[:2]
             cur_location = (self.x, self.y)
             distance_from_player = dist(player_location, cur_location)
             movement_scalar = self.speed / distance_from_player
-            self.x += (player.get_x() - self.x) * movement_scalar
-            self.y += (player.get_y() - self.y) * movement_scalar
+            move_x = (player.get_x() - self.x) * movement_scalar
+            move_y = (player.get_y() - self.y) * movement_scalar
+            if neighbors is not None:
+                # steer away from the others, never faster than `speed`
+                push_x, push_y = self.separation(neighbors)
+                move_x += push_x * SEPARATION_WEIGHT * self.speed
+                move_y += push_y * SEPARATION_WEIGHT * self.speed
+                length = hypot(move_x, move_y)
+                if length > self.speed:
+                    move_x *= self.speed / length
+                    move_y *= self.speed / length
+            self.x += move_x
+            self.y += move_y
 
             # Separate z movement from xy, and cheap non integral speed implementation.
             if self.z > player.z:
-                if random() > self.speed / 5:
+                if rng.random() > self.speed / 5:
                     self.z -= 1
             elif self.z < player.z:
-                if random() > self.speed / 5:
+                if rng.random() > self.speed / 5:
                     self.z += 1
 
     def set_location(self, location: tuple[float, float, int]) -> None:
@@ -66,30 +181,42 @@ class Hunter(Circle):
     def reset_location(self) -> None:
         """Resets the location of the hunter."""
         self.set_location(self.initial_location)
+        self.prev_location = self.initial_location
 
-    def display_hunter(self, screen: pygame.Surface, player: Player) -> None:
+    def display_hunter(self, screen: pygame.Surface, player: Player,
+                       scale=1.0, alpha=1.0, offset=(0, 0)) -> None:
         """Displays the hunter on the screen.
 
         Args:
             screen: The pygame screen where the hunter should be drawn
             player: The player.
+            scale: Size of `screen` relative to the maze. Defaults to 1.0.
+            alpha: Progress towards the next simulation step, used to
+                interpolate from the previous location. Defaults to 1.0.
+            offset: Maze position shown at the top left of `screen`.
+                Defaults to (0, 0).
         """
+        prev_x, prev_y = self.prev_location[:2]
+        x = (prev_x + (self.x - prev_x) * alpha - offset[0]) * scale
+        y = (prev_y + (self.y - prev_y) * alpha - offset[1]) * scale
+
         # Checks for difference of Z-coordinate from the player.
         z_distance_from_player = self.z_distance_from_player(player)
         if z_distance_from_player == 0:
             pygame.draw.circle(
                 screen,
                 color=self.color,
-                center=(int(self.x), int(self.y)),
-                radius=self.radius,
+                center=(int(x), int(y)),
+                radius=self.radius * scale,
             )
 
         # Fades out if not on the same Z-level as player.
         elif z_distance_from_player < 20:
             # Surface for transparency
             alpha = 224 - 2 * z_distance_from_player
+            radius = self.radius * scale
             transparent_surface = pygame.Surface(
-                (self.radius * 2, self.radius * 2), pygame.SRCALPHA
+                (radius * 2, radius * 2), pygame.SRCALPHA
             )
 
             # Draw on transparent surface
@@ -97,14 +224,13 @@ class Hunter(Circle):
                 surface=transparent_surface,
                 # Blue color with 50% transparency (alpha = 128)
                 color=(*self.color, alpha),
-                center=(self.radius, self.radius),
-                radius=self.radius,
+                center=(radius, radius),
+                radius=radius,
             )
 
             # Blit the transparent surface onto the main screen
             screen.blit(
-                transparent_surface, (self.x - self.radius,
-                                      self.y - self.radius)
+                transparent_surface, (x - radius, y - radius)
             )
 
     def check_collision(self, player: Player) -> bool:
@@ -115,11 +241,7 @@ class Hunter(Circle):
         Returns True if collides with player and False otherwise.
         """
         if super().collides_with_circle(player):
-            from main import DEBUG_MODE
-
-            if DEBUG_MODE:
-                print(
-                    f"Player collided with hunter at ({self.x}, {self.y}, {self.z})")
+            debug("hunter_collision", x=self.x, y=self.y, z=self.z)
             return True
 
         return False
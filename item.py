@@ -1,10 +1,15 @@
 # item.py
 
+import random
+
 import pygame
 
+from debug_log import debug
 from player import Player
 from shapes import Cylinder
 
+ITEM_TYPES = ("speed_boost", "dash", "teleport")
+
 
 class Item(Cylinder):
     """Represents an item within the maze that the player can collect.
@@ -17,6 +22,8 @@ class Item(Cylinder):
         Also includes inherited attributes from Cylinder.
     """
 
+    __slots__ = ("type", "color", "collected", "z")
+
     def __init__(self, x: float, y: float, start_z: int, end_z: int,
                  radius: int, type: str):
         """
@@ -46,7 +53,7 @@ class Item(Cylinder):
         }
         return colors.get(self.type, (255, 255, 255))  # Default white
 
-    def display(self, screen, player_z) -> None:
+    def display(self, screen, player_z, scale=1.0, offset=(0, 0)) -> None:
         """Displays the item on the screen.
         
         Displayed only if it is within the visible Z-layer.
@@ -56,8 +63,8 @@ class Item(Cylinder):
             pygame.draw.circle(
                 surface=screen,
                 color=self.color,
-                center=(self.x, self.y),
-                radius=int(self.radius),
+                center=((self.x - offset[0]) * scale, (self.y - offset[1]) * scale),
+                radius=int(self.radius * scale),
             )
 
     def check_collision(self, player: Player) -> bool:
@@ -81,44 +88,36 @@ class Item(Cylinder):
         planar_dist = pygame.math.Vector2(self.x - player.x, self.y - player.y).length()
         if planar_dist < (self.radius + player.radius):
             self.collected = True
-            from main import DEBUG_MODE
-
-            if DEBUG_MODE:
-                print(f"Item collected: {self.type} at ({self.x}, {self.y}, {self.z})")
+            debug("item_collected", type=self.type, x=self.x, y=self.y, z=self.z)
             return True
         return False
 
-    def apply_effect(self, player: Player, maze) -> None:
+    def apply_effect(self, player: Player, maze, rng=random) -> None:
         """Applies the item's effect to the player based on its type.
 
         Args:
             player: The player to apply the effect to.
             maze (Maze): Instance of the Maze class.
+            rng: Random stream for the effect, default is `random`.
         """
 
         # If did not collide with player, return immediately.
         if not self.collected:
             return
 
-        DEBUG = __import__("main").DEBUG_MODE
-
         if self.type == "speed_boost":
             player.apply_speed_boost()
-            if DEBUG:
-                print("Speed boost applied!")
             # The Player class handles reverting the speed after a duration
 
         elif self.type == "dash":
             # Reduces the cooldown period for dashing
             player.reduce_dash_cooldown()
-            if DEBUG:
-                print("Dash cooldown reduced!")
 
         elif self.type == "teleport":
             # Teleports the player to a random free spot
-            player.teleport(maze)
-            if DEBUG:
-                print("Teleport activated!")
+            player.teleport(maze, rng)
+
+        debug("effect_applied", type=self.type)
 
     def set_collected(self, val: bool) -> None:
         """Sets collected to the argument val."""
@@ -1,66 +1,227 @@
-import json
-from bisect import insort
+from collections import OrderedDict
 
 import pygame
 
+from assets import load_image
+from config import LEADERBOARD_BACKEND
+from score_client import RemoteScores
+from score_db import ScoreDatabase
+from score_log import ScoreLog
+
+# colors
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+GRAY = (150, 150, 150)
+CYAN = "#4FC3F7"
+
+# layout of the score lists
+LIST_TOP = 155
+ROW_HEIGHT = 40
+VISIBLE_ROWS = 10
+
+# scores fetched from the store at a time, and fetched windows kept
+FETCH_WINDOW = 50
+WINDOWS_KEPT = 16
+
+# rendered rows kept
+ROWS_KEPT = 256
+
+# rows scrolled per mouse wheel notch
+WHEEL_ROWS = 3
+
+# fraction of the remaining distance scrolled each frame
+SCROLL_EASING = 0.35
+
 
 class Leaderboard:
-    """Leaderboard that keeps track of top 10 scores in each difficulty.
+    """Leaderboard showing the best scores in each difficulty.
+
+    Scores are persisted in the background by a `ScoreLog`, by a
+    `ScoreDatabase` that keeps every run if `LEADERBOARD_BACKEND` is
+    "sqlite", or sent to a leaderboard server by `RemoteScores` if it is
+    "remote", so adding a score never waits for the disk or the network.
+
+    The score lists scroll together. Only the rows in view are drawn; their
+    scores are fetched from the store in windows of `FETCH_WINDOW` rows and
+    rendered rows are cached, so scrolling costs the same however many
+    scores are stored.
 
     Attributes:
         bg_surf: A pygame surface for the background.
+        store: Persists the scores.
         leaderboard: A dictionary storing an array of the highest scores for
         each difficulty.
-
-    Structure of leaderboard.json:
-    {
-    "easy": list[float],
-    "medium": list[float],
-    "hard": list[float],
-    "???": list[float]
-    }
+        scroll: Current scroll position in pixels.
+        target_scroll: Scroll position being moved to, in pixels.
     """
 
     def __init__(self):
         """Initializes the leaderboard.
 
-        Try loading the leaderboard from `leaderboard.json`, otherwise
-        create an empty one."""
-        self.bg_surf = pygame.image.load("graphics/leaderboard_bg.png").convert_alpha()
-        self.leaderboard = {"easy": [], "medium": [], "hard": [], "???": []}
-        try:  # Try loading leaderboard.
-            with open("leaderboard.json", "r") as f:
-                self.leaderboard = json.load(f)
-        except (ValueError, FileNotFoundError):  # Create an empty json file.
-            self.save_to_file()
-
-    def save_to_file(self) -> None:
-        """Save the current leaderboard to `leaderboard.json`"""
-        with open("leaderboard.json", "w") as f:
-            json.dump(self.leaderboard, f)
-
-    def add_score(self, difficulty: str, score: float) -> None:
+        Loads the saved scores, if there are any."""
+        self.bg_surf = load_image("graphics/leaderboard_bg.png")
+        if LEADERBOARD_BACKEND == "sqlite":
+            self.store = ScoreDatabase()
+        elif LEADERBOARD_BACKEND == "remote":
+            self.store = RemoteScores()
+        else:
+            self.store = ScoreLog()
+        self.leaderboard = self.store.scores
+        self.scroll = 0.0
+        self.target_scroll = 0
+        self._composed = None  # drawn background and titles, None when out of date
+        self._revision = self.store.revision  # of the scores in the caches
+        self._font = None
+        self._counts = {}  # scores stored per difficulty
+        self._windows = OrderedDict()  # (difficulty, window) -> scores
+        self._rows = OrderedDict()  # (difficulty, rank) -> rendered row
+
+    def add_score(self, difficulty: str, score: float, seed=None, run_seed=None) -> None:
         """Add a score to the leaderboard in the given difficulty level.
-        
+
         Increasing property will be maintained
-        
+
         Args:
             difficulty: the difficulty level
             score: the score of this run. Equal to the elapsed time from stopwatch.
+            seed: the seed of the maze, stored with the run.
+            run_seed: the seed of the run's randomness, stored with the run.
         """
-        insort(self.leaderboard[difficulty], score)  # Insert, list stays .
-        if len(self.leaderboard[difficulty]) > 10:
-            self.leaderboard[difficulty].pop()
-        self.save_to_file()
+        self.store.add(difficulty, score, seed=seed, run_seed=run_seed)
+
+    def close(self) -> None:
+        """Writes any scores still pending to disk."""
+        self.store.close()
+
+    def sync(self) -> None:
+        """Drops the caches if the scores changed since they were filled.
+
+        Scores change when one is added, or when a remote store fetched new
+        rankings; the ranks below a changed score move."""
+        if self.store.revision == self._revision:
+            return
+        self._revision = self.store.revision
+        self._composed = None
+        self._counts.clear()
+        self._windows.clear()
+        self._rows.clear()
+        self.target_scroll = min(self.target_scroll, self.max_scroll())
+
+    def count(self, difficulty: str) -> int:
+        """Returns the number of scores stored for `difficulty`."""
+        if difficulty not in self._counts:
+            self._counts[difficulty] = self.store.count(difficulty)
+        return self._counts[difficulty]
+
+    def get_score(self, difficulty: str, rank: int) -> float | None:
+        """Returns the score at `rank`, from 0, or None past the last score.
+
+        Scores are fetched from the store in windows around the rank."""
+        window = rank // FETCH_WINDOW
+        key = (difficulty, window)
+        scores = self._windows.get(key)
+        if scores is None:
+            scores = self.store.top(difficulty, FETCH_WINDOW, window * FETCH_WINDOW)
+            self._windows[key] = scores
+            if len(self._windows) > WINDOWS_KEPT:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(key)
+        index = rank - window * FETCH_WINDOW
+        return scores[index] if index < len(scores) else None
+
+    def max_scroll(self) -> int:
+        """Returns the furthest scroll position, in pixels."""
+        rows = max(self.count(difficulty) for difficulty in self.leaderboard)
+        return max(0, rows - VISIBLE_ROWS) * ROW_HEIGHT
+
+    def scroll_by(self, rows: int) -> None:
+        """Scrolls the score lists by `rows`, down if positive."""
+        self.target_scroll = min(max(self.target_scroll + rows * ROW_HEIGHT, 0),
+                                 self.max_scroll())
+
+    def handle_event(self, event: pygame.event.Event) -> None:
+        """Scrolls with the mouse wheel, the arrow keys, page up/down, home and end."""
+        self.sync()
+        if event.type == pygame.MOUSEWHEEL:
+            self.scroll_by(-event.y * WHEEL_ROWS)
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_UP:
+                self.scroll_by(-1)
+            elif event.key == pygame.K_DOWN:
+                self.scroll_by(1)
+            elif event.key == pygame.K_PAGEUP:
+                self.scroll_by(-VISIBLE_ROWS)
+            elif event.key == pygame.K_PAGEDOWN:
+                self.scroll_by(VISIBLE_ROWS)
+            elif event.key == pygame.K_HOME:
+                self.target_scroll = 0
+            elif event.key == pygame.K_END:
+                self.target_scroll = self.max_scroll()
 
     def display(self, screen: pygame.Surface) -> None:
-        """Displays the leaderboard on the given screen."""
-        # colors
-        BLACK = (0, 0, 0)
-        WHITE = (255, 255, 255)
-        GRAY = (150, 150, 150)
-        CYAN = "#4FC3F7"
+        """Displays the leaderboard on the given screen.
+
+        The background and titles are drawn once and reused until the scores
+        change; the rows in view are blitted from the row cache."""
+        self.sync()
+        if self._composed is None or self._composed.get_size() != screen.get_size():
+            self._composed = pygame.Surface(screen.get_size(), 0, screen)
+            self.draw(self._composed)
+        screen.blit(self._composed, (0, 0))
+
+        # ease towards the target, and snap once less than a pixel away
+        self.scroll += (self.target_scroll - self.scroll) * SCROLL_EASING
+        if abs(self.target_scroll - self.scroll) < 1:
+            self.scroll = float(self.target_scroll)
+        first = int(self.scroll // ROW_HEIGHT)
+        shift = self.scroll - first * ROW_HEIGHT
 
+        column_titles = self.leaderboard.keys()
+        column_spacing = screen.get_width() // len(column_titles)
+        clip = screen.get_clip()
+        screen.set_clip(pygame.Rect(0, LIST_TOP, screen.get_width(),
+                                    VISIBLE_ROWS * ROW_HEIGHT))
+        for i, column_title in enumerate(column_titles):
+            x_pos = i * column_spacing + column_spacing // 2
+            # one row more than fits, as the top row scrolls out of view
+            for j in range(VISIBLE_ROWS + 1):
+                row_surface = self.get_row(column_title, first + j)
+                if row_surface is None:
+                    break
+                screen.blit(row_surface, (x_pos - row_surface.get_width() // 2,
+                                          LIST_TOP + j * ROW_HEIGHT - shift))
+        screen.set_clip(clip)
+
+        # scroll bar, once there are more scores than fit
+        max_scroll = self.max_scroll()
+        if max_scroll:
+            height = VISIBLE_ROWS * ROW_HEIGHT
+            bar = max(height * height // (height + max_scroll), 20)
+            top = LIST_TOP + (height - bar) * self.scroll / max_scroll
+            pygame.draw.rect(screen, GRAY, (screen.get_width() - 12, top, 6, bar),
+                             border_radius=3)
+
+    def get_row(self, difficulty: str, rank: int) -> pygame.Surface | None:
+        """Returns the rendered row at `rank`, from 0, or None past the last score."""
+        key = (difficulty, rank)
+        row_surface = self._rows.get(key)
+        if row_surface is not None:
+            self._rows.move_to_end(key)
+            return row_surface
+        score = self.get_score(difficulty, rank)
+        if score is None:
+            return None
+        if self._font is None:
+            self._font = pygame.font.SysFont("comicsansms", 25)  # font for rankings
+        row_surface = self._font.render(f"{rank + 1}. {score:.2f}s", True, WHITE)
+        self._rows[key] = row_surface
+        if len(self._rows) > ROWS_KEPT:
+            self._rows.popitem(last=False)
+        return row_surface
+
+    def draw(self, screen: pygame.Surface) -> None:
+        """Draws the background and titles of the leaderboard onto the given surface."""
         # Clear screen and draw background for leaderboard.
         screen.fill(BLACK)
         screen.blit(self.bg_surf, (0, 0))
@@ -85,19 +246,10 @@ class Leaderboard:
             title_surface = entry_font.render(column_title.capitalize(), True, CYAN)
             screen.blit(title_surface, (x_pos - title_surface.get_width() // 2, 110))
 
-            if self.leaderboard[column_title]:
-                # scores
-                for j, score in enumerate(self.leaderboard[column_title]):
-                    score_surface = entry_font.render(
-                        f"{j + 1}. {score:.2f}s", True, WHITE
-                    )
-                    screen.blit(
-                        score_surface,
-                        (x_pos - score_surface.get_width() // 2, 155 + j * 40),
-                    )
-            else:
+            if not self.count(column_title):
                 # no scores
                 no_scores_surface = entry_font.render("No Scores", True, GRAY)
                 screen.blit(
-                    no_scores_surface, (x_pos - no_scores_surface.get_width() // 2, 155)
+                    no_scores_surface,
+                    (x_pos - no_scores_surface.get_width() // 2, LIST_TOP),
                 )
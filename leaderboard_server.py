@@ -0,0 +1,228 @@
+# leaderboard_server.py
+"""A leaderboard service shared by many machines, over HTTP.
+
+Runs are stored in a `ScoreDatabase`, so the service keeps every run with
+its machine, seeds and time. Start it with
+
+    python leaderboard_server.py --port 8765
+
+and set `LEADERBOARD_BACKEND = "remote"` and `LEADERBOARD_URL` in config.py
+on every machine. The service speaks just enough HTTP/1.1 for the game's
+client, with keep-alive connections:
+
+    POST /runs       {"runs": [{"difficulty": str, "score": float,
+                                "seed": int, "run_seed": int,
+                                "machine": str, "played_at": float}, ...]}
+                     -> {"accepted": int}
+    GET /rankings    -> {"revision": int, "scores": {difficulty: list[float]}}
+
+Rankings come from the database's in-memory best scores, and runs are
+written by its background thread in batches, so requests never wait for
+the disk.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+
+from debug_log import debug
+from score_db import DATABASE_PATH, ScoreDatabase
+
+DEFAULT_PORT = 8765
+
+# best scores per difficulty served in the rankings
+RANKING_DEPTH = 1000
+
+# largest request body accepted, in bytes
+MAX_BODY = 1 << 20
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+# seeds are stored as SQLite integers, which are signed 64-bit
+SEED_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+def _check(value, types: tuple[type, ...], name: str, optional=False):
+    """Returns `value` if it is one of `types`, or None and `optional`.
+
+    Raises:
+        ValueError: otherwise.
+    """
+    if value is None and optional:
+        return None
+    # bool is an int, but never a valid field
+    if isinstance(value, bool) or not isinstance(value, types):
+        raise ValueError(f"invalid {name}: {value!r}")
+    return value
+
+
+def _check_number(value, name: str, optional=False) -> float | None:
+    """Returns `value` as a finite float, or None if it is None and `optional`.
+
+    Raises:
+        ValueError: otherwise.
+    """
+    value = _check(value, (int, float), name, optional)
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except OverflowError:
+        number = math.inf
+    if not math.isfinite(number):
+        raise ValueError(f"invalid {name}: {value!r}")
+    return number
+
+
+def _check_seed(value, name: str) -> int | None:
+    """Returns `value` if it is None or an int that fits a SQLite integer.
+
+    Raises:
+        ValueError: otherwise.
+    """
+    value = _check(value, (int,), name, optional=True)
+    if value is not None and value not in SEED_RANGE:
+        raise ValueError(f"invalid {name}: {value!r}")
+    return value
+
+
+def parse_run(run) -> dict:
+    """Checks a run of a POST /runs body.
+
+    Returns:
+        The arguments of `ScoreDatabase.add` for the run.
+
+    Raises:
+        ValueError: if a field is missing or has the wrong type.
+    """
+    if not isinstance(run, dict):
+        raise ValueError(f"invalid run: {run!r}")
+    return {
+        "difficulty": _check(run.get("difficulty"), (str,), "difficulty"),
+        "score": _check_number(run.get("score"), "score"),
+        "seed": _check_seed(run.get("seed"), "seed"),
+        "run_seed": _check_seed(run.get("run_seed"), "run_seed"),
+        "machine": _check(run.get("machine"), (str,), "machine", optional=True),
+        "played_at": _check_number(run.get("played_at"), "played_at", optional=True),
+    }
+
+
+class LeaderboardServer:
+    """Serves the rankings and accepts runs from the game's clients.
+
+    Attributes:
+        db: Database the runs are stored in
+    """
+
+    def __init__(self, db: ScoreDatabase):
+        """Initializes a server storing runs in `db`."""
+        self.db = db
+        self._rankings = None  # encoded rankings
+        self._rankings_revision = -1
+
+    def rankings(self) -> bytes:
+        """Returns the encoded rankings, encoding them again only after a change."""
+        if self._rankings_revision != self.db.revision:
+            self._rankings_revision = self.db.revision
+            self._rankings = json.dumps({"revision": self.db.revision,
+                                         "scores": self.db.scores}).encode()
+        return self._rankings
+
+    def add_runs(self, body: bytes) -> bytes:
+        """Stores the runs in a POST /runs body, all of them or none.
+
+        Raises:
+            ValueError: if the body is not a valid list of runs.
+        """
+        runs = json.loads(body)
+        if not isinstance(runs, dict) or not isinstance(runs.get("runs"), list):
+            raise ValueError('expected {"runs": [...]}')
+        # check every run before storing any, so a refused batch leaves no trace
+        runs = [parse_run(run) for run in runs["runs"]]
+        for run in runs:
+            self.db.add(**run)
+        return json.dumps({"accepted": len(runs)}).encode()
+
+    def handle(self, method: str, path: str, body: bytes) -> tuple[int, bytes]:
+        """Answers a request.
+
+        Returns:
+            The status code and the response body.
+        """
+        if method == "GET" and path == "/rankings":
+            return 200, self.rankings()
+        if method == "POST" and path == "/runs":
+            try:
+                return 200, self.add_runs(body)
+            except ValueError as error:
+                return 400, json.dumps({"error": str(error)}).encode()
+        return 404, b'{"error": "not found"}'
+
+    async def serve_connection(self, reader: asyncio.StreamReader,
+                               writer: asyncio.StreamWriter) -> None:
+        """Answers the requests of one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    status, response = 413, b'{"error": "too large"}'
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        status, response = self.handle(method, path.split("?")[0], body)
+                    except Exception as error:
+                        # a bug must not look like a network error to the client,
+                        # which would send the same request again
+                        debug("leaderboard_request_failed", error=repr(error),
+                              method=method, path=path)
+                        status, response = 500, b'{"error": "internal error"}'
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(response)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    .encode("latin-1") + response)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as error:
+            debug("leaderboard_connection_error", error=str(error))
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int) -> None:
+        """Accepts connections on `host`:`port` until cancelled."""
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        debug("leaderboard_serving", host=host, port=port)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--db", default=DATABASE_PATH, help="SQLite database of the runs")
+    args = parser.parse_args()
+
+    server = LeaderboardServer(ScoreDatabase(args.db, keep=RANKING_DEPTH))
+    print(f"Serving the leaderboard on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
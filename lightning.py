@@ -13,6 +13,8 @@ def dist(a, b):
 class LightningSegment:
     """Represents an individual segment of lightning."""
 
+    __slots__ = ("start_position", "end_position", "color")
+
     def __init__(
         self,
         start: tuple[float, float],
@@ -30,9 +32,16 @@ class LightningSegment:
         self.end_position = end
         self.color = color
 
-    def display(self, surface: pygame.Surface):
-        """Display the lightning segment as a line on the given pygame surface.."""
-        pygame.draw.line(surface, self.color, self.start_position, self.end_position, 3)
+    def display(self, surface: pygame.Surface, offset=(0, 0)):
+        """Display the lightning segment as a line on the given pygame surface..
+
+        Args:
+            surface: The pygame surface to draw on.
+            offset: Maze position shown at the top left of the surface.
+        """
+        start = (self.start_position[0] - offset[0], self.start_position[1] - offset[1])
+        end = (self.end_position[0] - offset[0], self.end_position[1] - offset[1])
+        pygame.draw.line(surface, self.color, start, end, 3)
 
 
 class Lightning:
@@ -44,12 +53,14 @@ class Lightning:
         collected in a list.
     """
 
-    def __init__(self, start: list[float, float], end: list[float, float]):
+    def __init__(self, start: list[float, float], end: list[float, float],
+                 rng=random):
         """Initializes the lightning.
 
         Args:
             start: The starting position of the lightning.
             end: The ending position of the lightning.
+            rng: Random stream to shape the lightning with, default is `random`.
         """
         self.start_position = start
         self.end_position = end
@@ -74,9 +85,9 @@ class Lightning:
             # make a segment connecting it directly.
             if dist(curr_pos, end) <= 50 or total_cnt > 20:
                 color = (
-                    random.randint(224, 255),
-                    random.randint(206, 238),
-                    random.randint(16, 48),
+                    rng.randint(224, 255),
+                    rng.randint(206, 238),
+                    rng.randint(16, 48),
                 )
                 new_lightning_segment = LightningSegment(curr_pos, end, color)
                 self.lightning_segments.append(
@@ -84,12 +95,12 @@ class Lightning:
                 )
                 break
 
-            distance = random.randint(35, 65)
+            distance = rng.randint(35, 65)
 
             # Randomly generate potential segments.
             # There are always more than 1 / 3 chance of succeeding.
             while True:
-                angle = random.random() * 2 * math.pi
+                angle = rng.random() * 2 * math.pi
                 vec = [distance * math.cos(angle), distance * math.sin(angle)]
                 new_pos = curr_pos[:]
                 new_pos[0] += vec[0]
@@ -99,9 +110,9 @@ class Lightning:
                 # Terminates if a suitable new position is found.
                 if dist(curr_pos, end) > dist(new_pos, end):
                     color = (
-                        random.randint(224, 255),
-                        random.randint(206, 238),
-                        random.randint(16, 48),
+                        rng.randint(224, 255),
+                        rng.randint(206, 238),
+                        rng.randint(16, 48),
                     )
                     new_lightning_segment = LightningSegment(curr_pos, new_pos, color)
                     self.lightning_segments.append(
@@ -113,20 +124,21 @@ class Lightning:
                     break
 
             # Increments the time for which this segment should start displaying.
-            curr_time += random.randint(0, 2)
+            curr_time += rng.randint(0, 2)
 
-    def display(self, surface: pygame.Surface):
+    def display(self, surface: pygame.Surface, offset=(0, 0)):
         """Display the lightning onto the given surface.
 
         Args:
             surface: The pygame surface to draw the lightning on.
+            offset: Maze position shown at the top left of the surface.
         """
         for lightning_segment in self.lightning_segments:
             time_range = lightning_segment[1]
 
             # Displays only if in correct time range.
             if time_range[0] <= self.time <= time_range[1]:
-                lightning_segment[0].display(surface)
+                lightning_segment[0].display(surface, offset)
 
         # Increments time.
         # Only advances if called. This will be paused when the game is paused.
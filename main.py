@@ -1,383 +1,100 @@
+import argparse
 import atexit
 import math
-import random
-from random import randint
+import os
 import sys
+import time
+
+# taken before the heavy imports, as the start of the time to first frame
+LAUNCH_TIME = time.perf_counter()
 
 import pygame
 
-from hunter import Hunter
-from item import Item
+from assets import load_image
+from chunked_maze import ChunkedMaze
+from config import DEBUG_MODE, HEIGHT, TICK_RATE, WIDTH
+from debug_log import debug
+from deep_maze import DeepMaze
 from leaderboard import Leaderboard
-from lightning import Lightning
-from player import Player
-from shapes import Circle, Sphere
+from maze import Maze
+from perf_hud import PerfHud
+from player import Player, PlayerInput
+from render_scale import RenderScaler
+from replay import InputRecorder, Replay
+from simulation import World
 from stopwatch import Stopwatch
+from telemetry import TelemetryRecorder
+from tracing import FrameProfiler, span, tracer, traced
 
-# dimensions of the window
-WIDTH = 1200
-HEIGHT = 600
-Z_LAYERS = 200  # inclusive interval [0,200]
+# set MAZESLICE_HEADLESS=1 to run without a window, e.g. for benchmarks on
+# machines without a display. Everything is rendered to an offscreen surface.
+HEADLESS = os.environ.get("MAZESLICE_HEADLESS", "0") != "0"
+if HEADLESS:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
 
-# initialize Pygame
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("MazeSlice")
 clock = pygame.time.Clock()
 
-# set this to true for debug print statements and debug display on the screen
-DEBUG_MODE = False
-
-
-@atexit.register
-def cleanup_pygame():
-    """Cleanup Pygame on exit.
+# internal resolution of the maze relative to the window, and whether it is
+# lowered automatically when frames take longer than the 60 fps budget
+RENDER_SCALE = 1.0
+DYNAMIC_RESOLUTION = True
 
-    Ensures that pygame always closes properly no matter how
-    the program ends
-    """
-    pygame.quit()
+# frames are rendered at most this often, independent of TICK_RATE
+MAX_FPS = 60
+# ticks simulated at most per frame, so a slow frame can't snowball
+MAX_TICKS_PER_FRAME = 5
 
+# (columns, rows) of window sized chunks for mazes larger than the window
+# that scroll with the player, e.g. (32, 4). None for single screen mazes
+WORLD_CHUNKS = None
 
-class StartLocation(Circle):
-    """A starting location for the player.
+# deepest layer of single screen mazes that are generated in slabs as the
+# player descends, e.g. 10_000 or deep_maze.ENDLESS_DEPTH. None for mazes of
+# Z_LAYERS layers
+WORLD_DEPTH = None
 
-    Attributes:
-        surf: A pygame surface for the start location image
-        angle: The current angle of rotation for the start location image
-    Notes:
-        Also includes inherited attributes from Circle
-    """
+# show frame timings from the start, the overlay is toggled in game with F3
+SHOW_PERF_HUD = False
 
-    def __init__(self, x: float, y: float, z: int, radius: int):
-        """Initializes the start location with its position and radius.
+# every run's input is saved here, so it can be replayed with `replay.py`
+RECORD_REPLAYS = True
+REPLAY_DIR = "replays"
 
-        Args:
-            x: The x-coordinate of the start location
-            y: The y-coordinate of the start location
-            z: The z-coordinate for depth or layering
-            radius: The radius of the circle representing the start location
-        """
-        super().__init__(x, y, z, radius)
-        self.surf = pygame.image.load(
-            "graphics/maze/start_location.png"
-        ).convert_alpha()
-        self.angle = 0
+# samples of every tick of a run are saved to telemetry.TELEMETRY_DIR, for
+# looking into stutters and deaths with `telemetry.py`
+RECORD_TELEMETRY = True
 
-    def display(self, screen, from_z, color=(0, 0, 255)) -> None:
-        """Displays the starting location on the screen.
 
-        Args:
-            screen: The pygame screen where the start location should be drawn
-            from_z: The z-coordinate to check if the start location should be displayed
-            color: Color of start location. Defaults to blue (0, 0, 255)
-        """
-        if self.z == from_z:
-            rotated_surf = pygame.transform.rotate(self.surf, self.angle)
-            start_rect = rotated_surf.get_rect(center=(self.x, self.y))
-            screen.blit(rotated_surf, start_rect)
+def init_pygame(window=True) -> pygame.Surface | None:
+    """Initializes the parts of pygame the game uses.
 
-    def rotate(self) -> None:
-        """Rotates the start location image by a small increment."""
-        self.angle += 0.2
+    Only the display, which also handles events, and the font module are
+    started. Audio, joysticks and the other subsystems that `pygame.init`
+    would open are never used, so they are left alone. Safe to call again.
 
+    Args:
+        window: Whether to open the game window if it isn't open yet
 
-class EndLocation(Circle):
-    """An end location that the player tries to reach.
-
-    Attributes:
-        surf: A pygame surface for the end location image
-    Notes:
-        Also includes inherited attributes from Circle
+    Returns:
+        The window surface, or None without a window.
     """
+    pygame.display.init()
+    pygame.font.init()
+    if window and pygame.display.get_surface() is None:
+        pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("MazeSlice")
+    return pygame.display.get_surface()
 
-    def __init__(self, x: float, y: float, z: int, radius: int):
-        """Initializes the end location with its position and radius.
-
-        Args:
-            x: The x-coordinate of the end location
-            y: The y-coordinate of the end location
-            z: The z-coordinate for depth or layering
-            radius: The radius of the circle representing the end location
-        """
-        super().__init__(x, y, z, radius)
-        self.surf = pygame.image.load(
-            "graphics/maze/end_location.png"
-        ).convert_alpha()
-
-    # @override
-    def display(self, screen, from_z, color=(0, 0, 255)) -> None:
-        """Displays the end location on the screen.
 
-        Args:
-            screen: The pygame screen to draw the end location on.
-            from_z: The z-coordinate to check if the end location should be displayed
-            color: Color of end location. Defaults to blue (0, 0, 255)
-        """
-        if self.z == from_z:
-            end_rect = self.surf.get_rect(center=(self.x, self.y))
-            screen.blit(self.surf, end_rect)
-
-
-class Maze:
-    """A maze with a specific difficulty.
+@atexit.register
+def cleanup_pygame():
+    """Cleanup Pygame on exit.
 
-    Attributes:
-        start_location: The spawn point of the player
-        end_location: The end point of the maze
-        obstacles: A list of obstacles in the maze
-        power_ups: A list of power-up items in the maze
-        hunters: A list of hunters in the maze
-        lightnings: A list of lightnings in the maze to display
-        difficulty: The difficulty of the maze
+    Ensures that pygame always closes properly no matter how
+    the program ends
     """
-
-    def __init__(self, difficulty: str):
-        """Initialize a maze with a specific difficulty.
-
-        Args:
-            difficulty: The difficulty of the maze
-        """
-        margin = 50
-        self.start_location = StartLocation(margin, margin, 0, 25)
-        self.end_location = EndLocation(
-            WIDTH - margin, HEIGHT - margin, Z_LAYERS, 25)
-
-        # generate objects inside the maze based on difficulty
-        self.difficulty = difficulty
-        self.obstacles: list[Sphere] = []
-        self.power_ups: list[Item] = []
-        self.hunters: list[Hunter] = []
-        self.lightnings: list[Lightning] = []
-
-        if difficulty == "easy":
-            self.generate_maze_obstacles(90, 50, 90)
-            self.generate_maze_items(75)
-        elif difficulty == "medium":
-            self.generate_maze_obstacles(110, 50, 90)
-            self.generate_maze_items(75)
-            self.generate_maze_hunters(3)
-        elif difficulty == "hard":
-            self.generate_maze_obstacles(120, 50, 90)
-            self.generate_maze_items(75)
-            self.generate_maze_hunters(6)
-        elif difficulty == "???":
-            self.generate_maze_obstacles(0, 50, 90)
-            self.generate_maze_items(100)
-            self.generate_maze_hunters(200)
-
-    def generate_maze_obstacles(self, num_obstacles: int, r_min: int,
-                                r_max: int) -> None:
-        """
-        Fill up `self.obstacles` with randomized obstacles.
-
-        Args:
-            num_obstacles: Number of obstacles to generate
-            r_min: Minimum radius of obstacles
-            r_max: Maximum radius of obstacles
-        """
-        while len(self.obstacles) < num_obstacles:
-            x = randint(0, WIDTH)
-            y = randint(0, HEIGHT)
-            z = randint(0, Z_LAYERS)
-            radius = randint(r_min, r_max)
-            obst = Sphere(x, y, z, radius)
-            if not obst.collides_with_circle(
-                    self.start_location
-            ) and not obst.collides_with_circle(self.end_location):
-                self.obstacles.append(obst)
-                if DEBUG_MODE:
-                    print(
-                        f"Generated obstacle at ({x}, {y}, {z}) with radius {radius}")
-
-    def generate_maze_items(self, num_items: int) -> None:
-        """Fill up `self.power_ups` with randomized items.
-
-        Args:
-            num_items: Number of items to generate
-        """
-        item_types = [
-            "speed_boost",
-            "dash",
-            "teleport",
-        ]
-        while len(self.power_ups) < num_items:
-            x = randint(20, WIDTH - 20)
-            y = randint(20, HEIGHT - 20)
-
-            # -5 so items spawn more often on z = 0
-            z = randint(-5, Z_LAYERS - 5)
-            radius = 11
-            item_type = random.choice(item_types)
-            item = Item(x, y, z, z + 15, radius, item_type)
-
-            # ensure items do not overlap with start/end locations or obstacles
-            if item.collides_with_circle(self.start_location):
-                continue
-            elif item.collides_with_circle(self.end_location):
-                continue
-            elif any(obst.collides_with_circle(item) for obst in self.obstacles):
-                continue
-            self.power_ups.append(item)
-            if DEBUG_MODE:
-                print(f"Generated item: {item_type} at ({x}, {y}, {z})")
-
-    def generate_maze_hunters(self, num_hunters: int) -> None:
-        """Generate randomized hunters on the maze.
-
-        Args:
-            num_hunters: Number of hunters to generate
-        """
-        for _ in range(num_hunters):
-            x = randint(20, WIDTH - 20)  # random location and speed
-            y = randint(20, HEIGHT - 20)
-            z = randint(21, Z_LAYERS)
-            radius = randint(12, 18)
-            speed = randint(50, 200) / 100
-            hunter = Hunter(x, y, z, radius, speed)
-            if DEBUG_MODE:
-                print(f"Generated hunter at ({x}, {y}, {z})")
-            self.hunters.append(hunter)
-
-    def display_obstacles(self, player_z: int) -> None:
-        """Displays 3D obstacles as a 2D cross-section.
-
-        Args:
-            player_z: The z-coordinate of the player to determine which
-                      obstacles are visible
-        """
-        for obst in self.obstacles:
-            obst.display(screen, player_z)
-
-    def display_items(self, player_z: int) -> None:
-        """Displays items in the maze based on player's Z-layer.
-
-        Args:
-            player_z: The z-coordinate of the player to determine which
-                      items are visible
-        """
-        for item in self.power_ups:
-            item.display(screen, player_z)
-
-    def display_hunters(self, player: Player) -> None:
-        """Displays hunters in the maze based on the player's Z-layer.
-
-        Args:
-            player: Player object used to determine the visibility of hunters
-        """
-        for hunter in self.hunters:
-            hunter.display_hunter(screen, player)
-
-    def display_start_end(self, from_z: int) -> None:
-        """Display the start and end locations of the maze.
-
-        Args:
-            from_z: The z-coordinate to determine which locations are visible
-        """
-        self.start_location.display(screen, from_z, (255, 255, 0))
-        self.end_location.display(screen, from_z, (255, 255, 0))
-
-    def display_lightnings(self) -> None:
-        """Display the lightnings of the maze."""
-        for lightning in self.lightnings:
-            lightning.display(screen)
-
-        # get rid of unused lightnings.
-        for i in range(len(self.lightnings) - 1, -1, -1):
-            if not self.lightnings[i].check_used():
-                self.lightnings.pop(i)
-
-    def collect_items(self, player: Player) -> None:
-        """Collect items that the player collides with.
-
-        Args:
-            player: The player object to check collisions and apply item effects
-        """
-        old_location = player.get_location()[:2]
-        teleported = False
-
-        for item in self.power_ups:
-            if item.check_collision(player):
-                # If teleport, make lightning object
-                if item.type == "teleport":
-                    teleported = True
-
-                item.apply_effect(player, maze=self)
-
-        if teleported:
-            new_location = player.get_location()[:2]
-            self.lightnings.append(
-                Lightning(old_location, new_location))
-
-    def move_hunters(self, player: Player) -> None:
-        """Update the position of the hunters based on the player's position.
-
-        Args:
-            player: The player object used to update hunter movements
-        """
-        for hunter in self.hunters:
-            hunter.handle_movement(player)
-
-    def collide_hunters(self, player: Player) -> bool:
-        """Check if the player collides with any of the hunters.
-
-        Args:
-            player: The player object to check for collisions with hunters
-
-        Returns:
-            True if the player collides with any hunter, otherwise False
-        """
-        for hunter in self.hunters:
-            if hunter.check_collision(player):
-                return True
-        return False
-
-    def is_move_allowed(self, player: Player) -> bool:
-        """Check if a player can be at a certain position in the maze.
-
-        Args:
-            player: The player object to check for collisions with obstacles
-
-        Returns:
-            True if the move is allowed, otherwise False
-        """
-        # check collisions with obstacles
-        char_circle = Circle(*player.get_parameters())
-        for obst in self.obstacles:
-            if obst.collides_with_circle(char_circle):
-                return False
-
-        # Check collision with map boundaries
-        cx, cy, cz, r = player.get_parameters()
-        if (cx < r
-                or cx > WIDTH - r
-                or cy < r
-                or cy > HEIGHT - r
-                or cz < 0
-                or cz > Z_LAYERS):
-            return False
-
-        return True
-
-    def get_start_location(self) -> StartLocation:
-        """Returns the start location of the maze."""
-        return self.start_location
-
-    def get_end_location(self) -> EndLocation:
-        """Returns the end location of the maze."""
-        return self.end_location
-
-    def get_power_ups(self) -> list[Item]:
-        """Return a list of all power ups in the maze."""
-        return self.power_ups
-
-    def get_hunters(self) -> list[Hunter]:
-        """Return a list of all hunters in the maze."""
-        return self.hunters
-
-    def clear_lightnings(self) -> None:
-        """Remove teleport lightning effects"""
-        self.lightnings.clear()
+    pygame.quit()
 
 
 class GameController:
@@ -386,47 +103,81 @@ class GameController:
     Attributes:
         temp_state: Temporary variable to track previous state
         game_state: Current state of the game
-        maze: The current maze instance in the game
-        player: The current player instance in the game
+        world: The current run, holding the maze and the player
         game_events: Events in the current frame
         leaderboard: Current leaderboard
-        stopwatch: Stopwatch for the current game
         main_menu_surf: pygame surface for the main menu display
         pause_menu_surf: pygame surface for the pause menu display
         help_menu_surf: pygame surface for the help menu display
         loser_menu: pygame surface for the loser menu display
         winner_menu: pygame surface for the winner menu display
+        screen: pygame surface that every frame is rendered to
+        render_scaler: Picks the internal resolution the maze is drawn at
+        frame_time: Real time in seconds taken by the last frame
+        tick_accumulator: Real time in seconds not yet simulated
+        recorder: Records the input of the current run, if enabled
+        replay: The replay being watched instead of playing, if any
+        playback: Yields the replay's input for each tick
+        speed: Simulation time that passes per real second
+        camera_offset: Maze position shown at the top left of the window
+        time_to_first_frame: Seconds from launch until the first frame was
+                             shown, None before that
+        perf_hud: Overlay with frame timings, toggled with F3
+        profiler: Profiles the next frames with cProfile after F5
+        debug_grid: Coordinate grid drawn in debug mode, built on first use
     """
 
-    def __init__(self):
+    def __init__(self, screen: pygame.Surface | None = None):
         """Initializes the GameController to start a game.
 
-        Initializes all game variables except `player` and `maze` which
-        will be initialized when the difficulty is selected.
+        Initializes all game variables except `world` which will be
+        initialized when the difficulty is selected.
+
+        Opens the window on first use.
+
+        Args:
+            screen: Surface to render to. Defaults to the window surface,
+                    pass an offscreen surface to render without a display.
         """
+        window = init_pygame(window=screen is None)
+        self.screen = screen if screen is not None else window
         self.temp_state = "menu"  # temporary variable for exiting help menu
         self.game_state = "menu"
-        self.maze = None
-        self.player = None
+        self.world = None
         self.game_events = pygame.event.get()
-        self.leaderboard = Leaderboard()
-        self.stopwatch = Stopwatch(precision=2)
+        self.leaderboard = getattr(self, "leaderboard", None) or Leaderboard()
+        self.frame_time = 1 / TICK_RATE
+        self.tick_accumulator = 0.0
+        self.render_scaler = RenderScaler(RENDER_SCALE, DYNAMIC_RESOLUTION)
+        self.recorder = None
+        self.replay = None
+        self.playback = None
+        self.speed = 1.0
+        self.camera_offset = (0, 0)
+        # kept when the game is reset to the menu
+        self.time_to_first_frame = getattr(self, "time_to_first_frame", None)
+        self.perf_hud = getattr(self, "perf_hud", None) or PerfHud(SHOW_PERF_HUD)
+        self.profiler = getattr(self, "profiler", None) or FrameProfiler()
+        self.telemetry = getattr(self, "telemetry", None)
+        if self.telemetry is None and RECORD_TELEMETRY:
+            self.telemetry = TelemetryRecorder()
+        self.debug_grid = None
 
         # surfaces for display
-        self.main_menu_surf = pygame.image.load(
-            "graphics/main_menu.png").convert_alpha()
-        self.pause_menu_surf = pygame.image.load(
-            "graphics/pause_menu.png").convert_alpha()
-        self.help_menu_surf = pygame.image.load(
-            "graphics/help_menu.png").convert_alpha()
-        self.loser_menu = pygame.image.load(
-            "graphics/loser_menu.png").convert_alpha()
-        self.winner_menu = pygame.image.load(
-            "graphics/winner_menu.png").convert_alpha()
-
-    def play(self) -> None:
-        """Main loop of the game."""
-        while True:
+        self.main_menu_surf = load_image("graphics/main_menu.png")
+        self.pause_menu_surf = load_image("graphics/pause_menu.png")
+        self.help_menu_surf = load_image("graphics/help_menu.png")
+        self.loser_menu = load_image("graphics/loser_menu.png")
+        self.winner_menu = load_image("graphics/winner_menu.png")
+
+    def play(self, frames=None) -> None:
+        """Main loop of the game.
+
+        Args:
+            frames: Number of frames to show before returning. Defaults to
+                    running until the window is closed
+        """
+        while frames is None or frames > 0:
             self.game_events = pygame.event.get()
 
             # check if player wants to exit game
@@ -434,60 +185,188 @@ class GameController:
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     sys.exit()
-
-            if self.game_state == "menu":
-                self.perform_menu_frame_actions()
-            elif self.game_state == "help_menu":
-                self.perform_help_menu_frame_actions()
-            elif self.game_state == "leaderboard":
-                self.perform_leaderboard_frame_actions()
-            elif self.game_state == "playing":
-                self.perform_playing_frame_actions()
-            elif self.game_state == "paused":
-                self.perform_paused_frame_actions()
-            elif self.game_state == "winner":
-                self.perform_winner_frame_actions()
-            elif self.game_state == "loser":
-                self.perform_loser_frame_actions()
-
-            if DEBUG_MODE:
-                self.run_debug()
-
-            pygame.display.flip()
-            clock.tick(60)  # 60 fps
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_F3:
+                        self.perf_hud.toggle()
+                    elif event.key == pygame.K_F4 and tracer is not None:
+                        tracer.export()
+                    elif event.key == pygame.K_F5:
+                        self.profiler.request()
+
+            with self.profiler, span("game.frame"):
+                self.perform_frame_actions()
+                if self.perf_hud.enabled:
+                    self.perf_hud.display(self.screen)
+
+                with self.perf_hud.phase_timer("flip"), span("display.flip"):
+                    pygame.display.flip()
+            if self.time_to_first_frame is None:
+                self.time_to_first_frame = time.perf_counter() - LAUNCH_TIME
+                debug("first_frame", seconds=self.time_to_first_frame)
+            if frames is not None:
+                frames -= 1
+            self.frame_time = clock.tick(MAX_FPS) / 1000
+            self.render_scaler.record_frame_time(clock.get_rawtime())
+            self.perf_hud.end_frame(clock.get_rawtime(), clock.get_fps(),
+                                    self.frame_counts())
+
+    def frame_counts(self) -> dict[str, int]:
+        """Returns the counts shown by the performance overlay.
+
+        Resets the maze's collision query count for the next frame.
+        """
+        if self.world is None:
+            return {}
+        counts = {
+            "collision queries": self.maze.collision_queries,
+            "obstacles drawn": self.maze.obstacles_drawn,
+            "items drawn": self.maze.items_drawn,
+            "hunters": len(self.maze.hunters),
+        }
+        self.maze.collision_queries = 0
+        return counts
+
+    def perform_frame_actions(self) -> None:
+        """Updates and renders a single frame for the current game state.
+
+        Uses the events in `game_events` and draws to `screen`, so frames can
+        also be driven without the main loop, e.g. in headless mode.
+        """
+        if self.game_state == "menu":
+            self.perform_menu_frame_actions()
+        elif self.game_state == "help_menu":
+            self.perform_help_menu_frame_actions()
+        elif self.game_state == "leaderboard":
+            self.perform_leaderboard_frame_actions()
+        elif self.game_state == "playing":
+            self.perform_playing_frame_actions()
+        elif self.game_state == "paused":
+            self.perform_paused_frame_actions()
+        elif self.game_state == "winner":
+            self.perform_winner_frame_actions()
+        elif self.game_state == "loser":
+            self.perform_loser_frame_actions()
+
+        if DEBUG_MODE:
+            self.run_debug()
 
     def start_game(self, difficulty: str) -> None:
         """Start a game with the selected difficulty."""
-        self.maze = Maze(difficulty)
-        self.player = Player(*self.maze.get_start_location().get_location())
+        if WORLD_CHUNKS:
+            maze = ChunkedMaze(difficulty, chunks=WORLD_CHUNKS)
+        elif WORLD_DEPTH:
+            maze = DeepMaze(difficulty, depth=WORLD_DEPTH)
+        else:
+            maze = Maze(difficulty)
+        self.world = World(maze)
+        self.start_run()
+
+    def start_run(self) -> None:
+        """Starts playing the current world, recording it if enabled."""
+        if RECORD_REPLAYS:
+            self.recorder = InputRecorder(self.maze.difficulty,
+                                          self.maze.seed, self.world.seed,
+                                          chunks=WORLD_CHUNKS, depth=self.maze.depth)
+        if self.telemetry is not None:
+            self.telemetry.start_run(f"{int(time.time())}-{self.world.seed:08x}",
+                                     difficulty=self.maze.difficulty,
+                                     maze_seed=self.maze.seed, run_seed=self.world.seed,
+                                     tick_rate=TICK_RATE)
         self.game_state = "playing"
-        self.stopwatch.start()
+        self.tick_accumulator = 0.0
+
+    def watch_replay(self, replay: Replay, speed=1.0) -> None:
+        """Plays back a recorded run instead of reading the keyboard.
+
+        Args:
+            replay: The run to play back
+            speed: Playback speed, e.g. 4 for four times as fast
+        """
+        self.world = replay.new_world()
+        self.replay = replay
+        self.playback = replay.inputs()
+        self.speed = speed
+        self.game_state = "playing"
+        self.tick_accumulator = 0.0
+
+    def save_recording(self) -> None:
+        """Saves the current run's recording, if any, to `REPLAY_DIR`, and
+        finishes its telemetry."""
+        if self.telemetry is not None and self.world is not None:
+            self.telemetry.end_run(self.world.state)
+        if self.recorder is None:
+            return
+        if self.recorder.ticks:
+            self.recorder.finish(self.world.state,
+                                 self.stopwatch.get_elapsed_time())
+            self.recorder.save(os.path.join(
+                REPLAY_DIR, f"{int(time.time())}-{self.recorder.run_seed:08x}.mzr"))
+        self.recorder = None
+
+    @property
+    def maze(self) -> Maze:
+        """The maze of the current game."""
+        return self.world.maze
+
+    @property
+    def player(self) -> Player:
+        """The player of the current game."""
+        return self.world.player
+
+    @property
+    def stopwatch(self) -> Stopwatch:
+        """The stopwatch timing the current game."""
+        return self.world.stopwatch
 
     def pause_game(self) -> None:
         """Pause the current game."""
         self.stopwatch.pause()
+        if self.recorder is not None:
+            self.recorder.record_pause()
         self.game_state = "paused"
 
     def resume_game(self) -> None:
         """Resume the currently paused game."""
         self.stopwatch.start()
         self.game_state = "playing"
+        self.tick_accumulator = 0.0
 
-    def display_playing_objects(self) -> None:
-        """Display all objects on the map."""
+    @traced("display.playing_objects")
+    def display_playing_objects(self, alpha=1.0) -> None:
+        """Display all objects on the map.
+
+        Args:
+            alpha: Progress towards the next tick, used to interpolate the
+                   positions of moving objects
+        """
         if self.game_state != "paused":
             self.maze.start_location.rotate()
-        self.maze.display_start_end(self.player.get_z())
-        self.maze.display_obstacles(self.player.get_z())
-        self.maze.display_items(self.player.get_z())
-        self.maze.display_hunters(self.player)
-        self.player.display_player()
-        self.stopwatch.display(screen)
 
+        # the maze may be drawn at a lower resolution and upscaled
+        scale = self.render_scaler.scale
+        # the camera follows the player in mazes larger than the window
+        self.camera_offset = self.maze.get_view(
+            self.player.get_interpolated_location(alpha))[:2]
+        offset = self.camera_offset
+        phase = self.perf_hud.phase_timer
+        maze_surf = self.render_scaler.begin_frame(self.screen)
+        self.maze.display_start_end(maze_surf, self.player.get_z(), scale, offset)
+        with phase("draw obstacles"):
+            self.maze.display_obstacles(maze_surf, self.player.get_z(), scale, offset)
+        with phase("draw items"):
+            self.maze.display_items(maze_surf, self.player.get_z(), scale, offset)
+        with phase("draw hunters"):
+            self.maze.display_hunters(maze_surf, self.player, scale, alpha, offset)
+        self.render_scaler.present(maze_surf, self.screen)
+
+        self.player.display_player(self.screen, alpha, offset)
+        self.stopwatch.display(self.screen)
+
+    @traced("state.menu")
     def perform_menu_frame_actions(self) -> None:
         """Performs actions for when the menu is on."""
-        screen.fill((0, 0, 0))
-        screen.blit(self.main_menu_surf, (0, 0))  # display menu
+        self.screen.fill((0, 0, 0))
+        self.screen.blit(self.main_menu_surf, (0, 0))  # display menu
 
         # check for interactions with menu
         for event in self.game_events:
@@ -516,10 +395,11 @@ class GameController:
                     self.temp_state = self.game_state
                     self.game_state = "help_menu"
 
+    @traced("state.help_menu")
     def perform_help_menu_frame_actions(self) -> None:
         """Performs actions for when the help_menu is on."""
-        screen.fill((0, 0, 0))
-        screen.blit(self.help_menu_surf, (0, 0))  # display menu
+        self.screen.fill((0, 0, 0))
+        self.screen.blit(self.help_menu_surf, (0, 0))  # display menu
 
         # check if player wants to exit help menu
         for event in self.game_events:
@@ -529,22 +409,25 @@ class GameController:
                 if 1124 <= x <= 1180 and 19 <= y <= 69:
                     self.game_state = self.temp_state
 
+    @traced("state.leaderboard")
     def perform_leaderboard_frame_actions(self) -> None:
         """Performs actions for when the player is viewing the leaderboard."""
         # display leaderboard
-        screen.fill((0, 0, 0))
-        self.leaderboard.display(screen)
+        self.screen.fill((0, 0, 0))
+        self.leaderboard.display(self.screen)
 
-        # check if the player wants to exit leaderboard
+        # scroll the scores, and check if the player wants to exit leaderboard
         for event in self.game_events:
+            self.leaderboard.handle_event(event)
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 x, y = pygame.mouse.get_pos()
                 if 1124 <= x <= 1180 and 19 <= y <= 69:
                     self.game_state = "menu"  # return to menu
 
+    @traced("state.playing")
     def perform_playing_frame_actions(self) -> None:
         """Performs actions for when the player is in a game."""
-        screen.fill((0, 0, 0))
+        self.screen.fill((0, 0, 0))
 
         # check player actions for pausing
         for event in self.game_events:
@@ -552,25 +435,53 @@ class GameController:
                 if event.key == pygame.K_p:
                     self.pause_game()
 
-        # handle player movement with collisions
-        self.player.handle_movement(self.maze)
-        self.maze.collect_items(self.player)
-        self.maze.move_hunters(self.player)
+        # catch the simulation up with the time that has passed
+        self.world.phase_timer = self.perf_hud.phase_timer
+        self.tick_accumulator += self.frame_time * self.speed
+        ticks = 0
+        while (self.tick_accumulator >= 1 / TICK_RATE
+               and self.game_state == "playing"):
+            self.tick_accumulator -= 1 / TICK_RATE
+            self.perform_playing_tick()
+            ticks += 1
+            if ticks == MAX_TICKS_PER_FRAME * max(1, math.ceil(self.speed)):
+                self.tick_accumulator = 0.0  # drop time we can't catch up on
+                break
 
         # display objects and effects
-        self.display_playing_objects()
+        self.display_playing_objects(self.tick_accumulator * TICK_RATE)
         self.display_active_effects()
 
+    @traced("world.tick")
+    def perform_playing_tick(self) -> None:
+        """Advances the game by one fixed simulation step."""
+        if self.playback is not None:
+            inputs = next(self.playback, None)
+            if inputs is None:  # the recorded run was abandoned here
+                self.pause_game()
+                return
+        else:
+            inputs = PlayerInput.from_keys(pygame.key.get_pressed())
+            if self.recorder is not None:
+                self.recorder.record(inputs)
+        state = self.world.step(inputs, 1 / TICK_RATE)
+        if self.telemetry is not None and self.telemetry.recording:
+            self.telemetry.record(self.world, self.frame_time)
+
         # check if we won/lost the game
-        if self.check_win_condition():
+        if state != "playing":
+            self.save_recording()
+        if state == "won":
             self.game_state = "winner"
-            self.stopwatch.pause()
-            self.leaderboard.add_score(
-                self.maze.difficulty, self.stopwatch.get_elapsed_time()
-            )
-        if self.check_lose_condition():
+            if self.replay is None:
+                self.leaderboard.add_score(
+                    self.maze.difficulty, self.stopwatch.get_elapsed_time(),
+                    seed=self.maze.seed, run_seed=self.world.seed,
+                )
+        elif state == "lost":
             self.game_state = "loser"
 
+    @traced("state.paused")
     def perform_paused_frame_actions(self) -> None:
         """Performs actions for when the game is paused."""
 
@@ -578,19 +489,17 @@ class GameController:
         self.display_playing_objects()
 
         # display pause menu on top of a shaded background
-        overlay_surf = pygame.Surface((screen.get_width(), screen.get_height()),
-                                      pygame.SRCALPHA)
+        overlay_surf = pygame.Surface(self.screen.get_size(), pygame.SRCALPHA)
         # black with 128 alpha for background
         overlay_surf.fill((0, 0, 0, 128))
-        screen.blit(overlay_surf, (0, 0))
-        screen.blit(self.pause_menu_surf, (0, 0))
+        self.screen.blit(overlay_surf, (0, 0))
+        self.screen.blit(self.pause_menu_surf, (0, 0))
 
         # check if any of the buttons are pressed
         for event in self.game_events:
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 x, y = pygame.mouse.get_pos()
-                if DEBUG_MODE:
-                    print(x, y)
+                debug("click", x=x, y=y)
                 if 416 <= x <= 735:
                     if 177 <= y <= 248:  # resume
                         self.resume_game()
@@ -606,10 +515,11 @@ class GameController:
                 if not (390 <= x <= 760 and 105 <= y <= 524):
                     self.resume_game()
 
+    @traced("state.winner")
     def perform_winner_frame_actions(self) -> None:
         """Performs actions for when the player won."""
-        screen.fill((0, 0, 0))
-        screen.blit(self.winner_menu, (0, 0))  # display menu
+        self.screen.fill((0, 0, 0))
+        self.screen.blit(self.winner_menu, (0, 0))  # display menu
 
         # display score
         end_time = self.stopwatch.get_elapsed_time()
@@ -625,10 +535,11 @@ class GameController:
                     elif 384 <= y <= 495:  # quit to menu
                         self.reset_game()
 
+    @traced("state.loser")
     def perform_loser_frame_actions(self) -> None:
         """Performs actions for when the player lost."""
-        screen.fill((0, 0, 0))
-        screen.blit(self.loser_menu, (0, 0))  # display menu
+        self.screen.fill((0, 0, 0))
+        self.screen.blit(self.loser_menu, (0, 0))  # display menu
 
         # check if any of the buttons are pressed
         for event in self.game_events:
@@ -646,21 +557,22 @@ class GameController:
         1. Create coordinate grid for easy drawing
         2. Allows for right-clicking to get mouse location
         """
-        # 1. Draw grid
-        grid_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        for i in range(0, WIDTH, 100):  # big vertical lines
-            line = pygame.Rect(i, 0, 2, HEIGHT)
-            pygame.draw.rect(grid_surface, "red", line)
-        for i in range(0, HEIGHT, 100):  # big horizontal lines
-            line = pygame.Rect(0, i, WIDTH, 2)
-            pygame.draw.rect(grid_surface, "red", line)
-        for i in range(0, WIDTH, 20):  # small vertical lines
-            line = pygame.Rect(i, 0, 1, HEIGHT)
-            pygame.draw.rect(grid_surface, "grey", line)
-        for i in range(0, HEIGHT, 20):  # small horizontal lines
-            line = pygame.Rect(0, i, WIDTH, 1)
-            pygame.draw.rect(grid_surface, "grey", line)
-        screen.blit(grid_surface, (0, 0))
+        # 1. Draw grid, built once
+        if self.debug_grid is None:
+            self.debug_grid = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+            for i in range(0, WIDTH, 100):  # big vertical lines
+                line = pygame.Rect(i, 0, 2, HEIGHT)
+                pygame.draw.rect(self.debug_grid, "red", line)
+            for i in range(0, HEIGHT, 100):  # big horizontal lines
+                line = pygame.Rect(0, i, WIDTH, 2)
+                pygame.draw.rect(self.debug_grid, "red", line)
+            for i in range(0, WIDTH, 20):  # small vertical lines
+                line = pygame.Rect(i, 0, 1, HEIGHT)
+                pygame.draw.rect(self.debug_grid, "grey", line)
+            for i in range(0, HEIGHT, 20):  # small horizontal lines
+                line = pygame.Rect(0, i, WIDTH, 1)
+                pygame.draw.rect(self.debug_grid, "grey", line)
+        self.screen.blit(self.debug_grid, (0, 0))
 
         # 2. Right click to get coordinates
         for event in self.game_events:
@@ -681,65 +593,48 @@ class GameController:
         font = pygame.font.SysFont("comicsansms", font_size)
         text_surface = font.render(text, True, color)
         text_rect = text_surface.get_rect(center=(x, y))
-        screen.blit(text_surface, text_rect)
+        self.screen.blit(text_surface, text_rect)
 
+    @traced("display.effects")
     def display_active_effects(self) -> None:
         """Displays active effects on the screen."""
 
         # lightning effect from teleport
-        self.maze.display_lightnings()
+        self.maze.display_lightnings(self.screen, self.camera_offset)
 
         # speed boost timer
         if self.player.speed_boost_active:
             remaining = math.ceil(
-                self.player.speed_boost_end_time - pygame.time.get_ticks() / 1000
+                self.player.speed_boost_end_time - self.world.time
             )
             self.display_text(
                 f"Speed Boost Active! ({remaining}s)", 590, 41, 20, (255, 0, 0)
             )
 
-    def check_win_condition(self) -> bool:
-        """Check if the player reached the end.
-
-        Returns:
-            True if the player reached the end, otherwise False
-        """
-        if self.player.collides_with_circle(self.maze.get_end_location()):
-            if DEBUG_MODE:
-                print("Win condition met!")
-            return True
-        return False
-
-    def check_lose_condition(self) -> bool:
-        """Check if the player lost the game.
-
-        Returns:
-            True if the player lost the game by touching a hunter,
-            otherwise False
-        """
-        if self.maze.collide_hunters(self.player):
-            if DEBUG_MODE:
-                print("Lost condition met!")
-            return True
-        return False
-
     def restart_game(self) -> None:
         """Restart the current level."""
-        self.player = Player(*self.maze.get_start_location().get_location())
-        self.game_state = "playing"
-        self.stopwatch.reset()
-        self.stopwatch.start()
-        for item in self.maze.get_power_ups():
-            item.set_collected(False)
-        for hunter in self.maze.get_hunters():
-            hunter.reset_location()
-        self.maze.clear_lightnings()
+        if self.replay is not None:
+            self.watch_replay(self.replay, self.speed)
+            return
+        self.save_recording()
+        self.world.reset()
+        self.start_run()
 
     def reset_game(self) -> None:
         """Reset the game to initial `menu` state."""
-        self.__init__()
+        self.save_recording()
+        self.__init__(self.screen)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MazeSlice")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="print the time to the first frame and exit")
+    args = parser.parse_args()
+
     game = GameController()
-    game.play()
+    if args.startup_time:
+        game.play(frames=1)
+        print(f"{game.time_to_first_frame * 1000:.1f} ms to first frame")
+    else:
+        game.play()
@@ -0,0 +1,571 @@
+# maze.py
+
+import random
+
+import numpy as np
+import pygame
+
+from assets import load_image
+from config import HEIGHT, WIDTH, Z_LAYERS
+from debug_log import debug
+from entity_store import ItemStore, SphereStore
+from hunter import CHASE_Z_RANGE, SEPARATION_Z, Hunter, HunterGrid
+from item import ITEM_TYPES, Item
+from lightning import Lightning
+from player import Player
+from rng import RngService, new_seed
+from shapes import Circle, Sphere
+from tracing import traced
+
+
+class StartLocation(Circle):
+    """A starting location for the player.
+
+    Attributes:
+        surf: A pygame surface for the start location image
+        angle: The current angle of rotation for the start location image
+    Notes:
+        Also includes inherited attributes from Circle
+    """
+
+    def __init__(self, x: float, y: float, z: int, radius: int):
+        """Initializes the start location with its position and radius.
+
+        Args:
+            x: The x-coordinate of the start location
+            y: The y-coordinate of the start location
+            z: The z-coordinate for depth or layering
+            radius: The radius of the circle representing the start location
+        """
+        super().__init__(x, y, z, radius)
+        self.surf = load_image("graphics/maze/start_location.png")
+        self.angle = 0
+
+    def display(self, screen, from_z, color=(0, 0, 255), scale=1.0,
+                offset=(0, 0)) -> None:
+        """Displays the starting location on the screen.
+
+        Args:
+            screen: The pygame screen where the start location should be drawn
+            from_z: The z-coordinate to check if the start location should be displayed
+            color: Color of start location. Defaults to blue (0, 0, 255)
+            scale: Size of `screen` relative to the maze. Defaults to 1.0
+            offset: Maze position shown at the top left of `screen`
+        """
+        if self.z == from_z:
+            if scale == 1:
+                rotated_surf = pygame.transform.rotate(self.surf, self.angle)
+            else:
+                rotated_surf = pygame.transform.rotozoom(self.surf, self.angle, scale)
+            start_rect = rotated_surf.get_rect(
+                center=((self.x - offset[0]) * scale, (self.y - offset[1]) * scale))
+            screen.blit(rotated_surf, start_rect)
+
+    def rotate(self) -> None:
+        """Rotates the start location image by a small increment."""
+        self.angle += 0.2
+
+
+class EndLocation(Circle):
+    """An end location that the player tries to reach.
+
+    Attributes:
+        surf: A pygame surface for the end location image
+    Notes:
+        Also includes inherited attributes from Circle
+    """
+
+    def __init__(self, x: float, y: float, z: int, radius: int):
+        """Initializes the end location with its position and radius.
+
+        Args:
+            x: The x-coordinate of the end location
+            y: The y-coordinate of the end location
+            z: The z-coordinate for depth or layering
+            radius: The radius of the circle representing the end location
+        """
+        super().__init__(x, y, z, radius)
+        self.surf = load_image("graphics/maze/end_location.png")
+
+    # @override
+    def display(self, screen, from_z, color=(0, 0, 255), scale=1.0,
+                offset=(0, 0)) -> None:
+        """Displays the end location on the screen.
+
+        Args:
+            screen: The pygame screen to draw the end location on.
+            from_z: The z-coordinate to check if the end location should be displayed
+            color: Color of end location. Defaults to blue (0, 0, 255)
+            scale: Size of `screen` relative to the maze. Defaults to 1.0
+            offset: Maze position shown at the top left of `screen`
+        """
+        if self.z == from_z:
+            surf = self.surf
+            if scale != 1:
+                surf = pygame.transform.rotozoom(surf, 0, scale)
+            end_rect = surf.get_rect(
+                center=((self.x - offset[0]) * scale, (self.y - offset[1]) * scale))
+            screen.blit(surf, end_rect)
+
+
+# number of obstacles, smallest and largest obstacle radius, number of items
+# and number of hunters in a WIDTH x HEIGHT maze of each difficulty
+DIFFICULTIES = {
+    "easy": (90, 50, 90, 75, 0),
+    "medium": (110, 50, 90, 75, 3),
+    "hard": (120, 50, 90, 75, 6),
+    "???": (0, 50, 90, 100, 200),
+}
+
+
+class Maze:
+    """A maze with a specific difficulty.
+
+    Attributes:
+        start_location: The spawn point of the player
+        end_location: The end point of the maze
+        obstacles: The obstacles in the maze, stored as arrays
+        power_ups: The power-up items in the maze, stored as arrays
+        hunters: A list of hunters in the maze
+        hunter_grid: Positions of the chasing hunters, rebuilt every
+                     `move_hunters` to keep them apart
+        lightnings: A list of lightnings in the maze to display
+        difficulty: The difficulty of the maze
+        seed: Seed the maze was generated from. The maze is fully
+              identified by its difficulty and seed
+        rng: Random streams for generating the maze
+        width: Width of the maze, the window's width unless it scrolls
+        height: Height of the maze
+        depth: Deepest z-layer of the maze, where the end location is
+        area: (left, top, right, bottom) of the part of the maze generated
+              by `generate`
+        layers: (first, last) z-layers of the part of the maze generated by
+                `generate`
+        collision_queries: Calls of `is_move_allowed`, reset by the caller
+        obstacles_drawn: Obstacles drawn by the last `display_obstacles`
+        items_drawn: Items drawn by the last `display_items`
+    """
+
+    width = WIDTH
+    height = HEIGHT
+    depth = Z_LAYERS
+
+    def __init__(self, difficulty: str, seed=None, layout=None, copy_layout=True):
+        """Initialize a maze with a specific difficulty.
+
+        Args:
+            difficulty: The difficulty of the maze
+            seed: Seed to generate the maze from. Defaults to a fresh seed
+            layout: Arrays from `vector_env.pack_maze` to build the maze from
+                    instead of generating it
+            copy_layout: Whether to copy the obstacles and items of `layout`.
+                         If False the maze reads them from its arrays, which
+                         must stay valid while the maze is used
+        """
+        margin = 50
+        self.start_location = StartLocation(margin, margin, 0, 25)
+        self.end_location = EndLocation(
+            self.width - margin, self.height - margin, self.depth, 25)
+
+        # generate objects inside the maze based on difficulty
+        self.difficulty = difficulty
+        self.seed = new_seed() if seed is None else seed
+        self.rng = RngService(self.seed)
+        self.obstacles = SphereStore()
+        self.power_ups = ItemStore()
+        self.hunters: list[Hunter] = []
+        self.hunter_grid = HunterGrid()
+        self.lightnings: list[Lightning] = []
+        self.area = (0, 0, self.width, self.height)
+        self.layers = (0, self.depth)
+        self.collision_queries = 0
+        self.obstacles_drawn = 0
+        self.items_drawn = 0
+
+        if layout is not None:
+            self.load_layout(layout, copy_layout)
+        else:
+            self.generate()
+
+    @traced("maze.generate")
+    def generate(self) -> None:
+        """Fill up `self.area` and `self.layers` with objects based on the difficulty.
+
+        Object counts are scaled with the volume of the area and layers,
+        relative to a window sized maze of `Z_LAYERS` layers.
+        """
+        if self.difficulty not in DIFFICULTIES:
+            return
+        obstacles, r_min, r_max, items, hunters = DIFFICULTIES[self.difficulty]
+        left, top, right, bottom = self.area
+        first, last = self.layers
+        density = ((right - left) * (bottom - top) / (WIDTH * HEIGHT)
+                   * (last - first + 1) / (Z_LAYERS + 1))
+        self.generate_maze_obstacles(round(obstacles * density), r_min, r_max)
+        self.generate_maze_items(round(items * density))
+        if hunters:
+            self.generate_maze_hunters(round(hunters * density))
+
+    @traced("maze.load_layout")
+    def load_layout(self, layout, copy=True) -> None:
+        """Fill up the maze with the objects of a packed layout.
+
+        Args:
+            layout: Arrays from `vector_env.pack_maze`
+            copy: Whether to copy the obstacles and items. If False, the
+                  stores wrap the arrays and only the items' collected flags
+                  and the hunters are the maze's own
+        """
+        self.start_location.x, self.start_location.y, self.start_location.z, \
+            self.start_location.radius = layout["start"].tolist()
+        self.end_location.x, self.end_location.y, self.end_location.z, \
+            self.end_location.radius = layout["end"].tolist()
+        if copy:
+            self.obstacles.extend(layout["obstacles"])
+            self.power_ups.extend(layout["items"], layout["item_types"])
+        else:
+            self.obstacles.wrap(layout["obstacles"])
+            self.power_ups.wrap(layout["items"], layout["item_types"])
+        for x, y, z, radius, speed in layout["hunters"].tolist():
+            self.hunters.append(Hunter(x, y, z, radius, speed))
+
+    @traced("maze.generate_obstacles")
+    def generate_maze_obstacles(self, num_obstacles: int, r_min: int,
+                                r_max: int) -> None:
+        """
+        Fill up `self.obstacles` with randomized obstacles in `self.area`
+        and `self.layers`.
+
+        Args:
+            num_obstacles: Number of obstacles to generate
+            r_min: Minimum radius of obstacles
+            r_max: Maximum radius of obstacles
+        """
+        rng = self.rng.generator("obstacles")
+        left, top, right, bottom = self.area
+        first, last = self.layers
+        while len(self.obstacles) < num_obstacles:
+            # draw the remaining obstacles at once, then retry the rejected ones
+            candidates = rng.integers((left, top, first, r_min), (right, bottom, last, r_max),
+                                      (num_obstacles - len(self.obstacles), 4),
+                                      endpoint=True)
+            for x, y, z, radius in candidates.tolist():
+                obst = Sphere(x, y, z, radius)
+                if not obst.collides_with_circle(
+                        self.start_location
+                ) and not obst.collides_with_circle(self.end_location):
+                    self.obstacles.append(obst)
+                    debug("obstacle_generated", x=x, y=y, z=z, radius=radius)
+
+    @traced("maze.generate_items")
+    def generate_maze_items(self, num_items: int) -> None:
+        """Fill up `self.power_ups` with randomized items in `self.area` and `self.layers`.
+
+        Args:
+            num_items: Number of items to generate
+        """
+        rng = self.rng.generator("items")
+        left, top, right, bottom = self.area
+        first, last = self.layers
+        while len(self.power_ups) < num_items:
+            # -5 so items spawn more often on z = 0
+            count = num_items - len(self.power_ups)
+            candidates = rng.integers((left + 20, top + 20, first - 5, 0),
+                                      (right - 20, bottom - 20, last - 5,
+                                       len(ITEM_TYPES) - 1),
+                                      (count, 4), endpoint=True)
+            for x, y, z, type_index in candidates.tolist():
+                radius = 11
+                item_type = ITEM_TYPES[type_index]
+                item = Item(x, y, z, z + 15, radius, item_type)
+
+                # ensure items do not overlap with start/end locations or obstacles
+                if item.collides_with_circle(self.start_location):
+                    continue
+                elif item.collides_with_circle(self.end_location):
+                    continue
+                elif self.obstacles.collides_with_circle(item):
+                    continue
+                self.power_ups.append(item)
+                debug("item_generated", type=item_type, x=x, y=y, z=z)
+
+    @traced("maze.generate_hunters")
+    def generate_maze_hunters(self, num_hunters: int) -> None:
+        """Generate randomized hunters in `self.area` and `self.layers`.
+
+        Hunters keep away from the first 20 layers, where the player starts.
+
+        Args:
+            num_hunters: Number of hunters to generate
+        """
+        rng = self.rng.generator("hunters")
+        left, top, right, bottom = self.area
+        first, last = self.layers
+        first = max(first, 21)
+        if first > last:
+            return
+        # random location and speed
+        candidates = rng.integers((left + 20, top + 20, first, 12, 50),
+                                  (right - 20, bottom - 20, last, 18, 200),
+                                  (num_hunters, 5), endpoint=True)
+        for x, y, z, radius, speed in candidates.tolist():
+            hunter = Hunter(x, y, z, radius, speed / 100)
+            debug("hunter_generated", x=x, y=y, z=z)
+            self.hunters.append(hunter)
+
+    def get_view(self, center: tuple[float, float]) -> tuple[float, float, float, float]:
+        """Returns the part of the maze shown in the window.
+
+        Args:
+            center: The position the camera follows, e.g. the player's
+
+        Returns:
+            (left, top, right, bottom) of the view. The whole maze unless it
+            is larger than the window.
+        """
+        return 0, 0, WIDTH, HEIGHT
+
+    def parts_in(self, left: float, top: float, right: float,
+                 bottom: float, layers=None) -> list["Maze"]:
+        """Returns the parts of the maze holding the objects in an area.
+
+        Every part has `obstacles` and `power_ups`. A maze that is generated
+        in one piece is its own only part.
+
+        Args:
+            left, top, right, bottom: The area
+            layers: (first, last) z-layers of the area. Defaults to all layers
+        """
+        return [self]
+
+    def update_around(self, player: Player) -> None:
+        """Prepares the maze around the player before a simulation step.
+
+        Mazes that are generated in one piece have nothing to prepare.
+        """
+
+    def reset(self) -> None:
+        """Puts back all items and hunters for a new run."""
+        self.power_ups.reset_collected()
+        for hunter in self.hunters:
+            hunter.reset_location()
+        self.clear_lightnings()
+
+    def _view_rect(self, screen: pygame.Surface, scale: float,
+                   offset: tuple[float, float]) -> tuple[float, float, float, float]:
+        """The area of the maze drawn on `screen`."""
+        return (offset[0], offset[1], offset[0] + screen.get_width() / scale,
+                offset[1] + screen.get_height() / scale)
+
+    @traced("display.obstacles")
+    def display_obstacles(self, screen: pygame.Surface, player_z: int,
+                          scale=1.0, offset=(0, 0)) -> None:
+        """Displays 3D obstacles as a 2D cross-section.
+
+        Args:
+            screen: The pygame surface to draw the obstacles on
+            player_z: The z-coordinate of the player to determine which
+                      obstacles are visible
+            scale: Size of `screen` relative to the maze. Defaults to 1.0
+            offset: Maze position shown at the top left of `screen`.
+                    Defaults to (0, 0)
+        """
+        self.obstacles_drawn = 0
+        for part in self.parts_in(*self._view_rect(screen, scale, offset),
+                                  layers=(player_z, player_z)):
+            visible = part.obstacles.visible(player_z)
+            self.obstacles_drawn += len(visible)
+            for index in visible:
+                part.obstacles[index].display(screen, player_z, scale=scale,
+                                              offset=offset)
+
+    @traced("display.items")
+    def display_items(self, screen: pygame.Surface, player_z: int,
+                      scale=1.0, offset=(0, 0)) -> None:
+        """Displays items in the maze based on player's Z-layer.
+
+        Args:
+            screen: The pygame surface to draw the items on
+            player_z: The z-coordinate of the player to determine which
+                      items are visible
+            scale: Size of `screen` relative to the maze. Defaults to 1.0
+            offset: Maze position shown at the top left of `screen`.
+                    Defaults to (0, 0)
+        """
+        self.items_drawn = 0
+        for part in self.parts_in(*self._view_rect(screen, scale, offset),
+                                  layers=(player_z, player_z)):
+            visible = part.power_ups.visible(player_z)
+            self.items_drawn += len(visible)
+            for index in visible:
+                part.power_ups[index].display(screen, player_z, scale, offset)
+
+    @traced("display.hunters")
+    def display_hunters(self, screen: pygame.Surface, player: Player,
+                        scale=1.0, alpha=1.0, offset=(0, 0)) -> None:
+        """Displays hunters in the maze based on the player's Z-layer.
+
+        Args:
+            screen: The pygame surface to draw the hunters on
+            player: Player object used to determine the visibility of hunters
+            scale: Size of `screen` relative to the maze. Defaults to 1.0
+            alpha: Progress towards the next tick, used to interpolate the
+                   hunters' positions. Defaults to 1.0
+            offset: Maze position shown at the top left of `screen`.
+                    Defaults to (0, 0)
+        """
+        for hunter in self.hunters:
+            hunter.display_hunter(screen, player, scale, alpha, offset)
+
+    @traced("display.start_end")
+    def display_start_end(self, screen: pygame.Surface, from_z: int,
+                          scale=1.0, offset=(0, 0)) -> None:
+        """Display the start and end locations of the maze.
+
+        Args:
+            screen: The pygame surface to draw the locations on
+            from_z: The z-coordinate to determine which locations are visible
+            scale: Size of `screen` relative to the maze. Defaults to 1.0
+            offset: Maze position shown at the top left of `screen`.
+                    Defaults to (0, 0)
+        """
+        self.start_location.display(screen, from_z, (255, 255, 0), scale, offset)
+        self.end_location.display(screen, from_z, (255, 255, 0), scale, offset)
+
+    @traced("display.lightnings")
+    def display_lightnings(self, screen: pygame.Surface, offset=(0, 0)) -> None:
+        """Display the lightnings of the maze.
+
+        Args:
+            screen: The pygame surface to draw the lightnings on
+            offset: Maze position shown at the top left of `screen`.
+                    Defaults to (0, 0)
+        """
+        for lightning in self.lightnings:
+            lightning.display(screen, offset)
+
+        # get rid of unused lightnings.
+        for i in range(len(self.lightnings) - 1, -1, -1):
+            if not self.lightnings[i].check_used():
+                self.lightnings.pop(i)
+
+    @traced("collision.items")
+    def collect_items(self, player: Player, rng=random) -> int:
+        """Collect items that the player collides with.
+
+        Args:
+            player: The player object to check collisions and apply item effects
+            rng: Random stream for the items' effects. Defaults to `random`
+
+        Returns:
+            The number of items collected
+        """
+        old_location = player.get_location()[:2]
+        teleported = False
+        collected = 0
+
+        for part in self.parts_in(player.x - player.radius, player.y - player.radius,
+                                  player.x + player.radius, player.y + player.radius,
+                                  layers=(player.z, player.z)):
+            power_ups = part.power_ups
+            hits = power_ups.colliding(player)
+            while hits:
+                index = hits.pop(0)
+                item = power_ups[index]
+                if item.check_collision(player):
+                    collected += 1
+                    item.apply_effect(player, maze=self, rng=rng)
+
+                    # If teleport, make lightning object
+                    if item.type == "teleport":
+                        teleported = True
+                        # the player moved, so look again for the remaining items
+                        hits = power_ups.colliding(player, index + 1)
+
+        if teleported:
+            # the lightning gets its own stream, it only affects the display
+            new_location = player.get_location()[:2]
+            self.lightnings.append(Lightning(
+                old_location, new_location, random.Random(rng.getrandbits(64))))
+        return collected
+
+    @traced("world.move_hunters")
+    def move_hunters(self, player: Player, rng=random) -> None:
+        """Update the position of the hunters based on the player's position.
+
+        Chasing hunters keep apart from each other, see `HunterGrid`.
+
+        Args:
+            player: The player object used to update hunter movements
+            rng: Random stream for the hunters' movement. Defaults to `random`
+        """
+        # only hunters that chase can separate, and only from hunters close
+        # enough in z to push them
+        z_range = CHASE_Z_RANGE + SEPARATION_Z
+        self.hunter_grid.rebuild(hunter for hunter in self.hunters
+                                 if abs(hunter.z - player.z) <= z_range)
+        for hunter in self.hunters:
+            hunter.handle_movement(player, rng, self.hunter_grid)
+
+    @traced("collision.hunters")
+    def collide_hunters(self, player: Player) -> bool:
+        """Check if the player collides with any of the hunters.
+
+        Args:
+            player: The player object to check for collisions with hunters
+
+        Returns:
+            True if the player collides with any hunter, otherwise False
+        """
+        for hunter in self.hunters:
+            if hunter.check_collision(player):
+                return True
+        return False
+
+    @traced("collision.move")
+    def is_move_allowed(self, player: Player) -> bool:
+        """Check if a player can be at a certain position in the maze.
+
+        Args:
+            player: The player object to check for collisions with obstacles
+
+        Returns:
+            True if the move is allowed, otherwise False
+        """
+        self.collision_queries += 1
+
+        # Check collision with map boundaries
+        cx, cy, cz, r = player.x, player.y, player.z, player.radius
+        if (cx < r
+                or cx > self.width - r
+                or cy < r
+                or cy > self.height - r
+                or cz < 0
+                or cz > self.depth):
+            return False
+
+        # check collisions with all nearby obstacles at once
+        for part in self.parts_in(cx - r, cy - r, cx + r, cy + r, layers=(cz, cz)):
+            if part.obstacles.collides_with_circle(player):
+                return False
+        return True
+
+    def get_start_location(self) -> StartLocation:
+        """Returns the start location of the maze."""
+        return self.start_location
+
+    def get_end_location(self) -> EndLocation:
+        """Returns the end location of the maze."""
+        return self.end_location
+
+    def get_power_ups(self) -> ItemStore:
+        """Return all power ups in the maze."""
+        return self.power_ups
+
+    def get_hunters(self) -> list[Hunter]:
+        """Return a list of all hunters in the maze."""
+        return self.hunters
+
+    def clear_lightnings(self) -> None:
+        """Remove teleport lightning effects"""
+        self.lightnings.clear()
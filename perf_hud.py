@@ -0,0 +1,175 @@
+# perf_hud.py
+"""An in-game overlay with frame timings, for diagnosing hitches live.
+
+The overlay shows the frame rate, a graph of recent frame times against
+the frame budget, how long each phase of the last frame took and counts
+such as collision queries. Phases are timed with a `PhaseTimer`:
+
+    phase = hud.phase_timer
+    with phase("move_hunters"):
+        maze.move_hunters(player)
+
+While the overlay is hidden, `phase_timer` is `NO_TIMER`, which measures
+nothing.
+"""
+
+import time
+from collections import deque
+
+import pygame
+
+
+class PhaseTimer:
+    """Adds up the time spent in named phases.
+
+    The timer is reused for every phase, so phases must not be nested.
+
+    Attributes:
+        totals: Seconds spent in each phase since the last `reset`
+    """
+
+    def __init__(self):
+        """Initializes a timer without any measurements."""
+        self.totals: dict[str, float] = {}
+        self._name = None
+        self._start = 0.0
+
+    def __call__(self, name: str) -> "PhaseTimer":
+        self._name = name
+        return self
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        elapsed = time.perf_counter() - self._start
+        self.totals[self._name] = self.totals.get(self._name, 0.0) + elapsed
+
+    def reset(self) -> None:
+        """Forgets all measurements."""
+        self.totals.clear()
+
+
+class _NullTimer:
+    """A `PhaseTimer` that measures nothing."""
+
+    def __call__(self, name: str) -> "_NullTimer":
+        return self
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+NO_TIMER = _NullTimer()
+
+
+class PerfHud:
+    """The performance overlay.
+
+    Attributes:
+        enabled: Whether the overlay is shown and phases are timed
+        budget_ms: Frame time to stay under, in milliseconds
+        timer: Times the phases of the current frame
+        frame_times: Work time of recent frames in milliseconds, oldest first
+        fps: Average frame rate over the last frames
+        phases: Milliseconds spent in each phase in the last frame
+        counts: Counts of the last frame, e.g. collision queries
+    """
+
+    # frames shown in the graph
+    HISTORY = 120
+    # frame time at the top of the graph, in milliseconds
+    GRAPH_MAX_MS = 50
+    GRAPH_SIZE = (240, 60)
+    PADDING = 8
+    LINE_HEIGHT = 16
+
+    def __init__(self, enabled=False, budget_ms=1000 / 60):
+        """Initializes the overlay.
+
+        Args:
+            enabled: Whether the overlay starts shown. Defaults to False
+            budget_ms: Frame time budget in milliseconds. Defaults to 60 fps
+        """
+        self.enabled = enabled
+        self.budget_ms = budget_ms
+        self.timer = PhaseTimer()
+        self.frame_times = deque(maxlen=self.HISTORY)
+        self.fps = 0.0
+        self.phases: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self._font = None
+        self._panel = None
+
+    @property
+    def phase_timer(self) -> PhaseTimer | _NullTimer:
+        """The timer for this frame's phases, `NO_TIMER` while hidden."""
+        return self.timer if self.enabled else NO_TIMER
+
+    def toggle(self) -> None:
+        """Shows or hides the overlay."""
+        self.enabled = not self.enabled
+        self.timer.reset()
+
+    def end_frame(self, frame_ms: float, fps: float, counts: dict[str, int]) -> None:
+        """Stores the measurements of a finished frame and starts the next.
+
+        Args:
+            frame_ms: Time spent working on the frame, in milliseconds
+            fps: Average frame rate
+            counts: Counts of the frame, e.g. collision queries
+        """
+        self.frame_times.append(frame_ms)
+        self.fps = fps
+        self.counts = counts
+        self.phases = {name: seconds * 1000 for name, seconds in self.timer.totals.items()}
+        self.timer.reset()
+
+    def display(self, screen: pygame.Surface) -> None:
+        """Draws the overlay in the bottom right corner of `screen`."""
+        if self._font is None:
+            self._font = pygame.font.Font(None, 20)
+
+        last_ms = self.frame_times[-1] if self.frame_times else 0.0
+        # (label, value) rows, values are right aligned
+        lines = [(f"{self.fps:.1f} fps", f"{last_ms:.1f} ms")]
+        lines += [(name, f"{ms:.2f} ms") for name, ms in self.phases.items()]
+        lines += [(name, str(count)) for name, count in self.counts.items()]
+
+        graph_width, graph_height = self.GRAPH_SIZE
+        width = graph_width + 2 * self.PADDING
+        height = (graph_height + len(lines) * self.LINE_HEIGHT + 3 * self.PADDING)
+        left = screen.get_width() - width - self.PADDING
+        top = screen.get_height() - height - self.PADDING
+
+        if self._panel is None or self._panel.get_size() != (width, height):
+            self._panel = pygame.Surface((width, height), pygame.SRCALPHA)
+            self._panel.fill((0, 0, 0, 170))
+        screen.blit(self._panel, (left, top))
+
+        # frame time graph with the budget as a line
+        graph_left, graph_top = left + self.PADDING, top + self.PADDING
+        graph_bottom = graph_top + graph_height
+
+        def y_of(ms: float) -> float:
+            return graph_bottom - min(ms, self.GRAPH_MAX_MS) / self.GRAPH_MAX_MS * graph_height
+
+        budget_y = y_of(self.budget_ms)
+        pygame.draw.line(screen, (90, 90, 90), (graph_left, budget_y),
+                         (graph_left + graph_width, budget_y))
+        if len(self.frame_times) > 1:
+            step = graph_width / (self.HISTORY - 1)
+            points = [(graph_left + i * step, y_of(ms))
+                      for i, ms in enumerate(self.frame_times)]
+            color = (255, 80, 80) if last_ms > self.budget_ms else (80, 255, 80)
+            pygame.draw.lines(screen, color, False, points)
+
+        y = graph_bottom + self.PADDING
+        for label, value in lines:
+            screen.blit(self._font.render(label, True, (255, 255, 255)), (graph_left, y))
+            value_surf = self._font.render(value, True, (255, 255, 255))
+            screen.blit(value_surf, (graph_left + graph_width - value_surf.get_width(), y))
+            y += self.LINE_HEIGHT
@@ -4,11 +4,84 @@ import random
 import pygame
 import math
 
+from assets import load_image
+from debug_log import debug
 from shapes import Circle
 
 EXPERIMENTAL_SLIDING = True
 
 
+class PlayerInput:
+    """
+    The controls held down by the player during one simulation step.
+
+    Attributes:
+        up (bool): Move up the screen.
+        down (bool): Move down the screen.
+        left (bool): Move left.
+        right (bool): Move right.
+        ascend (bool): Move up a z-layer.
+        descend (bool): Move down a z-layer.
+        dash (bool): Dash in the direction of movement.
+    """
+
+    __slots__ = ("up", "down", "left", "right", "ascend", "descend", "dash")
+
+    def __init__(self, up=False, down=False, left=False, right=False,
+                 ascend=False, descend=False, dash=False):
+        """
+        Initialize the input with the controls that are held down.
+        """
+        self.up = up
+        self.down = down
+        self.left = left
+        self.right = right
+        self.ascend = ascend
+        self.descend = descend
+        self.dash = dash
+
+    @classmethod
+    def from_keys(cls, keys):
+        """
+        Read the input from the keyboard state.
+
+        Args:
+            keys: Keyboard state as returned by `pygame.key.get_pressed()`.
+
+        Returns:
+            PlayerInput: The input for the pressed keys.
+        """
+        return cls(keys[pygame.K_UP], keys[pygame.K_DOWN], keys[pygame.K_LEFT],
+                   keys[pygame.K_RIGHT], keys[pygame.K_w], keys[pygame.K_s],
+                   keys[pygame.K_SPACE])
+
+    def to_bits(self):
+        """
+        Pack the input into an integer, one bit per control in `__slots__` order.
+
+        Returns:
+            int: The packed input.
+        """
+        bits = 0
+        for i, name in enumerate(self.__slots__):
+            if getattr(self, name):
+                bits |= 1 << i
+        return bits
+
+    @classmethod
+    def from_bits(cls, bits):
+        """
+        Unpack an input packed by `to_bits`.
+
+        Args:
+            bits (int): The packed input.
+
+        Returns:
+            PlayerInput: The unpacked input.
+        """
+        return cls(*(bool(bits >> i & 1) for i in range(len(cls.__slots__))))
+
+
 class Player(Circle):
     """
     Represents the player and its actions.
@@ -26,6 +99,11 @@ class Player(Circle):
             radius (int, optional): Player's radius. Defaults to 18.
         """
         super().__init__(x, y, z, radius)
+        # Simulation time in seconds, advanced by `handle_movement`
+        self.current_time = 0.0
+        # Location before the last simulation step, used to interpolate drawing
+        self.prev_location = (x, y, z)
+
         # Movement attributes
         self.z_speed = 1  # If you intend to keep vertical movement without gravity
         self.velocity = pygame.math.Vector3(0, 0, 0)
@@ -52,47 +130,45 @@ class Player(Circle):
 
         # Load and scale the player images
         try:
+            sprite_size = (self.radius * 2, self.radius * 2)
             # Default sprite
-            self.original_surf = pygame.image.load("graphics/player/linty.png").convert_alpha()
-            self.original_surf = pygame.transform.scale(self.original_surf, (self.radius * 2, self.radius * 2))
+            self.original_surf = load_image("graphics/player/linty.png", sprite_size)
 
             # Dash sprite
-            self.dash_surf = pygame.image.load("graphics/player/lintydash.png").convert_alpha()
-            self.dash_surf = pygame.transform.scale(self.dash_surf, (self.radius * 2, self.radius * 2))
+            self.dash_surf = load_image("graphics/player/lintydash.png", sprite_size)
 
             # Teleport sprite
-            self.teleport_surf = pygame.image.load("graphics/player/lintyteleport.png").convert_alpha()
-            self.teleport_surf = pygame.transform.scale(self.teleport_surf, (self.radius * 2, self.radius * 2))
+            self.teleport_surf = load_image("graphics/player/lintyteleport.png", sprite_size)
 
             # Set the current sprite to the default
             self.current_surf = self.original_surf
         except pygame.error as e:
-            from main import DEBUG_MODE
-            if DEBUG_MODE:
-                print(f"Failed to load player images: {e}")
+            debug("player_images_failed", error=str(e))
             self.current_surf = None  # Fallback if image loading fails
 
-    def handle_movement(self, maze):
+    def handle_movement(self, maze, inputs, current_time):
         """
-        Manage movement and actions.
+        Manage movement and actions for one simulation step.
 
         Args:
             maze (Maze): Maze object for collision checks.
+            inputs (PlayerInput): Controls held down during this step.
+            current_time (float): Simulation time in seconds.
         """
-        keys = pygame.key.get_pressed()
-        current_time = pygame.time.get_ticks() / 1000  # Current time in seconds
+        self.current_time = current_time
+        self.prev_location = self.get_location()
 
         # Reset acceleration
         accel = pygame.math.Vector3(0, 0, 0)
 
         # Movement input
-        if keys[pygame.K_UP]:
+        if inputs.up:
             accel.y -= self.acceleration
-        if keys[pygame.K_DOWN]:
+        if inputs.down:
             accel.y += self.acceleration
-        if keys[pygame.K_LEFT]:
+        if inputs.left:
             accel.x -= self.acceleration
-        if keys[pygame.K_RIGHT]:
+        if inputs.right:
             accel.x += self.acceleration
 
         # Apply acceleration
@@ -111,7 +187,7 @@ class Player(Circle):
         self.velocity.y = max(-self.max_speed, min(self.velocity.y, self.max_speed))
 
         # Dash input
-        if keys[pygame.K_SPACE]:
+        if inputs.dash:
             if not self.is_dashing and (current_time - self.last_dash_time) >= self.dash_cooldown:
                 self.is_dashing = True
                 self.dash_start_time = current_time
@@ -121,9 +197,7 @@ class Player(Circle):
                 if dash_vector.length() != 0:
                     dash_vector = dash_vector.normalize() * self.dash_speed
                 self.velocity += dash_vector
-                from main import DEBUG_MODE
-                if DEBUG_MODE:
-                    print("Dash activated!")
+                debug("dash_started", time=current_time)
 
         # Handle dash duration
         if self.is_dashing:
@@ -132,9 +206,7 @@ class Player(Circle):
                 # Reset velocity after dash
                 if self.velocity.length() > 0:
                     self.velocity = self.velocity.normalize() * self.max_speed
-                from main import DEBUG_MODE
-                if DEBUG_MODE:
-                    print("Dash ended.")
+                debug("dash_ended", time=current_time)
 
         # Removed gravity application
         # self.velocity.z += self.gravity  # Removed
@@ -188,9 +260,9 @@ class Player(Circle):
                         break
 
         # Attempt to move along the Z-axis (if vertical movement is desired)
-        if keys[pygame.K_w]:
+        if inputs.ascend:
             self.z += self.z_speed
-        if keys[pygame.K_s]:
+        if inputs.descend:
             self.z -= self.z_speed
         if not maze.is_move_allowed(self):
             self.z = old_location[2]
@@ -201,20 +273,41 @@ class Player(Circle):
 
         # print("Player Position:", self.x, self.y, self.z)
 
-    def display_player(self):
+    def get_interpolated_location(self, alpha=1.0):
+        """
+        Get the player's planar location between the last two simulation steps.
+
+        Args:
+            alpha (float, optional): Progress towards the next simulation step.
+                Defaults to 1.0, the current location.
+
+        Returns:
+            tuple: (x, y) coordinates.
+        """
+        prev_x, prev_y = self.prev_location[:2]
+        return prev_x + (self.x - prev_x) * alpha, prev_y + (self.y - prev_y) * alpha
+
+    def display_player(self, screen, alpha=1.0, offset=(0, 0)):
         """
         Render the player sprite on screen.
+
+        Args:
+            screen (pygame.Surface): Surface to draw the player on.
+            alpha (float, optional): Progress towards the next simulation step,
+                used to interpolate from the previous location. Defaults to 1.0.
+            offset (tuple, optional): Maze position shown at the top left of `screen`.
+                Defaults to (0, 0).
         """
-        from main import screen  # Importing here to avoid circular imports
         if self.current_surf is None:
-            from main import DEBUG_MODE
-            if DEBUG_MODE:
-                print("Player image not loaded. Cannot display player.")
+            debug("player_not_displayed", reason="image not loaded")
             return
 
         # Blit the current sprite onto the screen at the player's position
         # Adjust position to center the image
-        screen.blit(self.current_surf, (int(self.x - self.radius), int(self.y - self.radius)))
+        x, y = self.get_interpolated_location(alpha)
+        x -= offset[0]
+        y -= offset[1]
+        screen.blit(self.current_surf, (int(x - self.radius), int(y - self.radius)))
 
     def set_position(self, x, y, z):
         """
@@ -247,48 +340,47 @@ class Player(Circle):
         """
         return self.x, self.y, self.z, self.radius
 
-    def teleport(self, maze):
+    def teleport(self, maze, rng=random):
         """
-        Teleport player to a random position.
+        Teleport player to a random free position in view.
 
         Args:
             maze (Maze): Maze object for valid position checks.
+            rng (random.Random, optional): Random stream to pick the position from.
+                Defaults to the `random` module.
         """
-        from main import WIDTH, HEIGHT
+        left, top, right, bottom = maze.get_view(self.get_location()[:2])
         has_found = False
 
         attempts = 0
         max_attempts = 100  # Prevent infinite loop
 
         while not has_found and attempts < max_attempts:
-            temp_x = random.randint(self.radius, WIDTH - self.radius)
-            temp_y = random.randint(self.radius, HEIGHT - self.radius)
+            temp_x = rng.randint(int(left) + self.radius, int(right) - self.radius)
+            temp_y = rng.randint(int(top) + self.radius, int(bottom) - self.radius)
             temp_z = self.z  # Teleport to the same z_level
 
-            if maze.is_move_allowed(Player(temp_x, temp_y, temp_z)):
+            if maze.is_move_allowed(Circle(temp_x, temp_y, temp_z, self.radius)):
                 has_found = True
                 self.set_position(temp_x, temp_y, temp_z)
-                from main import DEBUG_MODE
-                if DEBUG_MODE:
-                    print(f"Player teleported to ({temp_x}, {temp_y}, {temp_z})")
+                self.prev_location = self.get_location()  # don't interpolate the jump
+                debug("teleported", x=temp_x, y=temp_y, z=temp_z)
             attempts += 1
 
         if has_found:
             # Switch to Teleport sprite
             self.current_surf = self.teleport_surf
             # Set a timer to revert to default sprite after a short duration
-            self.teleport_end_time = pygame.time.get_ticks() / 1000 + 0.5  # 0.5 seconds duration
+            self.teleport_end_time = self.current_time + 0.5  # 0.5 seconds duration
             self.is_teleporting = True
         else:
-            from main import DEBUG_MODE
-            if DEBUG_MODE:
-                print("Teleport failed: No free position found.")
+            debug("teleport_failed", reason="no free position")
 
     def handle_timers(self):
         """
         Manage timers for effects.
         """
-        current_time = pygame.time.get_ticks() / 1000
+        current_time = self.current_time
         # Handle speed boost timer
         if self.speed_boost_active and current_time >= self.speed_boost_end_time:
             self.max_speed -= 2  # Revert max_speed
@@ -296,9 +388,7 @@ class Player(Circle):
             # Only revert sprite if not teleporting
             if not self.is_teleporting:
                 self.current_surf = self.original_surf
-            from main import DEBUG_MODE
-            if DEBUG_MODE:
-                print("Speed boost ended.")
+            debug("speed_boost_ended", time=current_time)
 
         # Handle teleport timer
         if self.is_teleporting and current_time >= self.teleport_end_time:
@@ -306,9 +396,7 @@ class Player(Circle):
             # Only revert sprite if speed boost is not active
             if not self.speed_boost_active:
                 self.current_surf = self.original_surf
-            from main import DEBUG_MODE
-            if DEBUG_MODE:
-                print("Teleport effect ended.")
+            debug("teleport_effect_ended", time=current_time)
 
         # Ensure sprite reflects current state priority
         if self.is_teleporting:
@@ -328,30 +416,22 @@ class Player(Circle):
         if not self.speed_boost_active:
             self.max_speed += 2  # Increase max_speed
             self.speed_boost_active = True
-            self.speed_boost_end_time = pygame.time.get_ticks() / 1000 + duration
+            self.speed_boost_end_time = self.current_time + duration
             self.current_surf = self.dash_surf  # Switch to Dash sprite
-            from main import DEBUG_MODE
-            if DEBUG_MODE:
-                print("Speed boost activated!")
+            debug("speed_boost_started", until=self.speed_boost_end_time)
         else:
-            from main import DEBUG_MODE
-            if DEBUG_MODE:
-                print("Speed boost is already active. Cannot stack boosts.")
+            debug("speed_boost_ignored", reason="already active")
 
     def reduce_dash_cooldown(self):
         """
         Decrease dash cooldown period.
         """
         self.dash_cooldown = max(0.5, self.dash_cooldown - 0.1)
-        from main import DEBUG_MODE
-        if DEBUG_MODE:
-            print(f"Dash cooldown reduced to {self.dash_cooldown} seconds.")
+        debug("dash_cooldown_reduced", cooldown=self.dash_cooldown)
 
     def reduce_teleport_cooldown(self):
         """
         Decrease teleport cooldown period.
         """
         self.teleport_cooldown = max(2.0, self.teleport_cooldown - 0.5)
-        from main import DEBUG_MODE
-        if DEBUG_MODE:
-            print(f"Teleport cooldown reduced to {self.teleport_cooldown} seconds.")
+        debug("teleport_cooldown_reduced", cooldown=self.teleport_cooldown)
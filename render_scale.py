@@ -0,0 +1,111 @@
+# render_scale.py
+
+import pygame
+
+
+class RenderScaler:
+    """Renders the maze at a reduced internal resolution when frames are slow.
+
+    The maze is drawn into an offscreen surface that is `scale` times the
+    size of the screen and then upscaled onto the screen. With `dynamic`
+    enabled, the scale moves between `LEVELS` based on the measured frame
+    time, trading sharpness for frame rate on slow machines.
+
+    Attributes:
+        level: Index into `LEVELS` of the current render scale.
+        dynamic: Whether the scale is adjusted automatically.
+        budget_ms: Frame time to stay under, in milliseconds.
+        smooth: Whether to upscale with `smoothscale` instead of `scale`.
+        frame_time_ms: Smoothed frame time used to pick the scale.
+    """
+
+    LEVELS = (1.0, 0.85, 0.75, 0.6, 0.5)
+
+    # frames to wait after a change before the scale may change again
+    COOLDOWN_FRAMES = 30
+    # only scale back up once there is this much headroom in the budget
+    HEADROOM = 0.7
+    # weight of the newest frame in the smoothed frame time
+    SMOOTHING = 0.1
+
+    def __init__(self, scale=1.0, dynamic=True, budget_ms=1000 / 60,
+                 smooth=True):
+        """Initializes the scaler.
+
+        Args:
+            scale: Initial render scale, rounded to the closest of `LEVELS`
+            dynamic: Adjust the scale from the frame time. Defaults to True
+            budget_ms: Frame time budget in milliseconds. Defaults to 60 fps
+            smooth: Upscale with `smoothscale`. Defaults to True
+        """
+        self.level = min(range(len(self.LEVELS)),
+                         key=lambda i: abs(self.LEVELS[i] - scale))
+        self.dynamic = dynamic
+        self.budget_ms = budget_ms
+        self.smooth = smooth
+        self.frame_time_ms = 0.0
+        self._cooldown = self.COOLDOWN_FRAMES
+        self._surfaces: dict[tuple[int, int], pygame.Surface] = {}
+
+    @property
+    def scale(self) -> float:
+        """The current render scale."""
+        return self.LEVELS[self.level]
+
+    def begin_frame(self, screen: pygame.Surface) -> pygame.Surface:
+        """Returns the cleared surface to draw the maze on for this frame.
+
+        At full scale this is `screen` itself, so nothing extra is drawn or
+        copied.
+
+        Args:
+            screen: The surface the frame is finally presented on
+        """
+        if self.level == 0:
+            return screen
+
+        width, height = screen.get_size()
+        size = (max(1, int(width * self.scale)), max(1, int(height * self.scale)))
+        surf = self._surfaces.get(size)
+        if surf is None:
+            surf = pygame.Surface(size, 0, screen)
+            self._surfaces[size] = surf
+        surf.fill((0, 0, 0))
+        return surf
+
+    def present(self, surf: pygame.Surface, screen: pygame.Surface) -> None:
+        """Upscales the surface from `begin_frame` onto the screen.
+
+        Args:
+            surf: The surface returned by `begin_frame`
+            screen: The surface to present on
+        """
+        if surf is screen:
+            return
+        if self.smooth and surf.get_bitsize() >= 24:
+            pygame.transform.smoothscale(surf, screen.get_size(), screen)
+        else:
+            pygame.transform.scale(surf, screen.get_size(), screen)
+
+    def record_frame_time(self, frame_time_ms: float) -> None:
+        """Records how long the last frame took and adjusts the scale.
+
+        Args:
+            frame_time_ms: Time spent on the last frame, excluding any
+                           time spent waiting for the frame rate cap
+        """
+        self.frame_time_ms += self.SMOOTHING * (frame_time_ms - self.frame_time_ms)
+        if not self.dynamic:
+            return
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return
+
+        if (self.frame_time_ms > self.budget_ms
+                and self.level < len(self.LEVELS) - 1):
+            self.level += 1
+            self._cooldown = self.COOLDOWN_FRAMES
+        elif (self.frame_time_ms < self.budget_ms * self.HEADROOM
+              and self.level > 0):
+            self.level -= 1
+            self._cooldown = self.COOLDOWN_FRAMES
@@ -0,0 +1,295 @@
+# replay.py
+"""Records the player's input during a run and replays it deterministically.
+
+A run is fully determined by the maze's difficulty and seed, the run's
+seed and the input held during every tick, so that is all a recording
+stores:
+
+    recorder = InputRecorder("hard", maze.seed, world.seed)
+    recorder.record(inputs)  # once per tick
+    recorder.finish(world.state, world.stopwatch.get_elapsed_time())
+    recorder.save("replays/run.mzr")
+
+Only changes of the input are written, each as the number of ticks since
+the previous change followed by the new input bits, so an ordinary run
+takes a few hundred bytes.
+
+A replay is re-simulated headless as fast as possible, e.g. to check a
+leaderboard time offline:
+
+    replay = Replay.load("replays/run.mzr")
+    world = replay.simulate()
+    assert replay.verify()
+
+Run `python replay.py --help` to check or watch replays from the command line.
+"""
+
+import argparse
+import os
+import struct
+import time
+
+from chunked_maze import ChunkedMaze
+from config import TICK_RATE, Z_LAYERS
+from deep_maze import DeepMaze
+from maze import Maze
+from player import PlayerInput
+from simulation import World
+
+REPLAY_MAGIC = b"MZRP"
+# raised whenever the rules change, as older runs would play out differently;
+# version 5 added the hunters' separation, version 6 lets a run that reaches
+# the end and touches a hunter on the same tick count as won
+REPLAY_VERSION = 6
+
+# header: magic, version, tick rate, maze seed, run seed, columns and rows of
+# chunks (0 for single screen mazes), depth of the maze, number of ticks,
+# final state and stopwatch time, length of the difficulty that follows
+HEADER = struct.Struct("<4sBHQQHHIIBdB")
+
+# final states as stored in the header, "playing" if the run was abandoned
+STATES = ("playing", "won", "lost")
+
+# set on an input change to mark that the game was paused before that tick
+PAUSE_BIT = 1 << 7
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    """Appends `value` to `out` using 7 bits per byte, low bits first."""
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    """Reads a varint written by `_write_varint`.
+
+    Returns:
+        The value and the position after it.
+    """
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class InputRecorder:
+    """Records the input of a run, tick by tick.
+
+    Attributes:
+        difficulty: Difficulty of the maze
+        maze_seed: Seed the maze was generated from
+        run_seed: Seed of the run's randomness
+        chunks: (columns, rows) of a `ChunkedMaze`, None for a `Maze`
+        depth: Deepest layer of the maze, a `DeepMaze` unless `Z_LAYERS`
+        tick_rate: Simulation steps per second
+        ticks: Number of ticks recorded so far
+        state: Final state of the run, see `finish`
+        time: Final stopwatch time of the run, see `finish`
+    """
+
+    def __init__(self, difficulty: str, maze_seed: int, run_seed: int,
+                 tick_rate=TICK_RATE, chunks=None, depth=Z_LAYERS):
+        """Starts an empty recording.
+
+        Args:
+            difficulty: Difficulty of the maze
+            maze_seed: Seed the maze was generated from
+            run_seed: Seed of the run's randomness
+            tick_rate: Simulation steps per second
+            chunks: (columns, rows) of a `ChunkedMaze`, None for a `Maze`
+            depth: Deepest layer of the maze, a `DeepMaze` unless `Z_LAYERS`
+        """
+        self.difficulty = difficulty
+        self.maze_seed = maze_seed
+        self.run_seed = run_seed
+        self.chunks = chunks
+        self.depth = depth
+        self.tick_rate = tick_rate
+        self.ticks = 0
+        self.state = "playing"
+        self.time = 0.0
+        self._body = bytearray()
+        self._bits = 0
+        self._last_change = 0
+        self._paused = False
+
+    def record(self, inputs: PlayerInput) -> None:
+        """Records the input used for the next tick."""
+        bits = inputs.to_bits()
+        if bits != self._bits or self._paused:
+            _write_varint(self._body, self.ticks - self._last_change)
+            self._body.append(bits | (PAUSE_BIT if self._paused else 0))
+            self._bits = bits
+            self._last_change = self.ticks
+            self._paused = False
+        self.ticks += 1
+
+    def record_pause(self) -> None:
+        """Marks that the game was paused before the next tick."""
+        self._paused = True
+
+    def finish(self, state: str, elapsed_time: float) -> None:
+        """Records how the run ended.
+
+        Args:
+            state: "won" or "lost", or "playing" if the run was abandoned
+            elapsed_time: The run's stopwatch time
+        """
+        self.state = state
+        self.time = elapsed_time
+
+    def to_bytes(self) -> bytes:
+        """Returns the recording in the replay file format."""
+        difficulty = self.difficulty.encode()
+        header = HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.tick_rate,
+                             self.maze_seed, self.run_seed, *(self.chunks or (0, 0)),
+                             self.depth, self.ticks,
+                             STATES.index(self.state), self.time, len(difficulty))
+        return header + difficulty + self._body
+
+    def save(self, path: str) -> None:
+        """Writes the recording to `path`, creating its directory if needed."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+
+class Replay:
+    """A recorded run that can be re-simulated.
+
+    Attributes:
+        difficulty: Difficulty of the maze
+        maze_seed: Seed the maze was generated from
+        run_seed: Seed of the run's randomness
+        chunks: (columns, rows) of a `ChunkedMaze`, None for a `Maze`
+        depth: Deepest layer of the maze, a `DeepMaze` unless `Z_LAYERS`
+        tick_rate: Simulation steps per second
+        ticks: Number of recorded ticks
+        state: Recorded final state, "won", "lost" or "playing"
+        time: Recorded final stopwatch time
+        changes: (tick, input bits) for every change of the input
+        pauses: Ticks before which the game was paused
+    """
+
+    def __init__(self, data: bytes):
+        """Parses a replay from the bytes of a replay file.
+
+        Args:
+            data: Contents of the replay file
+
+        Raises:
+            ValueError: If the data is not a replay of a supported version
+        """
+        (magic, version, self.tick_rate, self.maze_seed, self.run_seed, columns, rows,
+         self.depth, self.ticks, state, self.time, difficulty_size) = HEADER.unpack_from(data, 0)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"not a version {REPLAY_VERSION} replay")
+        self.chunks = (columns, rows) if columns else None
+        self.state = STATES[state]
+        pos = HEADER.size + difficulty_size
+        self.difficulty = data[HEADER.size:pos].decode()
+
+        self.changes = []
+        self.pauses = []
+        tick = 0
+        while pos < len(data):
+            delta, pos = _read_varint(data, pos)
+            tick += delta
+            bits = data[pos]
+            pos += 1
+            if bits & PAUSE_BIT:
+                self.pauses.append(tick)
+            self.changes.append((tick, bits & ~PAUSE_BIT))
+
+    @classmethod
+    def load(cls, path: str) -> "Replay":
+        """Reads the replay file at `path`."""
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def new_world(self) -> World:
+        """Builds the recorded maze and starts the recorded run in it.
+
+        Returns:
+            A world ready to be stepped with `inputs`.
+        """
+        if self.chunks:
+            maze = ChunkedMaze(self.difficulty, self.maze_seed, self.chunks)
+        elif self.depth != Z_LAYERS:
+            maze = DeepMaze(self.difficulty, self.maze_seed, self.depth)
+        else:
+            maze = Maze(self.difficulty, self.maze_seed)
+        return World(maze, self.run_seed)
+
+    def inputs(self):
+        """Yields the recorded `PlayerInput` for every tick, in order."""
+        inputs = PlayerInput()
+        changes = iter(self.changes)
+        change = next(changes, None)
+        for tick in range(self.ticks):
+            if change is not None and change[0] == tick:
+                inputs = PlayerInput.from_bits(change[1])
+                change = next(changes, None)
+            yield inputs
+
+    def simulate(self) -> World:
+        """Re-simulates the whole run as fast as possible, without a display.
+
+        Returns:
+            The world after the last recorded tick.
+        """
+        world = self.new_world()
+        dt = 1 / self.tick_rate
+        for inputs in self.inputs():
+            world.step(inputs, dt)
+        return world
+
+    def verify(self, world: World | None = None) -> bool:
+        """Checks that re-simulating the run gives the recorded result.
+
+        Args:
+            world: A world returned by `simulate`. Simulates the run if omitted
+
+        Returns:
+            True if the final state and stopwatch time match the recording.
+        """
+        if world is None:
+            world = self.simulate()
+        return (world.state == self.state
+                and world.stopwatch.get_elapsed_time() == self.time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="replay files to check")
+    parser.add_argument("--watch", action="store_true",
+                        help="render the first replay instead of checking")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="playback speed when watching")
+    args = parser.parse_args()
+
+    if args.watch:
+        from main import GameController  # only needed to watch
+
+        game = GameController()
+        game.watch_replay(Replay.load(args.paths[0]), args.speed)
+        game.play()
+
+    for path in args.paths:
+        replay = Replay.load(path)
+        start = time.perf_counter()
+        world = replay.simulate()
+        elapsed = time.perf_counter() - start
+        print(f"{path}: {replay.difficulty} {world.state} "
+              f"{world.stopwatch.get_elapsed_time()}s in {world.ticks} ticks, "
+              f"recorded {replay.state} {replay.time}s, "
+              f"{'ok' if replay.verify(world) else 'MISMATCH'} "
+              f"({world.ticks / max(elapsed, 1e-9):.0f} ticks/s)")
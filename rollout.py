@@ -0,0 +1,258 @@
+# rollout.py
+"""Plays many complete games headlessly on all cores.
+
+Each worker process builds `simulation.World`s and steps them as fast as
+possible with an input policy, sending a result back for every finished
+episode:
+
+    for result in run_rollouts("hard", episodes=10000, policy=seek_end_policy):
+        print(result)
+
+A policy is a picklable callable taking the `World` and returning the
+`PlayerInput` for the next step, e.g. a module level function.
+
+Run `python rollout.py --help` for a command line version.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+from multiprocessing.util import Finalize
+
+from config import TICK_RATE
+from maze import Maze
+from player import PlayerInput
+from rng import RngService, derive_seed, new_seed
+from shapes import Circle
+from shared_maze import SharedMaze
+from simulation import World
+
+# give up on episodes that take longer than this, in simulation seconds
+DEFAULT_MAX_SECONDS = 300
+
+# distances and directions `seek_end_policy` looks around for a way past an
+# obstacle in the next layer
+DETOUR_RINGS = range(20, 201, 20)
+DETOUR_DIRECTIONS = [(math.cos(i * math.pi / 8), math.sin(i * math.pi / 8))
+                     for i in range(16)]
+
+
+def idle_policy(world: World) -> PlayerInput:
+    """Never touches the controls."""
+    return PlayerInput()
+
+
+def random_policy(world: World) -> PlayerInput:
+    """Holds a random combination of controls every step."""
+    return PlayerInput.from_bits(random.getrandbits(len(PlayerInput.__slots__)))
+
+
+def _clear_spot(maze: Maze, player, z: int) -> tuple[float, float] | None:
+    """Returns the nearest point around `player` where it fits into layer `z`.
+
+    None if it already fits where it is, or no point within the largest of
+    `DETOUR_RINGS` does.
+    """
+    probe = Circle(player.x, player.y, z, player.radius)
+    if maze.is_move_allowed(probe):
+        return None
+    for ring in DETOUR_RINGS:
+        for cos, sin in DETOUR_DIRECTIONS:
+            probe.x, probe.y = player.x + ring * cos, player.y + ring * sin
+            if maze.is_move_allowed(probe):
+                return probe.x, probe.y
+    return None
+
+
+def seek_end_policy(world: World) -> PlayerInput:
+    """Heads for the end location, dashing whenever possible.
+
+    When an obstacle keeps the player from changing to the next layer, it
+    steers to the nearest point where that layer is clear first. Otherwise
+    it goes straight for the end, so it is only a greedy baseline that
+    usually gets stuck against obstacles in the end's layer: with
+    `--max-seconds 60` it wins about 1 in 6 easy episodes and times out in
+    the rest.
+    """
+    player = world.player
+    end = world.maze.get_end_location()
+    z_step = (end.z > player.z) - (end.z < player.z)
+    target_x, target_y = end.x, end.y
+    if z_step:
+        spot = _clear_spot(world.maze, player, player.z + z_step)
+        if spot is not None:
+            target_x, target_y = spot
+    return PlayerInput(
+        up=target_y < player.y - 1,
+        down=target_y > player.y + 1,
+        left=target_x < player.x - 1,
+        right=target_x > player.x + 1,
+        ascend=z_step > 0,
+        descend=z_step < 0,
+        dash=True,
+    )
+
+
+POLICIES = {
+    "idle": idle_policy,
+    "random": random_policy,
+    "seek_end": seek_end_policy,
+}
+
+
+def play_episode(difficulty: str, policy, max_seconds=DEFAULT_MAX_SECONDS,
+                 maze=None, seed=None) -> dict:
+    """Plays one game until it is won, lost or times out.
+
+    Args:
+        difficulty: Difficulty of the maze
+        policy: Returns the input for each step, given the world
+        max_seconds: Simulation time after which the episode is abandoned
+        maze: The maze to play. Defaults to a new maze from `seed`
+        seed: Seed of the episode. Defaults to a fresh seed
+
+    Returns:
+        The result of the episode, see `run_rollouts`.
+    """
+    seed = new_seed() if seed is None else seed
+    if maze is None:
+        maze = Maze(difficulty, derive_seed(seed, "maze"))
+    world = World(maze, seed)
+    max_ticks = int(max_seconds * TICK_RATE)
+    while world.state == "playing" and world.ticks < max_ticks:
+        world.step(policy(world))
+    return {
+        "difficulty": difficulty,
+        "seed": seed,
+        "state": world.state if world.state != "playing" else "timeout",
+        "time": world.stopwatch.get_elapsed_time(),
+        "ticks": world.ticks,
+        "items_collected": world.items_collected,
+    }
+
+
+# maze shared by the parent, attached once per worker process
+_worker_maze = None
+_worker_shared = None
+
+
+def _init_worker(shared_name) -> None:
+    """Attaches to the shared maze, if any, when a worker process starts.
+
+    The worker's maze reads its obstacles and items from the shared block,
+    which stays attached until the worker exits.
+    """
+    global _worker_maze, _worker_shared
+    if shared_name is not None:
+        _worker_shared = SharedMaze.attach(shared_name)
+        _worker_maze = _worker_shared.to_maze()
+        Finalize(None, _close_worker, exitpriority=10)
+
+
+def _close_worker() -> None:
+    """Drops the worker's maze and detaches from the shared block."""
+    global _worker_maze, _worker_shared
+    _worker_maze = None
+    _worker_shared.close()
+    _worker_shared = None
+
+
+def _worker(args: tuple) -> list[dict]:
+    """Plays a batch of episodes in a worker process."""
+    difficulty, policy, episodes, max_seconds, seed = args
+    random.seed(seed)  # for policies using `random`
+    seeds = RngService(seed).stream("episodes")
+    return [play_episode(difficulty, policy, max_seconds, _worker_maze,
+                         seeds.getrandbits(32))
+            for _ in range(episodes)]
+
+
+def run_rollouts(difficulty: str, episodes: int, policy=seek_end_policy,
+                 processes=None, max_seconds=DEFAULT_MAX_SECONDS,
+                 batch_size=8, seed=None, maze=None):
+    """Plays `episodes` games across worker processes.
+
+    Results are yielded as soon as a batch of episodes finishes, in no
+    particular order.
+
+    Args:
+        difficulty: Difficulty of the mazes
+        episodes: Number of games to play
+        policy: Picklable callable returning the input for each step
+        processes: Number of worker processes. Defaults to the CPU count
+        max_seconds: Simulation time after which an episode is abandoned
+        batch_size: Episodes sent to a worker at a time
+        seed: Seed for the workers' randomness. Defaults to a random seed
+        maze: Play every episode in this maze instead of new ones. Its
+              layout is handed to the workers through shared memory
+
+    Yields:
+        A dictionary per episode with the "difficulty", the "seed" that
+        reproduces it with `play_episode`, the final "state"
+        ("won", "lost" or "timeout"), the stopwatch "time", the number of
+        "ticks" and the number of "items_collected".
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    batches = []
+    remaining = episodes
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        batches.append((difficulty, policy, size, max_seconds, seed + len(batches)))
+        remaining -= size
+
+    shared = SharedMaze.publish(maze) if maze is not None else None
+    try:
+        with multiprocessing.Pool(processes or os.cpu_count(), _init_worker,
+                                  (shared.name if shared else None,)) as pool:
+            for results in pool.imap_unordered(_worker, batches):
+                yield from results
+            # let the workers exit on their own, so they detach from the block
+            pool.close()
+            pool.join()
+    finally:
+        if shared is not None:
+            shared.close()
+            shared.unlink()
+
+
+def summarize(results: list[dict]) -> dict:
+    """Aggregates episode results into rates and averages."""
+    summary = {"episodes": len(results)}
+    for state in ("won", "lost", "timeout"):
+        summary[f"{state}_rate"] = (
+            sum(result["state"] == state for result in results) / max(1, len(results)))
+    won = [result["time"] for result in results if result["state"] == "won"]
+    summary["mean_win_time"] = sum(won) / len(won) if won else None
+    summary["mean_items_collected"] = (
+        sum(result["items_collected"] for result in results) / max(1, len(results)))
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("difficulty", choices=["easy", "medium", "hard", "???"])
+    parser.add_argument("-n", "--episodes", type=int, default=100)
+    parser.add_argument("-p", "--policy", choices=POLICIES, default="seek_end")
+    parser.add_argument("-j", "--processes", type=int, default=None)
+    parser.add_argument("--max-seconds", type=float, default=DEFAULT_MAX_SECONDS)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--maze-seed", type=int, default=None,
+                        help="play every episode in the maze of this seed, "
+                             "shared by the workers")
+    parser.add_argument("--jsonl", action="store_true",
+                        help="print every episode as a JSON line")
+    args = parser.parse_args()
+
+    maze = None if args.maze_seed is None else Maze(args.difficulty, args.maze_seed)
+    all_results = []
+    for result in run_rollouts(args.difficulty, args.episodes,
+                               POLICIES[args.policy], args.processes,
+                               args.max_seconds, seed=args.seed, maze=maze):
+        all_results.append(result)
+        if args.jsonl:
+            print(json.dumps(result), flush=True)
+    print(json.dumps(summarize(all_results), indent=2))
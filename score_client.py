@@ -0,0 +1,246 @@
+# score_client.py
+"""Leaderboard client for a shared `leaderboard_server`.
+
+`RemoteScores` has the same interface as `ScoreLog` and `ScoreDatabase`,
+so the leaderboard shows the rankings of all machines. Everything that
+touches the network happens on a background thread, which keeps one
+persistent connection to the server:
+
+- added runs are queued and sent in batches; a batch that fails to reach
+  the server is kept and retried with exponential backoff until the server
+  takes it, while a batch the server refuses is logged and dropped,
+- every `REFRESH_INTERVAL` seconds, and after each batch, the rankings are
+  fetched and replace the cached ones.
+
+The game thread only reads the cached rankings, so it never waits on the
+network. A new run is added to the cached rankings at once.
+"""
+
+import atexit
+import http.client
+import json
+import platform
+import queue
+import threading
+import time
+from urllib.parse import urlsplit
+
+from config import LEADERBOARD_URL, MACHINE_ID
+from debug_log import debug
+from score_log import DIFFICULTIES, insert_score
+
+# most runs sent in one request
+BATCH_SIZE = 500
+
+# seconds between fetches of the rankings
+REFRESH_INTERVAL = 30.0
+
+# seconds to wait after the first failed request, doubled up to the maximum
+RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 30.0
+
+# seconds before a request is given up
+TIMEOUT = 5.0
+
+# seconds spent sending the remaining runs when the game exits
+CLOSE_TIMEOUT = 2.0
+
+# best scores per difficulty kept in the cache
+KEEP = 1000
+
+
+class RemoteScores:
+    """Rankings of a leaderboard server, cached, and runs sent in the background.
+
+    Attributes:
+        url: Address of the server
+        machine: Machine id sent with the runs added here
+        keep: Best scores kept in `scores` per difficulty
+        scores: Ascending best scores of each difficulty, as last fetched
+        revision: Increases whenever `scores` changes
+    """
+
+    def __init__(self, url=LEADERBOARD_URL, machine=MACHINE_ID, keep=KEEP):
+        """Starts the background thread, which fetches the rankings first.
+
+        Args:
+            url: Address of the server, e.g. "http://127.0.0.1:8765"
+            machine: Id of this machine. Defaults to the host name
+            keep: Best scores kept in `scores` per difficulty
+        """
+        self.url = url
+        self.machine = machine or platform.node()
+        self.keep = keep
+        self.scores = {difficulty: [] for difficulty in DIFFICULTIES}
+        self.revision = 0
+        # guards `scores` and `revision`, which both threads change
+        self._lock = threading.Lock()
+        self._address = urlsplit(url)
+        self._connection = None
+        self._queue = queue.Queue()
+        self._unsent = []  # runs taken from the queue but not sent yet
+        self._sent = threading.Condition()
+        self._added = 0
+        self._acknowledged = 0
+        self._closing = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="leaderboard-client",
+                                        daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, difficulty: str, score: float, seed=None, run_seed=None) -> None:
+        """Records a run. Returns at once, the run is sent in the background.
+
+        Args:
+            difficulty: Difficulty of the run
+            score: Time of the run in seconds
+            seed: Seed of the maze
+            run_seed: Seed of the run's randomness
+        """
+        with self._lock:
+            insert_score(self.scores, difficulty, score, self.keep)
+            self.revision += 1
+            # queued under the lock, so a refresh sees either both or neither
+            self._added += 1
+            self._queue.put({"difficulty": difficulty, "score": score, "seed": seed,
+                             "run_seed": run_seed, "machine": self.machine,
+                             "played_at": time.time()})
+
+    def top(self, difficulty: str, limit=KEEP, offset=0) -> list[float]:
+        """Returns the `limit` best times of `difficulty`, skipping the first `offset`."""
+        return self.scores.get(difficulty, [])[offset:offset + limit]
+
+    def count(self, difficulty: str) -> int:
+        """Returns the number of scores cached for `difficulty`."""
+        return len(self.scores.get(difficulty, []))
+
+    def flush(self, timeout=None) -> bool:
+        """Waits until the server has taken or refused every run added so far.
+
+        Returns:
+            False if `timeout` seconds passed first.
+        """
+        added = self._added
+        with self._sent:
+            return self._sent.wait_for(lambda: self._acknowledged >= added, timeout)
+
+    def close(self) -> None:
+        """Tries to send the remaining runs for a moment, then stops the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._closing.set()
+        self._queue.put(None)
+        self._thread.join()
+
+    def _request(self, method: str, path: str, body=None) -> dict:
+        """Sends a request over the persistent connection and returns the answer.
+
+        Raises:
+            OSError: if the server can't be reached or doesn't answer.
+            http.client.HTTPException: if the answer is broken or the server
+                                       failed to handle the request.
+            ValueError: if the server refused the request, which is not
+                        worth sending again.
+        """
+        if self._connection is None:
+            self._connection = http.client.HTTPConnection(
+                self._address.hostname, self._address.port or 80, timeout=TIMEOUT)
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        try:
+            self._connection.request(method, path, body, headers)
+            response = self._connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            # connect again on the next request
+            self._connection.close()
+            self._connection = None
+            raise
+        if response.status >= 500:
+            raise http.client.HTTPException(
+                f"{method} {path}: {response.status} {data[:200]!r}")
+        if response.status != 200:
+            raise ValueError(f"{method} {path}: {response.status} {data[:200]!r}")
+        try:
+            return json.loads(data)
+        except ValueError as error:
+            raise http.client.HTTPException(f"{method} {path}: {error}") from error
+
+    def _refresh(self) -> None:
+        """Fetches the rankings and replaces the cached ones."""
+        rankings = self._request("GET", "/rankings")["scores"]
+        with self._lock:
+            # runs still on their way are not in the fetched rankings yet,
+            # including those added since the thread last took from the queue
+            self._take_queued()
+            for run in self._unsent:
+                insert_score(rankings, run["difficulty"], run["score"], self.keep)
+            for difficulty in self.scores:
+                self.scores[difficulty] = rankings.get(difficulty, [])[:self.keep]
+            self.revision += 1
+
+    def _take_queued(self) -> None:
+        """Moves the runs waiting in the queue to `_unsent`."""
+        try:
+            while True:
+                run = self._queue.get_nowait()
+                if run is not None:
+                    self._unsent.append(run)
+        except queue.Empty:
+            pass
+
+    def _run(self) -> None:
+        """Sends queued runs and refreshes the rankings until `close`."""
+        next_refresh = 0.0
+        delay = RETRY_DELAY
+        retry_at = 0.0
+        give_up_at = None
+        while True:
+            now = time.monotonic()
+            if self._closing.is_set() and give_up_at is None:
+                give_up_at = now + CLOSE_TIMEOUT
+            if give_up_at is not None and (not self._unsent and self._queue.empty()
+                                           or now >= give_up_at):
+                break
+
+            # wait for runs until there is something else to do
+            wake = min(next_refresh, retry_at) if self._unsent else next_refresh
+            if give_up_at is not None:
+                wake = min(wake, give_up_at)
+            try:
+                run = self._queue.get(timeout=max(0.0, wake - now))
+                if run is not None:
+                    self._unsent.append(run)
+            except queue.Empty:
+                pass
+            self._take_queued()
+
+            now = time.monotonic()
+            try:
+                if self._unsent and now >= retry_at:
+                    batch = self._unsent[:BATCH_SIZE]
+                    try:
+                        self._request("POST", "/runs", json.dumps({"runs": batch}))
+                    except ValueError as error:
+                        # the server won't take the batch however often it is sent
+                        debug("leaderboard_runs_rejected", error=str(error), runs=batch)
+                    del self._unsent[:len(batch)]
+                    with self._sent:
+                        self._acknowledged += len(batch)
+                        self._sent.notify_all()
+                    delay = RETRY_DELAY
+                    next_refresh = now
+                if now >= next_refresh and give_up_at is None:
+                    self._refresh()
+                    next_refresh = now + REFRESH_INTERVAL
+            except (OSError, http.client.HTTPException, ValueError) as error:
+                debug("leaderboard_request_failed", error=str(error), retry_in=delay,
+                      unsent=len(self._unsent))
+                retry_at = now + delay
+                next_refresh = max(next_refresh, now + delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+        if self._unsent:
+            debug("leaderboard_runs_dropped", count=len(self._unsent))
+        if self._connection is not None:
+            self._connection.close()
@@ -0,0 +1,214 @@
+# score_db.py
+"""Leaderboard storage in SQLite, keeping every run.
+
+Each finished run is stored with its time, when it was played, the seeds of
+its maze and run, and the machine it was played on. Indexes on (difficulty,
+score) and (machine, difficulty, score) keep rankings, percentiles and
+per-machine queries fast with millions of rows:
+
+    db = ScoreDatabase()
+    db.top("hard", 10)              # the 10 best times
+    db.rank("hard", 42.0)           # place a time of 42 s would take
+    db.percentile("hard", 0.5)      # median time
+    db.machine_runs("cabinet-3", "hard")  # best runs on one machine
+
+Like `ScoreLog`, `ScoreDatabase` keeps the best scores of each difficulty
+in `scores` and writes new runs on a background thread, in batches of one
+transaction each, so adding a run never waits for the disk. Queries run on
+the thread that opened the database.
+"""
+
+import atexit
+import platform
+import queue
+import sqlite3
+import threading
+import time
+
+from config import MACHINE_ID
+from debug_log import debug
+from score_log import DIFFICULTIES, KEEP, insert_score
+
+DATABASE_PATH = "leaderboard.db"
+
+# most runs written in one transaction
+BATCH_SIZE = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    difficulty TEXT NOT NULL,
+    score REAL NOT NULL,
+    played_at REAL NOT NULL,
+    seed INTEGER,
+    run_seed INTEGER,
+    machine TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_score ON runs (difficulty, score);
+CREATE INDEX IF NOT EXISTS runs_by_machine ON runs (machine, difficulty, score);
+"""
+
+# statements are reused with different parameters, sqlite3 keeps them
+# prepared in its statement cache
+INSERT_RUN = ("INSERT INTO runs (difficulty, score, played_at, seed, run_seed, machine) "
+              "VALUES (?, ?, ?, ?, ?, ?)")
+SELECT_TOP = ("SELECT score FROM runs WHERE difficulty = ? "
+              "ORDER BY score LIMIT ? OFFSET ?")
+COUNT_FASTER = "SELECT COUNT(*) FROM runs WHERE difficulty = ? AND score < ?"
+COUNT_RUNS = "SELECT COUNT(*) FROM runs WHERE difficulty = ?"
+SELECT_MACHINE_RUNS = ("SELECT difficulty, score, played_at, seed, run_seed FROM runs "
+                       "WHERE machine = ? AND difficulty = ? ORDER BY score LIMIT ?")
+SELECT_MACHINES = "SELECT DISTINCT machine FROM runs"
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Opens the database, creating the table and indexes if needed."""
+    connection = sqlite3.connect(path)
+    # readers don't block the writer and commits don't wait for a full sync
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class ScoreDatabase:
+    """Every run of the leaderboard, stored in SQLite.
+
+    Attributes:
+        path: Database file
+        machine: Machine id stored with the runs added here
+        keep: Best scores kept in `scores` per difficulty
+        scores: Ascending best scores of each difficulty
+        revision: Increases whenever `scores` changes
+    """
+
+    def __init__(self, path=DATABASE_PATH, machine=MACHINE_ID, keep=KEEP):
+        """Opens the database and starts the writer thread.
+
+        Args:
+            path: Database file. Defaults to `leaderboard.db`
+            machine: Id of this machine. Defaults to the host name
+            keep: Best scores kept in `scores` per difficulty
+        """
+        self.path = path
+        self.machine = machine or platform.node()
+        self.keep = keep
+        self._connection = _connect(path)
+        self.scores = {difficulty: self.top(difficulty, keep) for difficulty in DIFFICULTIES}
+        self.revision = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="leaderboard-writer",
+                                        daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, difficulty: str, score: float, seed=None, run_seed=None,
+            machine=None, played_at=None) -> None:
+        """Records a run. Returns at once, the run is written in the background.
+
+        Args:
+            difficulty: Difficulty of the run
+            score: Time of the run in seconds
+            seed: Seed of the maze
+            run_seed: Seed of the run's randomness
+            machine: Machine the run was played on. Defaults to this one
+            played_at: When the run was played, in seconds since the epoch.
+                       Defaults to now
+        """
+        insert_score(self.scores, difficulty, score, self.keep)
+        self.revision += 1
+        played_at = time.time() if played_at is None else played_at
+        self._queue.put((difficulty, score, played_at, seed, run_seed,
+                         machine or self.machine))
+
+    def flush(self) -> None:
+        """Waits until every run added so far is committed."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Writes the remaining runs and stops the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._connection.close()
+
+    def top(self, difficulty: str, limit=KEEP, offset=0) -> list[float]:
+        """Returns the `limit` best times of `difficulty`, skipping the first `offset`."""
+        rows = self._connection.execute(SELECT_TOP, (difficulty, limit, offset))
+        return [score for score, in rows]
+
+    def count(self, difficulty: str) -> int:
+        """Returns the number of runs stored for `difficulty`."""
+        return self._connection.execute(COUNT_RUNS, (difficulty,)).fetchone()[0]
+
+    def rank(self, difficulty: str, score: float) -> int:
+        """Returns the place, from 1, that a time of `score` takes in `difficulty`."""
+        return self._connection.execute(COUNT_FASTER, (difficulty, score)).fetchone()[0] + 1
+
+    def percentile(self, difficulty: str, fraction: float) -> float | None:
+        """Returns the time that a `fraction` of the runs of `difficulty` beat.
+
+        E.g. 0.5 gives the median. None if there are no runs.
+        """
+        count = self.count(difficulty)
+        if not count:
+            return None
+        offset = min(int(fraction * count), count - 1)
+        return self.top(difficulty, 1, offset)[0]
+
+    def machine_runs(self, machine: str, difficulty: str, limit=KEEP) -> list[tuple]:
+        """Returns the best runs of `difficulty` played on `machine`.
+
+        Returns:
+            (difficulty, score, played_at, seed, run_seed) of each run, best
+            first. `played_at` is in seconds since the epoch.
+        """
+        return self._connection.execute(SELECT_MACHINE_RUNS,
+                                        (machine, difficulty, limit)).fetchall()
+
+    def machines(self) -> list[str]:
+        """Returns the ids of all machines with stored runs."""
+        return [machine for machine, in self._connection.execute(SELECT_MACHINES)]
+
+    def _run(self) -> None:
+        """Writes queued runs in batches until `close`."""
+        connection = _connect(self.path)
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if batch[-1] is None:
+                running = False
+            runs = [run for run in batch if run is not None]
+            try:
+                if runs:
+                    self._write(connection, runs)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        connection.close()
+
+    def _write(self, connection: sqlite3.Connection, runs: list[tuple]) -> None:
+        """Commits `runs` in one transaction.
+
+        If that fails, each run is tried in a transaction of its own, so a
+        bad run only loses itself. Runs that still fail are logged and
+        dropped, keeping the writer alive.
+        """
+        try:
+            with connection:
+                connection.executemany(INSERT_RUN, runs)
+            debug("leaderboard_runs_written", count=len(runs))
+            return
+        except (sqlite3.Error, OverflowError) as error:
+            debug("leaderboard_batch_failed", error=str(error), count=len(runs))
+        for run in runs:
+            try:
+                with connection:
+                    connection.execute(INSERT_RUN, run)
+            except (sqlite3.Error, OverflowError) as error:
+                debug("leaderboard_run_dropped", error=str(error), run=run)
@@ -0,0 +1,274 @@
+# score_log.py
+"""Crash-safe leaderboard persistence that never blocks the game thread.
+
+Scores are kept in memory and handed to a background writer thread, which
+appends each one to a write-ahead log and syncs it to disk. Every
+`COMPACT_EVERY` scores, and when the game exits, the writer folds the log
+into the snapshot file: the snapshot is written to a temporary file, synced
+and renamed over the old one, so the snapshot on disk is always complete.
+After that the log is emptied.
+
+On load, the snapshot is read and the scores in the log are applied on top
+of it. A log line cut short by a crash is ignored. Each score has a sequence
+number and the snapshot remembers the last one it contains, so scores are
+not counted twice if the game stopped between renaming the snapshot and
+emptying the log. If a write fails, the writer logs it and keeps every
+score in memory, trying to compact again with each new score and on exit.
+
+Structure of the snapshot:
+{
+"seq": int,
+"scores": {"easy": list[float], "medium": list[float], "hard": list[float],
+           "???": list[float]}
+}
+
+Each log line is a JSON object {"seq": int, "difficulty": str, "score": float,
+"time": float}, plus any details passed to `ScoreLog.add`. A snapshot
+holding just the "scores" dictionary, as written by older versions, is read
+as well.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from bisect import insort
+
+from debug_log import debug
+
+# snapshot file, the log is next to it with the extension ".wal"
+SNAPSHOT_PATH = "leaderboard.json"
+
+# scores logged before the log is folded into the snapshot
+COMPACT_EVERY = 32
+
+# best scores kept per difficulty
+KEEP = 10
+
+DIFFICULTIES = ("easy", "medium", "hard", "???")
+
+
+def insert_score(scores: dict[str, list[float]], difficulty: str, score: float,
+                 keep=KEEP) -> None:
+    """Inserts `score` into the ascending list of `difficulty`, keeping the best `keep`."""
+    ranking = scores.setdefault(difficulty, [])
+    insort(ranking, score)
+    if len(ranking) > keep:
+        ranking.pop()
+
+
+class ScoreLog:
+    """The leaderboard's scores, persisted by a background writer thread.
+
+    `scores` belongs to the game thread; the writer keeps its own copy, so
+    neither waits for the other.
+
+    Attributes:
+        path: Snapshot file
+        wal_path: Write-ahead log file
+        keep: Best scores kept per difficulty
+        scores: Ascending best scores of each difficulty
+        revision: Increases whenever `scores` changes
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH, keep=KEEP, compact_every=COMPACT_EVERY):
+        """Loads the scores from disk and starts the writer thread.
+
+        Args:
+            path: Snapshot file. Defaults to `leaderboard.json`
+            keep: Best scores kept per difficulty
+            compact_every: Scores logged before the log is folded into the
+                           snapshot
+        """
+        self.path = path
+        self.wal_path = os.path.splitext(path)[0] + ".wal"
+        self.keep = keep
+        self.compact_every = compact_every
+        self.scores, self._seq, dirty = self._recover()
+        self.revision = 0
+        self._queue = queue.Queue()
+        self._wal = None  # the open log, used by the writer thread only
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run,
+            args=({d: list(s) for d, s in self.scores.items()}, self._seq, dirty),
+            name="leaderboard-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, difficulty: str, score: float, **details) -> None:
+        """Records a score. Returns at once, the score is written in the background.
+
+        Args:
+            difficulty: Difficulty of the run
+            score: Time of the run in seconds
+            **details: Anything else to log about the run, e.g. its seed
+        """
+        insert_score(self.scores, difficulty, score, self.keep)
+        self.revision += 1
+        self._seq += 1
+        self._queue.put({"seq": self._seq, "difficulty": difficulty,
+                         "score": score, "time": time.time(), **details})
+
+    def top(self, difficulty: str, limit=KEEP, offset=0) -> list[float]:
+        """Returns the `limit` best times of `difficulty`, skipping the first `offset`."""
+        return self.scores.get(difficulty, [])[offset:offset + limit]
+
+    def count(self, difficulty: str) -> int:
+        """Returns the number of scores kept for `difficulty`."""
+        return len(self.scores.get(difficulty, []))
+
+    def flush(self) -> None:
+        """Waits until the writer has handled every score added so far.
+
+        Scores are then on disk, unless writing failed, which is logged.
+        """
+        self._queue.join()
+
+    def close(self) -> None:
+        """Folds the log into the snapshot and stops the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _recover(self) -> tuple[dict[str, list[float]], int, bool]:
+        """Reads the snapshot and applies the log on top of it.
+
+        Returns:
+            The scores, the last sequence number, and whether the files on
+            disk need to be compacted.
+        """
+        scores = {difficulty: [] for difficulty in DIFFICULTIES}
+        seq = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if "scores" in snapshot:
+                seq = snapshot.get("seq", 0)
+                snapshot = snapshot["scores"]
+            scores.update(snapshot)
+            dirty = False
+        except FileNotFoundError:
+            dirty = True
+        except ValueError:
+            debug("leaderboard_snapshot_unreadable", path=self.path)
+            dirty = True
+
+        try:
+            with open(self.wal_path, "r", encoding="utf-8") as f:
+                lines = f.read().split("\n")
+        except FileNotFoundError:
+            lines = []
+        # the last element is "" unless the final write was cut short
+        torn = lines.pop() if lines else ""
+        replayed = 0
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                torn = line
+                break
+            if record["seq"] > seq:
+                insert_score(scores, record["difficulty"], record["score"], self.keep)
+                seq = record["seq"]
+                replayed += 1
+        if torn or replayed:
+            debug("leaderboard_recovered", replayed=replayed, torn=bool(torn))
+        return scores, seq, dirty or bool(lines) or bool(torn)
+
+    def _run(self, scores: dict[str, list[float]], seq: int, dirty: bool) -> None:
+        """Writes queued scores to the log until `close`.
+
+        If the log can't be written, the writer stops appending to it, as it
+        may now end in a torn line. Instead it retries compacting with every
+        new score until that works, so all scores reach the disk once it is
+        writable again.
+
+        Args:
+            scores: The writer's own copy of the scores
+            seq: Sequence number of the last score in `scores`
+            dirty: Whether to compact before logging new scores
+        """
+        # whether `scores` holds scores that are in neither file, or the log
+        # may be torn, so that only a compaction brings the files up to date
+        unsaved = dirty and not self._compact(scores, seq)
+        pending = 0  # scores in the log since the last compaction
+        running = True
+        while running:
+            record = self._queue.get()
+            try:
+                if record is None:
+                    running = False
+                else:
+                    insert_score(scores, record["difficulty"], record["score"], self.keep)
+                    seq = record["seq"]
+                    # while unsaved, the compaction below retries instead
+                    if not unsaved:
+                        if self._append(record):
+                            pending += 1
+                        else:
+                            unsaved = True
+                if unsaved or pending >= self.compact_every or pending and not running:
+                    if self._compact(scores, seq):
+                        unsaved = False
+                        pending = 0
+            finally:
+                self._queue.task_done()
+        if self._wal is not None:
+            self._wal.close()
+
+    def _append(self, record: dict) -> bool:
+        """Appends `record` to the log and syncs it to disk.
+
+        Returns:
+            False if that failed, leaving the log possibly torn.
+        """
+        try:
+            if self._wal is None:
+                self._wal = open(self.wal_path, "a", encoding="utf-8")
+            self._wal.write(json.dumps(record) + "\n")
+            self._wal.flush()
+            os.fsync(self._wal.fileno())
+            return True
+        except OSError as error:
+            debug("leaderboard_log_failed", error=str(error), seq=record["seq"])
+            # drop what is left in the buffer, the next compaction rewrites it all
+            if self._wal is not None:
+                try:
+                    self._wal.close()
+                except OSError:
+                    pass
+            self._wal = None
+            return False
+
+    def _compact(self, scores: dict[str, list[float]], seq: int) -> bool:
+        """Atomically replaces the snapshot with `scores`, then empties the log.
+
+        Args:
+            scores: Scores to write
+            seq: Sequence number of the last score in `scores`
+
+        Returns:
+            False if that failed. The previous snapshot is then still
+            complete, and the log still holds what it held before.
+        """
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"seq": seq, "scores": scores}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            if self._wal is not None:
+                self._wal.truncate(0)
+            else:
+                open(self.wal_path, "w").close()
+        except OSError as error:
+            debug("leaderboard_compact_failed", error=str(error), seq=seq)
+            return False
+        debug("leaderboard_compacted", seq=seq)
+        return True
@@ -15,6 +15,8 @@ class Circle:
         radius (int): The radius of the circle.
     """
 
+    __slots__ = ("x", "y", "z", "radius")
+
     def __init__(self, x, y, z, radius):
         """
         Initializes the Circle instance with position and radius.
@@ -47,7 +49,8 @@ class Circle:
         planar_dist = dist((other.get_x(), other.get_y()), (self.x, self.y))
         return planar_dist < self.radius + other.radius
 
-    def display(self, screen, from_z, color=(0, 0, 255)) -> None:
+    def display(self, screen, from_z, color=(0, 0, 255), scale=1.0,
+                offset=(0, 0)) -> None:
         """
         Renders the circle on the given Pygame screen if it's on the same z-layer.
 
@@ -55,13 +58,16 @@ class Circle:
             screen (pygame.Surface): The Pygame surface to draw the circle on.
             from_z (int): The current viewing z-layer.
             color (tuple, optional): RGB color of the circle. Defaults to blue (0, 0, 255).
+            scale (float, optional): Size of `screen` relative to the maze. Defaults to 1.0.
+            offset (tuple, optional): Maze position shown at the top left of `screen`.
+                Defaults to (0, 0).
         """
         if self.get_z() == from_z:
             pygame.draw.circle(
                 surface=screen,
                 color=color,
-                center=(self.x, self.y),
-                radius=self.radius,
+                center=((self.x - offset[0]) * scale, (self.y - offset[1]) * scale),
+                radius=self.radius * scale,
             )
 
     def get_parameters(self) -> tuple[float, float, int, int]:
@@ -135,6 +141,8 @@ class Sphere(Circle):
         Inherits all attributes from the Circle class.
     """
 
+    __slots__ = ()
+
     def __init__(self, x: float, y: float, z: int, radius: int):
         """Initializes the Sphere instance with position and radius.
 
@@ -164,7 +172,7 @@ class Sphere(Circle):
         return (radius_3d ** 2 - z_distance ** 2) ** 0.5
 
     def display(self, screen: pygame.Surface, from_z: int,
-                color=(0, 0, 255)) -> None:
+                color=(0, 0, 255), scale=1.0, offset=(0, 0)) -> None:
         """Renders the sphere as a projected circle.
 
         Also draws a semi-transparent shadow to represent depth.
@@ -173,7 +181,12 @@ class Sphere(Circle):
             screen: The Pygame surface to draw the sphere on
             from_z: The current viewing z-layer
             color: RGB color of the sphere. Defaults to blue (0, 0, 255)
+            scale: Size of `screen` relative to the maze. Defaults to 1.0
+            offset: Maze position shown at the top left of `screen`.
+                    Defaults to (0, 0)
         """
+        x = (self.x - offset[0]) * scale
+        y = (self.y - offset[1]) * scale
         z_distance = abs(self.z - from_z)
         circle_radius = self.get_cross_section_radius(self.radius, z_distance)
 
@@ -182,26 +195,27 @@ class Sphere(Circle):
             pygame.draw.circle(
                 surface=screen,
                 color=color,
-                center=(self.x, self.y),
-                radius=int(circle_radius),
+                center=(x, y),
+                radius=int(circle_radius * scale),
             )
         # draw shadow of obstacle
         shadow_z_distance = max(0, abs(self.z - from_z) - 10)
         shadow_circle_radius = self.get_cross_section_radius(self.radius, shadow_z_distance)
         if shadow_circle_radius > 0:
             # surface for transparency
+            radius = self.radius * scale
             transparent_surface = pygame.Surface(
-                (self.radius * 2, self.radius * 2),
+                (radius * 2, radius * 2),
                 pygame.SRCALPHA
             )
             # draw circle on transparent surface and display
             pygame.draw.circle(
                 surface=transparent_surface,
                 color=(0, 0, 255, 128),  # blue with 50% transparency
-                center=(self.radius, self.radius),
-                radius=shadow_circle_radius
+                center=(radius, radius),
+                radius=shadow_circle_radius * scale
             )
-            screen.blit(transparent_surface, (self.x - self.radius, self.y - self.radius))
+            screen.blit(transparent_surface, (x - radius, y - radius))
 
     def collides_with_circle(self, other) -> bool:
         """Determines whether this sphere collides with a circle.
@@ -229,6 +243,8 @@ class Sphere(Circle):
 class Cylinder:
     """Represents a cylinder in 3D space using a stack of circles."""
 
+    __slots__ = ("x", "y", "start_z", "end_z", "radius")
+
     def __init__(self, x: float, y: float, start_z: int, end_z: int,
                  radius: int):
         """Initializes the Cylinder instance with position, z-range, and radius.
@@ -246,7 +262,7 @@ class Cylinder:
         self.end_z = end_z
         self.radius = radius
 
-    def display(self, screen, from_z) -> None:
+    def display(self, screen, from_z, scale=1.0, offset=(0, 0)) -> None:
         """Renders the cylinder on the given Pygame screen
         
         Only display if the viewing layer is within its z-range.
@@ -254,13 +270,16 @@ class Cylinder:
         Args:
             screen (pygame.Surface): The Pygame surface to draw the cylinder on.
             from_z (int): The current viewing z-layer.
+            scale (float, optional): Size of `screen` relative to the maze. Defaults to 1.0.
+            offset (tuple, optional): Maze position shown at the top left of `screen`.
+                Defaults to (0, 0).
         """
         if self.start_z <= from_z <= self.end_z:
             pygame.draw.circle(
                 surface=screen,
                 color=(255, 215, 0),  # Gold color for items
-                center=(self.x, self.y),
-                radius=int(self.radius),
+                center=((self.x - offset[0]) * scale, (self.y - offset[1]) * scale),
+                radius=int(self.radius * scale),
             )
 
     def collides_with_circle(self, other: Circle) -> bool:
@@ -0,0 +1,135 @@
+# shared_maze.py
+"""Publishes a maze's layout once in shared memory for worker processes.
+
+The owner packs the maze with `vector_env.pack_maze` and copies the arrays
+into a single shared memory block:
+
+    shared = SharedMaze.publish(Maze("hard"))
+    ...  # start workers with shared.name
+    shared.close()
+    shared.unlink()
+
+Workers attach by name and get read-only NumPy views straight into the
+block, so no worker holds its own copy of the layout:
+
+    shared = SharedMaze.attach(name)
+    env = VectorMazeEnv(64, shared.difficulty, layout=shared.arrays)
+    maze = shared.to_maze()  # obstacles and items read from the block
+
+The block must stay attached while anything built from it is in use, and
+be closed only after those are gone.
+"""
+
+import json
+import struct
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from maze import Maze
+from vector_env import pack_maze
+
+# block layout: length of the JSON index, the index, then the aligned arrays
+# at offsets relative to the first aligned position after the index
+_HEADER = struct.Struct("<I")
+_ALIGNMENT = 64
+
+
+def _align(offset: int) -> int:
+    """Rounds `offset` up to the array alignment."""
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+class SharedMaze:
+    """A maze layout stored in shared memory.
+
+    Attributes:
+        name: Name of the shared memory block, used to attach to it
+        difficulty: Difficulty the maze was generated with
+        seed: Seed the maze was generated from
+        arrays: Read-only views of the arrays from `pack_maze`
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        """Wraps a shared memory block holding a published maze.
+
+        Use `publish` or `attach` instead of calling this directly.
+
+        Args:
+            shm: The shared memory block
+        """
+        self._shm = shm
+        self.name = shm.name
+        (index_size,) = _HEADER.unpack_from(shm.buf, 0)
+        index = json.loads(bytes(shm.buf[_HEADER.size:_HEADER.size + index_size]))
+        data_start = _align(_HEADER.size + index_size)
+        self.difficulty = index["difficulty"]
+        self.seed = index["seed"]
+        self.arrays = {}
+        for key, (dtype, shape, offset) in index["arrays"].items():
+            view = np.ndarray(shape, dtype=dtype, buffer=shm.buf,
+                              offset=data_start + offset)
+            view.flags.writeable = False
+            self.arrays[key] = view
+
+    @classmethod
+    def publish(cls, maze: Maze) -> "SharedMaze":
+        """Copies the layout of `maze` into a new shared memory block.
+
+        Args:
+            maze: The maze to publish
+
+        Returns:
+            The published maze. The caller owns the block and must `unlink` it.
+        """
+        arrays = pack_maze(maze)
+
+        # the index describes each array with an offset from the data start
+        index = {"difficulty": maze.difficulty, "seed": maze.seed, "arrays": {}}
+        offset = 0
+        for key, array in arrays.items():
+            index["arrays"][key] = (array.dtype.str, array.shape, offset)
+            offset = _align(offset + array.nbytes)
+        index_bytes = json.dumps(index).encode()
+        data_start = _align(_HEADER.size + len(index_bytes))
+
+        shm = shared_memory.SharedMemory(create=True,
+                                         size=max(1, data_start + offset))
+        _HEADER.pack_into(shm.buf, 0, len(index_bytes))
+        shm.buf[_HEADER.size:_HEADER.size + len(index_bytes)] = index_bytes
+        for key, array in arrays.items():
+            dtype, shape, start = index["arrays"][key]
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf,
+                       offset=data_start + start)[...] = array
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedMaze":
+        """Attaches to a maze published by another process.
+
+        Args:
+            name: The `name` of the published maze
+
+        Returns:
+            The maze, with read-only views of the shared arrays.
+        """
+        return cls(shared_memory.SharedMemory(name=name))
+
+    def to_maze(self) -> Maze:
+        """Builds a `Maze` with the published layout.
+
+        The maze's obstacles and items are read straight from the shared
+        arrays. Only the items' collected flags and the hunters, which
+        change during a run, are the maze's own. Drop the maze before
+        closing the block.
+        """
+        return Maze(self.difficulty, self.seed, layout=self.arrays, copy_layout=False)
+
+    def close(self) -> None:
+        """Detaches from the block. Views of the arrays must not be used after."""
+        self.arrays = {}
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Frees the block once every process has closed it. Owner only."""
+        self._shm.unlink()
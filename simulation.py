@@ -0,0 +1,136 @@
+# simulation.py
+"""Game rules without any display, keyboard or wall clock.
+
+A `World` holds the state of one run through a maze and is advanced with
+`World.step`, which takes the player's input for the step explicitly. The
+game drives it once per tick from the keyboard, but it can equally be
+stepped as fast as possible, e.g. for tests, bots or validating runs.
+
+All randomness during a run comes from streams derived from the run's
+seed, so a maze's seed, the run's seed and the inputs reproduce a run.
+"""
+
+from config import TICK_RATE
+from debug_log import debug
+from maze import Maze
+from perf_hud import NO_TIMER
+from player import Player, PlayerInput
+from rng import RngService, new_seed
+from stopwatch import Stopwatch
+from tracing import traced
+
+
+class World:
+    """State of a single run through a maze.
+
+    Attributes:
+        maze: The maze being played
+        player: The player running through the maze
+        time: Simulation time in seconds
+        ticks: Number of steps taken since the last reset
+        state: "playing", "won" or "lost"
+        items_collected: Number of items collected since the last reset
+        stopwatch: Times the run in simulation time
+        seed: Seed of the run's randomness
+        hunter_rng: Random stream for the hunters' movement
+        item_rng: Random stream for the items' effects
+        phase_timer: Times the phases of each step, see `perf_hud`
+    """
+
+    def __init__(self, maze: Maze, seed=None):
+        """Initializes a run through `maze`.
+
+        Args:
+            maze: The maze to play
+            seed: Seed for the run's randomness. Defaults to a fresh seed
+        """
+        self.maze = maze
+        self.time = 0.0
+        self.phase_timer = NO_TIMER
+        self.stopwatch = Stopwatch(precision=2, time_source=self.get_time)
+        self.reset(seed)
+
+    def reset(self, seed=None) -> None:
+        """Restarts the run from the start of the maze.
+
+        Args:
+            seed: Seed for the new run's randomness. Defaults to a fresh seed
+        """
+        self.seed = new_seed() if seed is None else seed
+        rng = RngService(self.seed)
+        self.hunter_rng = rng.stream("hunters")
+        self.item_rng = rng.stream("items")
+        self.time = 0.0
+        self.player = Player(*self.maze.get_start_location().get_location())
+        self.ticks = 0
+        self.state = "playing"
+        self.items_collected = 0
+        self.maze.reset()
+        self.maze.update_around(self.player)
+        self.stopwatch.reset()
+        self.stopwatch.start()
+
+    def get_time(self) -> float:
+        """Returns the simulation time in seconds."""
+        return self.time
+
+    @traced("world.step")
+    def step(self, inputs: PlayerInput, dt=1 / TICK_RATE) -> str:
+        """Advances the run by one simulation step.
+
+        Does nothing once the run is over.
+
+        Args:
+            inputs: The player's input during this step
+            dt: Simulation time covered by the step, in seconds
+
+        Returns:
+            The state of the run after the step.
+        """
+        if self.state != "playing":
+            return self.state
+        self.time += dt
+        self.ticks += 1
+
+        # handle player movement with collisions
+        phase = self.phase_timer
+        self.maze.update_around(self.player)
+        with phase("handle_movement"):
+            self.player.handle_movement(self.maze, inputs, self.time)
+        with phase("collect_items"):
+            self.items_collected += self.maze.collect_items(self.player, self.item_rng)
+        with phase("move_hunters"):
+            self.maze.move_hunters(self.player, self.hunter_rng)
+
+        # check if we won/lost the game; reaching the end wins even if a
+        # hunter is touched on the same tick, as the score was always kept
+        if self.check_win_condition():
+            self.state = "won"
+        elif self.check_lose_condition():
+            self.state = "lost"
+        if self.state != "playing":
+            self.stopwatch.pause()
+        return self.state
+
+    def check_win_condition(self) -> bool:
+        """Check if the player reached the end.
+
+        Returns:
+            True if the player reached the end, otherwise False
+        """
+        if self.player.collides_with_circle(self.maze.get_end_location()):
+            debug("won", time=self.time)
+            return True
+        return False
+
+    def check_lose_condition(self) -> bool:
+        """Check if the player lost the game.
+
+        Returns:
+            True if the player lost the game by touching a hunter,
+            otherwise False
+        """
+        if self.maze.collide_hunters(self.player):
+            debug("lost", time=self.time)
+            return True
+        return False
@@ -7,20 +7,24 @@ class Stopwatch:
     Stopwatch with start, pause, and reset functionalities.
 
     Attributes:
+        time_source (callable): Returns the current time in seconds.
         start_time (float): The timestamp when the stopwatch was last started.
         precision (int): The number of decimal places to round the elapsed time.
         elapsed_time (float): The total accumulated elapsed time.
         running (bool): Indicates whether the stopwatch is currently running.
     """
 
-    def __init__(self, precision=2):
+    def __init__(self, precision=2, time_source=time.time):
         """
         Initializes the Stopwatch instance with specified precision.
 
         Args:
             precision (int, optional): Number of decimal places for elapsed time. Defaults to 2.
+            time_source (callable, optional): Returns the current time in seconds,
+                e.g. the game's simulation time. Defaults to `time.time`.
         """
-        self.start_time = time.time()
+        self.time_source = time_source
+        self.start_time = time_source()
         self.precision = precision
         self.elapsed_time = 0
         self.running = False
@@ -33,7 +37,7 @@ class Stopwatch:
         """
         if self.running:  # already started
             return
-        self.start_time = time.time()
+        self.start_time = self.time_source()
         self.running = True
 
     def pause(self):
@@ -44,8 +48,8 @@ class Stopwatch:
         """
         if not self.running:  # already paused
             return
-        self.elapsed_time += time.time() - self.start_time
-        self.start_time = time.time()
+        self.elapsed_time += self.time_source() - self.start_time
+        self.start_time = self.time_source()
         self.running = False
 
     def get_elapsed_time(self):
@@ -58,7 +62,7 @@ class Stopwatch:
             float: The total elapsed time in seconds, rounded to the stopwatch's precision.
         """
         if self.running:
-            current_elapsed = self.elapsed_time + (time.time() - self.start_time)
+            current_elapsed = self.elapsed_time + (self.time_source() - self.start_time)
             return round(current_elapsed, self.precision)
         return round(self.elapsed_time, self.precision)
 
@@ -85,7 +89,7 @@ class Stopwatch:
 
         After resetting, the stopwatch starts in a paused state with zero elapsed time.
         """
-        self.__init__()
+        self.__init__(self.precision, self.time_source)
 
 
 if __name__ == '__main__':
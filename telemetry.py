@@ -0,0 +1,267 @@
+# telemetry.py
+"""Per-tick telemetry of runs, for looking into reported stutters and deaths.
+
+Every tick of a run, the game records a sample: the player's position and
+velocity, which effects are active, how long the frame took and how many
+hunters are close. Samples go into a preallocated ring buffer of
+`CAPACITY` fixed-size records, which costs the game thread one row write
+per tick. A background thread copies new samples out of the buffer every
+`FLUSH_INTERVAL` seconds and writes them to a gzip file per run:
+
+    telemetry = TelemetryRecorder()
+    telemetry.start_run("1718000000-1a2b3c4d", difficulty="hard")
+    telemetry.record(world, frame_time)  # once per tick
+    telemetry.end_run(world.state)
+
+A run's file is named "<name>-playing.tlm.gz" while it is written and
+renamed to end in its outcome, e.g. "-lost", once the run is over. A file
+left as "-playing" by a crash can still be read up to the last flush. Only
+the newest `FILES_KEPT` files are kept.
+
+A file holds `MAGIC`, the length of a JSON header and the header itself,
+followed by the samples as `SAMPLE` records. Run `python telemetry.py FILE`
+for the worst frames and the last moments of a run.
+"""
+
+import argparse
+import atexit
+import glob
+import gzip
+import json
+import os
+import queue
+import struct
+import threading
+
+import numpy as np
+
+from debug_log import debug
+
+MAGIC = b"MZTL"
+VERSION = 1
+
+# where the files are written
+TELEMETRY_DIR = "telemetry"
+
+# samples held by the ring buffer, about a minute at 60 ticks per second
+CAPACITY = 4096
+
+# seconds between writes of new samples
+FLUSH_INTERVAL = 1.0
+
+# newest files kept in TELEMETRY_DIR
+FILES_KEPT = 50
+
+# hunters closer than this, and at most HUNTER_Z_RANGE layers away, count
+# as near; further away they don't chase the player
+HUNTER_RANGE = 200
+HUNTER_Z_RANGE = 20
+
+# bits of the effects field
+DASHING = 1
+TELEPORTING = 2
+SPEED_BOOST = 4
+
+SAMPLE = np.dtype([
+    ("tick", "<u4"),
+    ("x", "<f4"), ("y", "<f4"), ("z", "<i4"),
+    ("vx", "<f4"), ("vy", "<f4"), ("vz", "<f4"),
+    ("effects", "u1"),
+    ("hunters_near", "<u2"),
+    ("frame_ms", "<f4"),
+])
+
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+def hunters_near(world) -> int:
+    """Returns the number of hunters near the player of `world`."""
+    player = world.player
+    x, y, z = player.x, player.y, player.z
+    range_squared = HUNTER_RANGE * HUNTER_RANGE
+    return sum(1 for hunter in world.maze.hunters
+               if abs(hunter.z - z) <= HUNTER_Z_RANGE
+               and (hunter.x - x) ** 2 + (hunter.y - y) ** 2 <= range_squared)
+
+
+class TelemetryRecorder:
+    """Records samples of runs into a ring buffer, written out in the background.
+
+    Attributes:
+        directory: Where the files are written
+        samples: The ring buffer
+        count: Samples recorded since the recorder was created
+        recording: Whether a run is being recorded
+    """
+
+    def __init__(self, directory=TELEMETRY_DIR, capacity=CAPACITY):
+        """Initializes an empty recorder and starts the writer thread.
+
+        Args:
+            directory: Where the files are written
+            capacity: Samples held by the ring buffer
+        """
+        self.directory = directory
+        self.samples = np.zeros(capacity, dtype=SAMPLE)
+        self.count = 0
+        self.recording = False
+        self._commands = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def start_run(self, name: str, **header) -> None:
+        """Starts recording a run into a new file.
+
+        Args:
+            name: Start of the file name, unique to the run
+            **header: Details of the run stored in the file, e.g. its seeds
+        """
+        if self.recording:
+            self.end_run("playing")
+        self.recording = True
+        self._commands.put(("open", self.count, name, header))
+
+    def record(self, world, frame_time: float) -> None:
+        """Records a sample of `world` after a tick.
+
+        Args:
+            world: The world that was just stepped
+            frame_time: Real time in seconds taken by the last frame
+        """
+        player = world.player
+        velocity = player.velocity
+        effects = (DASHING * player.is_dashing | TELEPORTING * player.is_teleporting
+                   | SPEED_BOOST * player.speed_boost_active)
+        self.samples[self.count % len(self.samples)] = (
+            world.ticks, player.x, player.y, player.z, velocity.x, velocity.y,
+            velocity.z, effects, hunters_near(world), frame_time * 1000)
+        # the writer only reads samples below the count
+        self.count += 1
+
+    def end_run(self, outcome: str) -> None:
+        """Stops recording the run, naming its file after `outcome`, e.g. "lost"."""
+        if not self.recording:
+            return
+        self.recording = False
+        self._commands.put(("close", self.count, outcome))
+
+    def close(self) -> None:
+        """Writes the remaining samples and stops the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self.end_run("playing")
+        self._commands.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        """Writes new samples to the file of the current run until `close`."""
+        file = path = name = None
+        written = 0  # samples below this have been written or skipped
+        while True:
+            # samples up to here belong to the current run, unless a
+            # command that is already queued says otherwise
+            end = self.count
+            try:
+                command = self._commands.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                if file is not None:
+                    written = self._write(file, written, end)
+                continue
+            if command is None:
+                break
+            if command[0] == "open":
+                _, written, name, header = command
+                os.makedirs(self.directory, exist_ok=True)
+                self._prune()
+                path = os.path.join(self.directory, f"{name}-playing.tlm.gz")
+                file = gzip.open(path, "wb", compresslevel=6)
+                header = json.dumps({"version": VERSION, "dtype": SAMPLE.descr,
+                                     **header}).encode()
+                file.write(MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+            elif command[0] == "close":
+                _, end, outcome = command
+                written = self._write(file, written, end)
+                file.close()
+                final_path = os.path.join(self.directory, f"{name}-{outcome}.tlm.gz")
+                os.replace(path, final_path)
+                debug("telemetry_written", path=final_path)
+                file = None
+
+    def _write(self, file, start: int, end: int) -> int:
+        """Writes the samples in [start, end) to `file`.
+
+        Returns:
+            `end`, the first sample not written.
+        """
+        capacity = len(self.samples)
+        if end - start > capacity:
+            debug("telemetry_dropped", count=end - start - capacity)
+            start = end - capacity
+        if start == end:
+            return end
+        first, last = start % capacity, (end - 1) % capacity + 1
+        if first < last:
+            data = self.samples[first:last].tobytes()
+        else:
+            data = self.samples[first:].tobytes() + self.samples[:last].tobytes()
+        file.write(data)
+        file.flush()
+        return end
+
+    def _prune(self) -> None:
+        """Deletes the oldest files, leaving room for one more."""
+        paths = sorted(glob.glob(os.path.join(self.directory, "*.tlm.gz")),
+                       key=os.path.getmtime)
+        for path in paths[:max(0, len(paths) - FILES_KEPT + 1)]:
+            os.remove(path)
+
+
+def load(path: str) -> tuple[dict, np.ndarray]:
+    """Reads a telemetry file, up to where it was cut off if the game crashed.
+
+    Returns:
+        The header and the samples.
+    """
+    with gzip.open(path, "rb") as f:
+        data = bytearray()
+        try:
+            while chunk := f.read(1 << 16):
+                data += chunk
+        except EOFError:
+            pass  # written up to the last flush
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a telemetry file")
+    start = len(MAGIC) + _HEADER_LENGTH.size
+    (length,) = _HEADER_LENGTH.unpack_from(data, len(MAGIC))
+    header = json.loads(data[start:start + length])
+    dtype = np.dtype([tuple(field) for field in header["dtype"]])
+    body = data[start + length:]
+    body = body[:len(body) - len(body) % dtype.itemsize]
+    return header, np.frombuffer(bytes(body), dtype=dtype)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="telemetry file to summarize")
+    parser.add_argument("--worst", type=int, default=10, help="slowest frames shown")
+    parser.add_argument("--last", type=int, default=30, help="last ticks shown")
+    args = parser.parse_args()
+
+    header, samples = load(args.path)
+    print(json.dumps({key: value for key, value in header.items() if key != "dtype"}))
+    print(f"{len(samples)} ticks")
+    if len(samples):
+        print(f"frame time: median {np.median(samples['frame_ms']):.1f} ms, "
+              f"max {samples['frame_ms'].max():.1f} ms")
+
+        def show(title: str, rows: np.ndarray) -> None:
+            print(f"\n{title}\n" + "".join(f"{name:>13}" for name in samples.dtype.names))
+            for row in rows.tolist():
+                print("".join(f"{value:>13.1f}" if isinstance(value, float)
+                              else f"{value:>13}" for value in row))
+
+        show("slowest frames", samples[np.argsort(samples["frame_ms"])[::-1][:args.worst]])
+        show("last ticks", samples[-args.last:])
@@ -0,0 +1,108 @@
+# test_leaderboard_server.py
+"""Tests that the leaderboard server refuses bad runs without losing good ones.
+
+Run with `python -m unittest test_leaderboard_server`.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from leaderboard_server import LeaderboardServer, parse_run
+from score_db import ScoreDatabase
+
+RUN = {"difficulty": "hard", "score": 12.5, "seed": 1, "run_seed": 2,
+       "machine": "cabinet-1", "played_at": 1700000000.0}
+
+
+def _body(*runs) -> bytes:
+    """Returns a POST /runs body holding `runs`."""
+    return json.dumps({"runs": list(runs)}).encode()
+
+
+class ParseRunTest(unittest.TestCase):
+    """`parse_run` accepts what the database can store and nothing else."""
+
+    def test_valid_run(self):
+        self.assertEqual(parse_run(RUN), RUN)
+
+    def test_seeds_in_signed_64_bit_range(self):
+        for seed in (2 ** 63 - 1, -2 ** 63):
+            self.assertEqual(parse_run({**RUN, "seed": seed})["seed"], seed)
+        for field in ("seed", "run_seed"):
+            for seed in (2 ** 63, -2 ** 63 - 1, 2 ** 70):
+                with self.assertRaises(ValueError):
+                    parse_run({**RUN, field: seed})
+
+    def test_numbers_too_large_for_a_float(self):
+        for field in ("score", "played_at"):
+            with self.assertRaises(ValueError):
+                parse_run({**RUN, field: 10 ** 400})
+
+    def test_wrong_types(self):
+        for field, value in (("score", "12"), ("score", True), ("seed", 1.5),
+                             ("difficulty", None), ("played_at", float("nan"))):
+            with self.assertRaises(ValueError):
+                parse_run({**RUN, field: value})
+
+
+class LeaderboardServerTest(unittest.TestCase):
+    """Requests to a server backed by a fresh database."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = ScoreDatabase(os.path.join(self.directory.name, "runs.db"),
+                                machine="test")
+        self.server = LeaderboardServer(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_bad_run_refuses_whole_batch(self):
+        for bad in ({"seed": 2 ** 70}, {"run_seed": 2 ** 70}, {"score": 10 ** 400},
+                    {"played_at": 10 ** 400}):
+            status, _ = self.server.handle("POST", "/runs", _body(RUN, {**RUN, **bad}))
+            self.assertEqual(status, 400, bad)
+        self.db.flush()
+        self.assertEqual(self.db.count("hard"), 0)
+
+    def test_runs_after_refused_batch_are_stored(self):
+        self.server.handle("POST", "/runs", _body(RUN, {**RUN, "seed": 2 ** 70}))
+        status, response = self.server.handle("POST", "/runs", _body(RUN, RUN))
+        self.assertEqual((status, json.loads(response)), (200, {"accepted": 2}))
+        self.db.flush()
+        self.assertEqual(self.db.count("hard"), 2)
+
+    def test_unexpected_error_answers_500(self):
+        def fail(method, path, body):
+            raise RuntimeError("bug")
+
+        self.server.handle = fail
+        status_lines = asyncio.run(self._request_twice())
+        self.assertEqual(status_lines, [b"HTTP/1.1 500 Internal Server Error\r\n"] * 2)
+
+    async def _request_twice(self) -> list[bytes]:
+        """Sends two requests over one connection and returns their status lines."""
+        server = await asyncio.start_server(self.server.serve_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        status_lines = []
+        for _ in range(2):
+            writer.write(b"GET /rankings HTTP/1.1\r\nHost: test\r\n\r\n")
+            status_lines.append(await reader.readline())
+            headers = {}
+            while (line := await reader.readline()) != b"\r\n":
+                name, _, value = line.decode().partition(":")
+                headers[name.lower()] = value.strip()
+            await reader.readexactly(int(headers["content-length"]))
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return status_lines
+
+
+if __name__ == "__main__":
+    unittest.main()
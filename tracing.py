@@ -0,0 +1,242 @@
+# tracing.py
+"""Span tracing with Chrome trace export, and cProfile for chosen frames.
+
+Set MAZESLICE_TRACE=1 to record how long the game spends in its states,
+maze generation, collision checks and drawing. Code is instrumented with
+decorators and context managers:
+
+    @traced("maze.generate")
+    def generate(self): ...
+
+    with span("display.flip"):
+        pygame.display.flip()
+
+Spans go into a preallocated ring buffer that holds the most recent
+`CAPACITY` spans, so a long session keeps the last few seconds. In game,
+F4 writes them to `TRACE_DIR` as Chrome trace JSON, which can be opened in
+chrome://tracing or https://ui.perfetto.dev. The buffer is also written
+when the game exits. Without MAZESLICE_TRACE, `traced` returns the
+function unchanged and `span` does nothing.
+
+F5 runs the next `PROFILE_FRAMES` frames under cProfile and writes the
+statistics to `TRACE_DIR`, to be read with `pstats` or snakeviz.
+"""
+
+import atexit
+import cProfile
+import json
+import os
+import time
+from functools import wraps
+
+import numpy as np
+
+from debug_log import debug
+
+ENABLED = os.environ.get("MAZESLICE_TRACE", "0") != "0"
+
+# where traces and profiles are written
+TRACE_DIR = "traces"
+
+# most recent spans kept, 20 bytes each
+CAPACITY = 1 << 17
+
+# frames profiled per request
+PROFILE_FRAMES = 60
+
+
+def _timestamped_path(prefix: str, extension: str) -> str:
+    """Returns a new path in `TRACE_DIR` named after the current time."""
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    return os.path.join(TRACE_DIR, f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}"
+                                   f"-{time.perf_counter_ns() % 1000000:06d}.{extension}")
+
+
+class _Span:
+    """Context manager recording one named span into a `Tracer`."""
+
+    __slots__ = ("tracer", "name_id")
+
+    def __init__(self, tracer: "Tracer", name_id: int):
+        self.tracer = tracer
+        self.name_id = name_id
+
+    def __enter__(self) -> None:
+        self.tracer._starts.append(time.perf_counter_ns())
+
+    def __exit__(self, *exc_info) -> None:
+        tracer = self.tracer
+        end = time.perf_counter_ns()
+        start = tracer._starts.pop()
+        index = tracer.count % tracer.capacity
+        tracer.starts[index] = start
+        tracer.durations[index] = end - start
+        tracer.name_ids[index] = self.name_id
+        tracer.count += 1
+
+
+class _NullSpan:
+    """A span that records nothing."""
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Records nested spans of the game thread into a ring buffer.
+
+    Attributes:
+        capacity: Most spans kept, older ones are overwritten
+        count: Spans recorded since the start
+        names: Span names, indexed by the name ids in the buffer
+        starts: Start of each span, from `time.perf_counter_ns`
+        durations: Length of each span in nanoseconds
+        name_ids: Index into `names` of each span's name
+    """
+
+    def __init__(self, capacity=CAPACITY):
+        """Initializes an empty tracer.
+
+        Args:
+            capacity: Most spans kept
+        """
+        self.capacity = capacity
+        self.count = 0
+        self.names: list[str] = []
+        self.starts = np.zeros(capacity, dtype=np.int64)
+        self.durations = np.zeros(capacity, dtype=np.int64)
+        self.name_ids = np.zeros(capacity, dtype=np.int32)
+        self._spans: dict[str, _Span] = {}
+        # starts of the spans that are still open
+        self._starts: list[int] = []
+
+    def span(self, name: str) -> _Span:
+        """Returns a context manager recording a span called `name`.
+
+        Names are "category.what", e.g. "maze.generate".
+        """
+        context = self._spans.get(name)
+        if context is None:
+            context = self._spans[name] = _Span(self, len(self.names))
+            self.names.append(name)
+        return context
+
+    def clear(self) -> None:
+        """Forgets all recorded spans."""
+        self.count = 0
+
+    def to_chrome_trace(self) -> dict:
+        """Returns the recorded spans, oldest first, in the Chrome trace format."""
+        kept = min(self.count, self.capacity)
+        order = (np.arange(self.count - kept, self.count) % self.capacity)
+        pid = os.getpid()
+        events = [
+            {"name": self.names[name_id], "cat": self.names[name_id].split(".")[0],
+             "ph": "X", "ts": start / 1000, "dur": duration / 1000,
+             "pid": pid, "tid": 1}
+            for start, duration, name_id in zip(self.starts[order].tolist(),
+                                                self.durations[order].tolist(),
+                                                self.name_ids[order].tolist())
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str | None = None) -> str:
+        """Writes the recorded spans as Chrome trace JSON.
+
+        Args:
+            path: File to write. Defaults to a new file in `TRACE_DIR`
+
+        Returns:
+            The path written to.
+        """
+        path = path or _timestamped_path("trace", "json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f)
+        debug("trace_exported", path=path, spans=min(self.count, self.capacity))
+        return path
+
+
+tracer = Tracer() if ENABLED else None
+
+
+def span(name: str) -> _Span | _NullSpan:
+    """Returns a context manager recording a span, or doing nothing if disabled."""
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name)
+
+
+def traced(name: str):
+    """Decorator recording every call of a function as a span called `name`.
+
+    Returns the function unchanged when tracing is disabled.
+    """
+
+    def decorate(function):
+        if tracer is None:
+            return function
+        context = tracer.span(name)
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with context:
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+@atexit.register
+def _export_at_exit() -> None:
+    """Writes the spans of the session when the game exits."""
+    if tracer is not None and tracer.count:
+        tracer.export()
+
+
+class FrameProfiler:
+    """Runs chosen frames under cProfile.
+
+    Wrap every frame in the profiler; frames only run under cProfile after
+    `request`:
+
+        with profiler:
+            game.perform_frame_actions()
+
+    Attributes:
+        remaining: Frames still to profile for the current request
+        last_path: Statistics file written for the last request, if any
+    """
+
+    def __init__(self):
+        """Initializes a profiler that profiles nothing yet."""
+        self.remaining = 0
+        self.last_path = None
+        self._profile = None
+
+    def request(self, frames=PROFILE_FRAMES) -> None:
+        """Profiles the next `frames` frames."""
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+        self.remaining = frames
+
+    def __enter__(self) -> None:
+        if self.remaining:
+            self._profile.enable()
+
+    def __exit__(self, *exc_info) -> None:
+        if not self.remaining:
+            return
+        self._profile.disable()
+        self.remaining -= 1
+        if not self.remaining:
+            self.last_path = _timestamped_path("profile", "prof")
+            self._profile.dump_stats(self.last_path)
+            self._profile = None
+            debug("profile_written", path=self.last_path)
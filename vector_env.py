@@ -0,0 +1,510 @@
+# vector_env.py
+"""Many independent mazes simulated together with NumPy.
+
+`VectorMazeEnv` keeps the state of N runs in stacked arrays and advances all
+of them with one `step` call. It follows the rules of `Player.handle_movement`,
+`Maze.collect_items`, `Maze.move_hunters` and the win/lose checks of
+`simulation.World`, so bots can be trained and evaluated without one game
+per episode.
+
+Actions are packed `PlayerInput`s, see `PlayerInput.to_bits`.
+"""
+
+import functools
+
+import numpy as np
+
+from config import HEIGHT, TICK_RATE, WIDTH, Z_LAYERS
+from hunter import CHASE_Z_RANGE, SEPARATION_RADIUS, SEPARATION_WEIGHT, SEPARATION_Z
+from maze import Maze
+from player import EXPERIMENTAL_SLIDING, Player, PlayerInput
+from rng import RngService
+
+# bit of each control in a packed PlayerInput
+UP, DOWN, LEFT, RIGHT, ASCEND, DESCEND, DASH = (
+    1 << i for i in range(len(PlayerInput.__slots__)))
+
+# values of `VectorMazeEnv.state`
+PLAYING, WON, LOST = 0, 1, 2
+
+# sliding tries the velocity rotated by 1, -1, 2, -2, ..., 60, -60 degrees
+_SLIDE_ANGLES = np.radians(np.repeat(np.arange(1, 61), 2) * np.tile([1, -1], 60))
+_SLIDE_BATCH = 8
+_TELEPORT_ATTEMPTS = 100
+# grid cells of `_separation` are keyed by run, row and column; cell
+# coordinates are offset to be positive
+_CELL_OFFSET = 1 << 20
+_CELL_SPAN = 1 << 21
+
+
+def pack_maze(maze: Maze) -> dict[str, np.ndarray]:
+    """Packs the layout of a maze into arrays.
+
+    Args:
+        maze: The maze to pack
+
+    Returns:
+        A dictionary with
+            "obstacles": (M, 4) x, y, z and radius of each obstacle,
+            "items": (I, 5) x, y, start z, end z and radius of each item,
+            "item_types": (I,) index of each item's type in `ITEM_TYPES`,
+            "hunters": (H, 5) initial x, y, z, radius and speed of each hunter,
+            "start": (4,) and "end": (4,) x, y, z and radius of the locations.
+    """
+    return {
+        "obstacles": maze.obstacles.parameters(),
+        "items": maze.power_ups.parameters(),
+        "item_types": maze.power_ups.column("type").copy(),
+        "hunters": np.array(
+            [(*hunter.initial_location, hunter.radius, hunter.speed)
+             for hunter in maze.hunters], dtype=np.float64).reshape(-1, 5),
+        "start": np.array(maze.start_location.get_parameters(), dtype=np.float64),
+        "end": np.array(maze.end_location.get_parameters(), dtype=np.float64),
+    }
+
+
+@functools.lru_cache(maxsize=256)
+def generate_layout(difficulty: str, seed: int) -> dict[str, np.ndarray]:
+    """Returns the packed layout of the maze identified by `difficulty` and `seed`.
+
+    Layouts are cached by that key, so the returned arrays are read-only.
+    """
+    layout = pack_maze(Maze(difficulty, seed))
+    for array in layout.values():
+        array.flags.writeable = False
+    return layout
+
+
+class VectorMazeEnv:
+    """N independent runs through mazes of one difficulty.
+
+    Runs that are won or lost stay frozen until they are reset.
+
+    Attributes:
+        num_envs: Number of runs
+        difficulty: Difficulty of the generated mazes
+        state: (N,) PLAYING, WON or LOST for each run
+        time: (N,) simulation time of each run in seconds
+        position: (N, 3) x, y, z of each player
+        velocity: (N, 2) x and y velocity of each player
+        hunter_position: (N, H, 3) x, y, z of each hunter
+        collected: (N, I) whether each item has been collected
+        items_collected: (N,) number of items collected in each run
+    """
+
+    def __init__(self, num_envs: int, difficulty: str, seed=None, layout=None):
+        """Generates `num_envs` mazes and starts a run in each.
+
+        Args:
+            num_envs: Number of runs to simulate together
+            difficulty: Difficulty of the mazes
+            seed: Seed for the mazes and the randomness of the runs
+            layout: Arrays from `pack_maze` to use for every run instead of
+                    generating mazes. They are shared between the runs
+                    without copying, e.g. to use a `shared_maze.SharedMaze`,
+                    so `load_maze` and new mazes on `reset` are unavailable.
+        """
+        self.num_envs = num_envs
+        self.difficulty = difficulty
+        seeds = RngService(seed)
+        self.rng = seeds.generator("runs")
+        self.maze_seeds = seeds.stream("mazes")
+
+        # rules of the player, taken from a default player
+        template = Player(0, 0, 0)
+        self.player_radius = template.radius
+        self.acceleration = template.acceleration
+        self.friction = template.friction
+        self.base_max_speed = template.max_speed
+        self.dash_speed = template.dash_speed
+        self.dash_duration = template.dash_duration
+        self.base_dash_cooldown = template.dash_cooldown
+        self.z_speed = template.z_speed
+
+        # maze layouts; all mazes of a difficulty have the same object counts
+        if layout is not None:
+            for key, value in layout.items():
+                setattr(self, key, np.broadcast_to(value, (num_envs, *value.shape)))
+        else:
+            layouts = [self._new_layout() for _ in range(num_envs)]
+            for key in layouts[0]:
+                setattr(self, key, np.stack([layout[key] for layout in layouts]))
+
+        n = num_envs
+        self.state = np.zeros(n, dtype=np.int8)
+        self.time = np.zeros(n)
+        self.position = np.zeros((n, 3))
+        self.velocity = np.zeros((n, 2))
+        self.max_speed = np.zeros(n)
+        self.is_dashing = np.zeros(n, dtype=bool)
+        self.dash_start_time = np.zeros(n)
+        self.last_dash_time = np.zeros(n)
+        self.dash_cooldown = np.zeros(n)
+        self.speed_boost_active = np.zeros(n, dtype=bool)
+        self.speed_boost_end_time = np.zeros(n)
+        self.hunter_position = np.zeros((n, self.hunters.shape[1], 3))
+        self.collected = np.zeros((n, self.items.shape[1]), dtype=bool)
+        self.items_collected = np.zeros(n, dtype=np.int64)
+        self.reset()
+
+    def load_maze(self, index: int, maze: Maze) -> None:
+        """Replaces the maze of one run and resets the run.
+
+        Args:
+            index: The run to change
+            maze: A maze with the same object counts as the others
+        """
+        for key, value in pack_maze(maze).items():
+            getattr(self, key)[index] = value
+        self.reset([index])
+
+    def reset(self, indices=None, new_mazes=False) -> dict[str, np.ndarray]:
+        """Restarts runs from the start of their mazes.
+
+        Args:
+            indices: The runs to restart. Defaults to all of them
+            new_mazes: Generate new mazes for the runs instead of replaying
+                       the same ones. Defaults to False
+
+        Returns:
+            The observations after the reset, see `observe`.
+        """
+        idx = np.arange(self.num_envs) if indices is None else np.asarray(indices)
+        if new_mazes:
+            for i in idx:
+                for key, value in self._new_layout().items():
+                    getattr(self, key)[i] = value
+
+        self.state[idx] = PLAYING
+        self.time[idx] = 0.0
+        self.position[idx] = self.start[idx, :3]
+        self.velocity[idx] = 0.0
+        self.max_speed[idx] = self.base_max_speed
+        self.is_dashing[idx] = False
+        self.dash_start_time[idx] = 0.0
+        self.last_dash_time[idx] = -self.base_dash_cooldown
+        self.dash_cooldown[idx] = self.base_dash_cooldown
+        self.speed_boost_active[idx] = False
+        self.speed_boost_end_time[idx] = 0.0
+        self.hunter_position[idx] = self.hunters[idx, :, :3]
+        self.collected[idx] = False
+        self.items_collected[idx] = 0
+        return self.observe()
+
+    def step(self, actions, dt=1 / TICK_RATE):
+        """Advances every run that is still playing by one simulation step.
+
+        Args:
+            actions: (N,) packed `PlayerInput` of each run
+            dt: Simulation time covered by the step, in seconds
+
+        Returns:
+            A tuple of the observations (see `observe`), and (N,) flags
+            telling which runs are won and which are lost.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        idx = np.flatnonzero(self.state == PLAYING)
+        if idx.size:
+            self.time[idx] += dt
+            self._move_players(idx, actions[idx])
+            self._collect_items(idx)
+            self._move_hunters(idx)
+            self._check_end(idx)
+        return self.observe(), self.state == WON, self.state == LOST
+
+    def observe(self) -> dict[str, np.ndarray]:
+        """Returns copies of the changing state of every run.
+
+        Returns:
+            A dictionary with "position" (N, 3), "velocity" (N, 2),
+            "time" (N,), "hunters" (N, H, 3) and "collected" (N, I).
+        """
+        return {
+            "position": self.position.copy(),
+            "velocity": self.velocity.copy(),
+            "time": self.time.copy(),
+            "hunters": self.hunter_position.copy(),
+            "collected": self.collected.copy(),
+        }
+
+    def _new_layout(self) -> dict[str, np.ndarray]:
+        """Returns the layout of the next maze from the environment's seed."""
+        return generate_layout(self.difficulty, self.maze_seeds.getrandbits(32))
+
+    def _allowed(self, idx, xy, z):
+        """Vectorized `Maze.is_move_allowed` for the player.
+
+        Args:
+            idx: (K,) runs to check
+            xy: (K, C, 2) candidate positions of each run's player
+            z: (K,) z-layer of each run's player
+
+        Returns:
+            (K, C) whether each candidate position is free.
+        """
+        r = self.player_radius
+        obst = self.obstacles[idx]
+        z_dist = np.abs(z[:, None] - obst[..., 2])
+        radius = obst[..., 3]
+        proj = np.sqrt(np.maximum(radius ** 2 - z_dist ** 2, 0))
+        # obstacles that don't appear in the player's layer can't be hit
+        reach = np.where((z_dist < radius) & (proj > 0), proj + r, 0)
+        dx = xy[:, :, None, 0] - obst[:, None, :, 0]
+        dy = xy[:, :, None, 1] - obst[:, None, :, 1]
+        hit = (dx * dx + dy * dy < (reach * reach)[:, None, :]).any(-1)
+
+        in_bounds = ((xy[..., 0] >= r) & (xy[..., 0] <= WIDTH - r)
+                     & (xy[..., 1] >= r) & (xy[..., 1] <= HEIGHT - r)
+                     & (z[:, None] >= 0) & (z[:, None] <= Z_LAYERS))
+        return ~hit & in_bounds
+
+    def _move_players(self, idx, actions):
+        """Vectorized `Player.handle_movement`."""
+        t = self.time[idx]
+        pos = self.position[idx]
+        vel = self.velocity[idx]
+        max_speed = self.max_speed[idx]
+
+        # acceleration, friction and speed limit
+        accel_x = self.acceleration * (((actions & RIGHT) > 0).astype(float)
+                                       - ((actions & LEFT) > 0))
+        accel_y = self.acceleration * (((actions & DOWN) > 0).astype(float)
+                                       - ((actions & UP) > 0))
+        vel[:, 0] += accel_x
+        vel[:, 1] += accel_y
+        vel[accel_x == 0, 0] *= 1 - self.friction
+        vel[accel_y == 0, 1] *= 1 - self.friction
+        np.clip(vel, -max_speed[:, None], max_speed[:, None], out=vel)
+
+        # start a dash
+        dashing = self.is_dashing[idx]
+        start_dash = (((actions & DASH) > 0) & ~dashing
+                      & (t - self.last_dash_time[idx] >= self.dash_cooldown[idx]))
+        speed = np.hypot(vel[:, 0], vel[:, 1])
+        boost = start_dash & (speed != 0)
+        vel[boost] += vel[boost] / speed[boost, None] * self.dash_speed
+        dashing |= start_dash
+        self.dash_start_time[idx[start_dash]] = t[start_dash]
+        self.last_dash_time[idx[start_dash]] = t[start_dash]
+
+        # end a dash
+        end_dash = dashing & (t - self.dash_start_time[idx] >= self.dash_duration)
+        dashing &= ~end_dash
+        speed = np.hypot(vel[:, 0], vel[:, 1])
+        norm = end_dash & (speed > 0)
+        vel[norm] = vel[norm] / speed[norm, None] * max_speed[norm, None]
+        self.is_dashing[idx] = dashing
+
+        if not EXPERIMENTAL_SLIDING:
+            # move along each axis separately when blocked
+            for axis in (0, 1):
+                moved = pos[:, :2].copy()
+                moved[:, axis] += vel[:, axis]
+                free = self._allowed(idx, moved[:, None], pos[:, 2])[:, 0]
+                pos[free, axis] = moved[free, axis]
+            blocked = np.empty(0, dtype=np.int64)
+        else:
+            # move, sliding along obstacles when blocked
+            old_xy = pos[:, :2].copy()
+            moved = self._allowed(idx, (old_xy + vel)[:, None], pos[:, 2])[:, 0]
+            pos[moved, :2] += vel[moved]
+            blocked = np.flatnonzero(~moved)
+        # try the rotated velocities a few angles at a time, most players
+        # find a way to slide within the first few degrees
+        for start in range(0, len(_SLIDE_ANGLES), _SLIDE_BATCH):
+            if not blocked.size:
+                break
+            angles = _SLIDE_ANGLES[start:start + _SLIDE_BATCH]
+            cos, sin = np.cos(angles), np.sin(angles)
+            vx, vy = vel[blocked, 0, None], vel[blocked, 1, None]
+            candidates = np.stack([old_xy[blocked, 0, None] + cos * vx - sin * vy,
+                                   old_xy[blocked, 1, None] + sin * vx + cos * vy],
+                                  axis=-1)
+            free = self._allowed(idx[blocked], candidates, pos[blocked, 2])
+            slid = free.any(1)
+            first = free.argmax(1)
+            pos[blocked[slid], :2] = candidates[slid, first[slid]]
+            blocked = blocked[~slid]
+
+        # move between z-layers
+        dz = self.z_speed * (((actions & ASCEND) > 0).astype(float)
+                             - ((actions & DESCEND) > 0))
+        new_z = pos[:, 2] + dz
+        free = self._allowed(idx, pos[:, None, :2], new_z)[:, 0]
+        pos[free, 2] = new_z[free]
+
+        # timers
+        boost_over = self.speed_boost_active[idx] & (t >= self.speed_boost_end_time[idx])
+        max_speed[boost_over] -= 2
+        self.speed_boost_active[idx[boost_over]] = False
+
+        self.position[idx] = pos
+        self.velocity[idx] = vel
+        self.max_speed[idx] = max_speed
+
+    def _collect_items(self, idx):
+        """Vectorized `Maze.collect_items`.
+
+        Every item the player touches in a step is collected based on the
+        position at the start of collection, even if a teleport among them
+        moves the player.
+        """
+        items = self.items[idx]
+        pos = self.position[idx]
+        pz = pos[:, 2, None]
+        in_layer = (items[..., 2] <= pz) & (pz <= items[..., 3])
+        planar = np.hypot(items[..., 0] - pos[:, 0, None],
+                          items[..., 1] - pos[:, 1, None])
+        hit = (~self.collected[idx] & in_layer
+               & (planar < items[..., 4] + self.player_radius))
+        if not hit.any():
+            return
+        self.collected[idx] |= hit
+        self.items_collected[idx] += hit.sum(1)
+        types = self.item_types[idx]
+
+        # speed boosts don't stack
+        boost = ((hit & (types == 0)).any(1)
+                 & ~self.speed_boost_active[idx])
+        self.max_speed[idx[boost]] += 2
+        self.speed_boost_active[idx[boost]] = True
+        self.speed_boost_end_time[idx[boost]] = self.time[idx[boost]] + 5.0
+
+        # every dash item reduces the cooldown
+        dashes = (hit & (types == 1)).sum(1)
+        for k in range(dashes.max()):
+            reduce = idx[dashes > k]
+            self.dash_cooldown[reduce] = np.maximum(
+                0.5, self.dash_cooldown[reduce] - 0.1)
+
+        teleport = idx[(hit & (types == 2)).any(1)]
+        if teleport.size:
+            self._teleport(teleport)
+
+    def _teleport(self, idx):
+        """Vectorized `Player.teleport`."""
+        r = self.player_radius
+        shape = (idx.size, _TELEPORT_ATTEMPTS)
+        candidates = np.stack([self.rng.integers(r, WIDTH - r, shape, endpoint=True),
+                               self.rng.integers(r, HEIGHT - r, shape, endpoint=True)],
+                              axis=-1).astype(float)
+        free = self._allowed(idx, candidates, self.position[idx, 2])
+        found = free.any(1)
+        first = free.argmax(1)
+        self.position[idx[found], :2] = candidates[found, first[found]]
+
+    def _move_hunters(self, idx):
+        """Vectorized `Maze.move_hunters`."""
+        hunters = self.hunter_position[idx]
+        if not hunters.shape[1]:
+            return
+        pos = self.position[idx]
+        speed = self.hunters[idx, :, 4]
+        z_distance = np.abs(hunters[..., 2] - pos[:, 2, None])
+        near = z_distance <= CHASE_Z_RANGE
+
+        dx = pos[:, 0, None] - hunters[..., 0]
+        dy = pos[:, 1, None] - hunters[..., 1]
+        distance = np.hypot(dx, dy)
+        scalar = np.divide(speed, distance, out=np.zeros_like(speed),
+                           where=near & (distance > 0))
+        move_x, move_y = dx * scalar, dy * scalar
+
+        # steer away from the other hunters, never faster than `speed`
+        push_x, push_y = self._separation(
+            hunters, near, z_distance <= CHASE_Z_RANGE + SEPARATION_Z)
+        move_x += push_x * SEPARATION_WEIGHT * speed
+        move_y += push_y * SEPARATION_WEIGHT * speed
+        length = np.hypot(move_x, move_y)
+        limit = np.divide(speed, length, out=np.ones_like(speed), where=length > speed)
+        hunters[..., 0] += move_x * limit
+        hunters[..., 1] += move_y * limit
+
+        # move a layer towards the player with probability 1 - speed / 5
+        step_z = near & (self.rng.random(speed.shape) > speed / 5)
+        hunters[..., 2] -= step_z & (hunters[..., 2] > pos[:, 2, None])
+        hunters[..., 2] += step_z & (hunters[..., 2] < pos[:, 2, None])
+        self.hunter_position[idx] = hunters
+
+    @staticmethod
+    def _separation(hunters, moving, candidates):
+        """Vectorized `Hunter.separation` over a `HunterGrid`.
+
+        The candidates of all runs are sorted by their cell, so the hunters
+        in a cell are found with a binary search and all pairs of close
+        hunters are gathered without comparing every pair.
+
+        Args:
+            hunters: (E, H, 3) positions of the hunters of E runs
+            moving: (E, H) hunters to compute the push for
+            candidates: (E, H) hunters that can push
+
+        Returns:
+            (E, H) x and y of the push of each hunter, 0 unless moving.
+        """
+        push_x = np.zeros(moving.shape)
+        push_y = np.zeros(moving.shape)
+        run, hunter = np.nonzero(candidates)
+        mover_run, mover = np.nonzero(moving)
+        if not mover.size:
+            return push_x, push_y
+
+        def cell_keys(runs, columns, rows):
+            return ((runs * _CELL_SPAN + rows + _CELL_OFFSET) * _CELL_SPAN
+                    + columns + _CELL_OFFSET)
+
+        cells = np.floor(hunters[run, hunter, :2] / SEPARATION_RADIUS).astype(np.int64)
+        keys = cell_keys(run, cells[:, 0], cells[:, 1])
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+
+        mover_cells = np.floor(hunters[mover_run, mover, :2]
+                               / SEPARATION_RADIUS).astype(np.int64)
+        pairs_mover, pairs_other = [], []
+        for i in (-1, 0, 1):
+            for j in (-1, 0, 1):
+                wanted = cell_keys(mover_run, mover_cells[:, 0] + i, mover_cells[:, 1] + j)
+                first = np.searchsorted(keys, wanted, "left")
+                counts = np.searchsorted(keys, wanted, "right") - first
+                total = counts.sum()
+                if not total:
+                    continue
+                starts = np.repeat(first - np.cumsum(counts) + counts, counts)
+                pairs_mover.append(np.repeat(np.arange(mover.size), counts))
+                pairs_other.append(order[starts + np.arange(total)])
+        if not pairs_mover:
+            return push_x, push_y
+        pairs_mover = np.concatenate(pairs_mover)
+        pairs_other = np.concatenate(pairs_other)
+
+        own = hunters[mover_run[pairs_mover], mover[pairs_mover]]
+        other = hunters[run[pairs_other], hunter[pairs_other]]
+        dx = own[:, 0] - other[:, 0]
+        dy = own[:, 1] - other[:, 1]
+        distance = np.hypot(dx, dy)
+        pushing = ((hunter[pairs_other] != mover[pairs_mover])
+                   & (np.abs(own[:, 2] - other[:, 2]) <= SEPARATION_Z)
+                   & (distance > 0) & (distance < SEPARATION_RADIUS))
+        strength = np.divide(1 - distance / SEPARATION_RADIUS, distance,
+                             out=np.zeros_like(distance), where=pushing)
+        push_x[mover_run, mover] = np.bincount(pairs_mover, dx * strength, mover.size)
+        push_y[mover_run, mover] = np.bincount(pairs_mover, dy * strength, mover.size)
+        return push_x, push_y
+
+    def _check_end(self, idx):
+        """Vectorized win and lose checks of `simulation.World`."""
+        pos = self.position[idx]
+        end = self.end[idx]
+        won = ((pos[:, 2] == end[:, 2])
+               & (np.hypot(*(pos[:, :2] - end[:, :2]).T) < self.player_radius + end[:, 3]))
+
+        hunters = self.hunter_position[idx]
+        radius = self.hunters[idx, :, 3]
+        touching = ((hunters[..., 2] == pos[:, 2, None])
+                    & (np.hypot(hunters[..., 0] - pos[:, 0, None],
+                                hunters[..., 1] - pos[:, 1, None])
+                       < radius + self.player_radius))
+        lost = touching.any(1) & ~won
+
+        self.state[idx[won]] = WON
+        self.state[idx[lost]] = LOST